@@ -0,0 +1,45 @@
+"""Add alert worker heartbeat and shard lease tables
+
+Revision ID: 0006_alert_worker_leases
+Revises: 0005_add_whatsapp_phone
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0006_alert_worker_leases'
+down_revision: Union[str, None] = '0005_add_whatsapp_phone'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Running alert workers (heartbeats)
+    op.create_table(
+        'alert_workers',
+        sa.Column('worker_id', sa.String(128), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=False),
+        sa.Column('shard_count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('worker_id'),
+        sa.Index('ix_alert_workers_heartbeat_at', 'heartbeat_at')
+    )
+
+    # Shard leases (rows are created by the workers for the configured shard count)
+    op.create_table(
+        'alert_shard_leases',
+        sa.Column('shard_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('owner', sa.String(128), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('shard_id'),
+        sa.Index('ix_alert_shard_leases_owner', 'owner')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('alert_shard_leases')
+    op.drop_table('alert_workers')
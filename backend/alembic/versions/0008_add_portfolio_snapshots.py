@@ -0,0 +1,42 @@
+"""Add portfolio snapshots table and users.portfolio_version
+
+Revision ID: 0008_portfolio_snapshots
+Revises: 0007_notification_outbox
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0008_portfolio_snapshots'
+down_revision: Union[str, None] = '0007_notification_outbox'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('portfolio_version', sa.Integer(), server_default='0', nullable=False))
+    op.create_table(
+        'portfolio_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('taken_at', sa.DateTime(), nullable=False),
+        sa.Column('total_invested', sa.Float(), nullable=False),
+        sa.Column('current_value', sa.Float(), nullable=False),
+        sa.Column('day_pl', sa.Float(), nullable=False),
+        sa.Column('allocation', sa.JSON(), nullable=False),
+        sa.Column('holdings', sa.JSON(), nullable=False),
+        sa.Column('source', sa.String(20), nullable=False),
+        sa.Column('positions_version', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.Index('ix_portfolio_snapshots_user_taken', 'user_id', 'taken_at')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('portfolio_snapshots')
+    op.drop_column('users', 'portfolio_version')
@@ -94,15 +94,12 @@ class PredictionService:
         future = model.make_future_dataframe(periods=horizon_days, freq="D", include_history=False)
         forecast = model.predict(future)
 
-        results: List[PredictionPoint] = []
-        for _, row in forecast.iterrows():
-            results.append(
-                PredictionPoint(
-                    date=row["ds"].to_pydatetime(),
-                    predicted_price=float(row["yhat"]),
-                )
-            )
-        return results
+        dates = pd.DatetimeIndex(forecast["ds"]).to_pydatetime()
+        prices = forecast["yhat"].to_numpy(dtype=float).tolist()
+        return [
+            PredictionPoint(date=date, predicted_price=price)
+            for date, price in zip(dates, prices)
+        ]
 
     def _predict_with_naive(
         self,
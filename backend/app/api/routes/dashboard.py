@@ -2,33 +2,60 @@
 Fast dashboard API routes.
 
 Each section is isolated so one slow upstream source never blocks the others.
+The combined /data endpoint runs all sections concurrently off the event
+loop, each with its own deadline; a section that misses it (or fails) is
+answered with its fallback and flagged in "stale", so the response time is
+bounded by the slowest deadline rather than the sum of all sections.
 """
 
+import asyncio
 import logging
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_db_session
-from app.api.routes.portfolio import PortfolioSummaryResponse, get_portfolio_summary
+from app.api.routes.portfolio import (
+    PortfolioSummaryResponse,
+    _enriched_holdings,
+    _portfolio_valuation,
+    _positions_for_valuation,
+    _save_valuation,
+    _snapshot_valuation,
+    _value_holdings,
+)
 from app.api.routes.stocks_extended import (
+    _build_live_ribbon,
     _build_market_summary_from_quotes,
     _get_fallback_market_quotes,
+    _get_market_snapshot,
     get_live_stock_quotes,
     get_market_summary,
 )
+from app.db.executor import run_db
+from app.db.session import SessionLocal
 from app.models.user import User
 from app.schemas.trading import LiveStockRibbon, MarketSummary
-from app.services.news_service import GLOBAL_NEWS_CACHE_KEY, _cache_get, get_global_news
+from app.services.news_service import get_cached_global_news, get_global_news
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 DASHBOARD_SECTION_TIMEOUT_SECONDS = 0.9
+# Deadlines of the sections of /data (market and ribbon share one cached
+# snapshot; news only reads the cache)
+DASHBOARD_SECTION_DEADLINES = {
+    "portfolio": DASHBOARD_SECTION_TIMEOUT_SECONDS,
+    "market": 1.5,
+    "ribbon": 1.5,
+    "news": 0.5,
+}
 DASHBOARD_FALLBACK_NEWS = (
     {
         "title": "Large-cap tech remains steady while live headlines refresh.",
@@ -53,6 +80,11 @@ DASHBOARD_FALLBACK_NEWS = (
 _news_refresh_lock = threading.Lock()
 _news_refresh_in_progress = False
 
+# Shared by the /portfolio section's timeout; a per-call executor would wait
+# for the slow call on shutdown and defeat the timeout. Workers open their own
+# session: a timed-out call keeps running after the request session is closed
+_portfolio_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dashboard-portfolio")
+
 
 def _fallback_portfolio_summary() -> PortfolioSummaryResponse:
     return PortfolioSummaryResponse(
@@ -118,11 +150,18 @@ def _schedule_news_refresh(limit: int) -> None:
     threading.Thread(target=_refresh_news_cache, args=(limit,), daemon=True).start()
 
 
-def _get_dashboard_portfolio(current_user: User, db: Session) -> PortfolioSummaryResponse:
+def _portfolio_summary(user_id: int) -> PortfolioSummaryResponse:
+    db = SessionLocal()
     try:
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(get_portfolio_summary, current_user=current_user, db=db)
-            return future.result(timeout=DASHBOARD_SECTION_TIMEOUT_SECONDS)
+        return _portfolio_valuation(db, user_id).summary
+    finally:
+        db.close()
+
+
+def _get_dashboard_portfolio(current_user: User) -> PortfolioSummaryResponse:
+    try:
+        future = _portfolio_executor.submit(_portfolio_summary, current_user.id)
+        return future.result(timeout=DASHBOARD_SECTION_TIMEOUT_SECONDS)
     except FutureTimeoutError:
         logger.debug("Dashboard portfolio section timed out; returning fallback data")
         return _fallback_portfolio_summary()
@@ -148,20 +187,52 @@ def _get_dashboard_ribbon(db: Session) -> LiveStockRibbon:
 
 
 def _get_dashboard_news(limit: int) -> list[dict]:
-    cached_news = _cache_get(GLOBAL_NEWS_CACHE_KEY)
+    return _load_news_section(limit)[0]
+
+
+# Section loaders of /data: (value, stale) with stale=True when fallback
+# data stands in for part or all of the section
+
+async def _load_portfolio_section(user_id: int) -> Tuple[PortfolioSummaryResponse, bool]:
+    """
+    Only the snapshot read and write go to the database executor; live
+    quoting runs in its own thread so a slow quote provider cannot hold the
+    workers the alert pipeline and notification outbox share.
+    """
+    valuation = await run_db(lambda db: _snapshot_valuation(db, user_id))
+    if valuation is not None:
+        return valuation.summary, False
+
+    holdings, version, taken_at = await run_db(lambda db: _positions_for_valuation(db, user_id))
+    valuation = await asyncio.to_thread(lambda: _value_holdings(_enriched_holdings(holdings, user_id)))
+    await run_db(lambda db: _save_valuation(db, user_id, valuation, taken_at, version))
+    return valuation.summary, False
+
+
+def _load_market_section() -> Tuple[MarketSummary, bool]:
+    quotes, used_fallback = _get_market_snapshot()
+    return _build_market_summary_from_quotes(quotes), used_fallback
+
+
+def _load_ribbon_section() -> Tuple[LiveStockRibbon, bool]:
+    quotes, used_fallback = _get_market_snapshot()
+    return _build_live_ribbon(quotes), used_fallback
+
+
+def _load_news_section(limit: int) -> Tuple[list[dict], bool]:
+    cached_news = get_cached_global_news(limit)
     if isinstance(cached_news, list) and cached_news:
-        return cached_news[:limit]
+        return cached_news[:limit], False
 
     _schedule_news_refresh(limit)
-    return _fallback_news(limit)
+    return _fallback_news(limit), True
 
 
 @router.get("/portfolio", response_model=PortfolioSummaryResponse, summary="Get dashboard portfolio section")
 def get_dashboard_portfolio_section(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session),
 ) -> PortfolioSummaryResponse:
-    return _get_dashboard_portfolio(current_user=current_user, db=db)
+    return _get_dashboard_portfolio(current_user=current_user)
 
 
 @router.get("/market", response_model=MarketSummary, summary="Get dashboard market section")
@@ -188,15 +259,57 @@ def get_dashboard_ribbon_section(
     return _get_dashboard_ribbon(db=db)
 
 
+async def _run_section(
+    name: str,
+    load: Callable[[], Any],
+    fallback: Callable[[], Any],
+) -> Tuple[Any, bool]:
+    """
+    Await one dashboard section loader, which resolves to (value, stale),
+    within its deadline.
+
+    Returns the loader's result, or the fallback and stale=True when the
+    section timed out or failed. A timed-out load keeps running in its
+    thread and still fills the caches for the next request.
+    """
+    started = time.monotonic()
+    try:
+        return await asyncio.wait_for(load(), timeout=DASHBOARD_SECTION_DEADLINES[name])
+    except asyncio.TimeoutError:
+        logger.debug(f"Dashboard {name} section timed out; returning fallback data")
+    except Exception as e:
+        logger.error(f"Error fetching dashboard {name} section: {e}")
+    finally:
+        logger.debug(f"Dashboard {name} section took {(time.monotonic() - started) * 1000:.0f}ms")
+    return fallback(), True
+
+
 @router.get("/data", summary="Get combined dashboard data")
 async def get_dashboard_data(
     news_limit: int = Query(3, ge=1, le=20, description="Number of news items"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session),
 ):
-    return {
-        "portfolio": _get_dashboard_portfolio(current_user=current_user, db=db),
-        "market": _get_dashboard_market(db=db),
-        "ribbon": _get_dashboard_ribbon(db=db),
-        "news": _get_dashboard_news(news_limit),
+    """
+    All dashboard sections in one response, loaded concurrently.
+
+    "stale" lists, per section, whether fallback data was returned because
+    the section missed its deadline, failed or its upstream data was
+    unavailable.
+    """
+    sections: Dict[str, Tuple[Callable[[], Any], Callable[[], Any]]] = {
+        "portfolio": (lambda: _load_portfolio_section(current_user.id), _fallback_portfolio_summary),
+        "market": (lambda: asyncio.to_thread(_load_market_section), _fallback_market_summary),
+        "ribbon": (lambda: asyncio.to_thread(_load_ribbon_section), _fallback_live_ribbon),
+        "news": (lambda: asyncio.to_thread(_load_news_section, news_limit), lambda: _fallback_news(news_limit)),
     }
+    results = await asyncio.gather(
+        *(_run_section(name, load, fallback) for name, (load, fallback) in sections.items())
+    )
+
+    response: Dict[str, Any] = {}
+    stale: Dict[str, bool] = {}
+    for name, (value, is_stale) in zip(sections, results):
+        response[name] = value
+        stale[name] = is_stale
+    response["stale"] = stale
+    return response
@@ -13,6 +13,9 @@ from datetime import datetime, timezone
 from fastapi import APIRouter
 
 from app.config import settings
+from app.core.cache import get_all_cache_stats
+from app.core.singleflight import get_singleflight_stats
+from app.services.market_data import market_data_gateway
 
 
 router = APIRouter(prefix="/health", tags=["health"])
@@ -51,3 +54,19 @@ def ping() -> dict:
     return {"pong": True, "timestamp": datetime.now(timezone.utc).isoformat()}
 
 
+
+
+@router.get("/cache", summary="Cache and request coalescing statistics")
+def cache_stats() -> dict:
+    """
+    In-process cache counters for monitoring:
+    - caches: size, hit/miss/eviction counters per Cache instance
+    - market_data: gateway request/hit/upstream counters
+    - singleflight: per-group calls, executions and coalesced callers
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "caches": get_all_cache_stats(),
+        "market_data": market_data_gateway.stats(),
+        "singleflight": get_singleflight_stats(),
+    }
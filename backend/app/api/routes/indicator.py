@@ -5,14 +5,33 @@ Endpoints for technical indicator calculations:
 - GET /api/indicators/sma - Simple Moving Average
 - GET /api/indicators/rsi - Relative Strength Index
 - GET /api/indicators/ema - Exponential Moving Average
+- GET /api/indicators/combined - Several indicators from one history fetch
+  (?indicators=sma:14,sma:50,ema:20,rsi:14)
+- POST /api/indicators/bulk - Indicators for many symbols, streamed as NDJSON
 """
 
+import json
 import logging
+import time
+from typing import AsyncIterator, List, Optional
+
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
 
 from app.core.exceptions import ValidationError, StockNotFoundError
-from app.schemas.indicator import SMAResponse, RSIResponse, EMAResponse
-from app.services.indicator_service import calculate_sma, calculate_rsi, calculate_ema
+from app.schemas.indicator import BulkIndicatorsRequest, SMAResponse, RSIResponse, EMAResponse
+from app.services.indicator_service import (
+    COMBINED_DEFAULT_SPECS,
+    INDICATOR_PERIOD_LIMITS,
+    calculate_ema,
+    calculate_indicators,
+    calculate_rsi,
+    calculate_sma,
+    parse_indicator_specs,
+    stream_indicators,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +44,9 @@ def get_indicator_overview() -> dict:
     logger.info("Indicators overview requested")
     return {
         "default_symbol": "AAPL",
-        "available_endpoints": ["sma", "ema", "rsi", "combined"],
+        "available_endpoints": ["sma", "ema", "rsi", "combined", "bulk"],
         "defaults": {"sma_period": 14, "ema_period": 20, "rsi_period": 14},
+        "combined_indicators": sorted(INDICATOR_PERIOD_LIMITS),
     }
 
 
@@ -255,55 +275,167 @@ def get_combined_indicators(
         max_length=10,
         description="Stock ticker symbol (e.g., AAPL, MSFT)"
     ),
+    indicators: Optional[str] = Query(
+        default=None,
+        max_length=300,
+        description=(
+            "Comma-separated name:period list, e.g. sma:14,sma:50,ema:20,rsi:14 "
+            "(sma, ema, rsi, bollinger, atr). Omit for the dashboard default."
+        ),
+    ),
 ) -> dict:
     """
-    Return SMA, EMA, and RSI in a single response for the frontend dashboard.
+    Return several indicators for a symbol, all computed from one cached
+    history fetch (the per-symbol indicator bundle).
     
-    Returns:
+    Without ``indicators`` (dashboard widget):
         {
             "symbol": str,
             "sma": { "sma": float },
             "ema": { "ema": float },
             "rsi": { "rsi": float }
         }
+    
+    With ``indicators=sma:14,ema:20,...``:
+        {
+            "symbol": str,
+            "current_price": float,
+            "as_of": str,
+            "indicators": { "sma:14": float | null, "ema:20": float | null, ... }
+        }
+    
+    Raises (only with ``indicators``):
+        HTTPException 400: Unknown indicator or invalid period
+        HTTPException 404: Symbol not found
     """
     normalized_symbol = symbol.upper()
+    if indicators is not None:
+        return _get_requested_indicators(normalized_symbol, indicators)
+
     logger.info(f"Combined indicators request - symbol: {normalized_symbol}")
+    safe_defaults = {
+        "symbol": normalized_symbol,
+        "sma": { "sma": 0 },
+        "ema": { "ema": 0 },
+        "rsi": { "rsi": 0 }
+    }
     try:
-        sma_result = calculate_sma(symbol=normalized_symbol, period=14)
-        ema_result = calculate_ema(symbol=normalized_symbol, period=20)
-        rsi_result = calculate_rsi(symbol=normalized_symbol, period=14)
+        values = calculate_indicators(normalized_symbol, COMBINED_DEFAULT_SPECS)["indicators"]
         
         return {
             "symbol": normalized_symbol,
-            "sma": { "sma": sma_result.get("sma", 0) },
-            "ema": { "ema": ema_result.get("ema", 0) },
-            "rsi": { "rsi": rsi_result.get("rsi", 0) }
+            "sma": { "sma": values["sma:14"] or 0 },
+            "ema": { "ema": values["ema:20"] or 0 },
+            "rsi": { "rsi": values["rsi:14"] or 0 }
         }
     except StockNotFoundError as e:
         logger.warning(f"Stock not found for combined indicators - symbol: {normalized_symbol}")
         # Return empty/safe defaults instead of 404
-        return {
-            "symbol": normalized_symbol,
-            "sma": { "sma": 0 },
-            "ema": { "ema": 0 },
-            "rsi": { "rsi": 0 }
-        }
+        return safe_defaults
     except ValidationError as e:
         logger.warning(f"Validation error for combined indicators - symbol: {normalized_symbol}, error: {e.message}")
         # Return empty/safe defaults instead of 400
-        return {
-            "symbol": normalized_symbol,
-            "sma": { "sma": 0 },
-            "ema": { "ema": 0 },
-            "rsi": { "rsi": 0 }
-        }
+        return safe_defaults
     except Exception as e:
         logger.error(f"Unexpected combined indicators error - symbol: {normalized_symbol}, error: {str(e)}", exc_info=True)
         # Return empty/safe defaults instead of 500
-        return {
-            "symbol": normalized_symbol,
-            "sma": { "sma": 0 },
-            "ema": { "ema": 0 },
-            "rsi": { "rsi": 0 }
-        }
+        return safe_defaults
+
+
+def _get_requested_indicators(symbol: str, indicators: str) -> dict:
+    """Explicit ?indicators= request: errors are reported, not defaulted."""
+    try:
+        specs = parse_indicator_specs(indicators)
+        logger.info(f"Combined indicators request - symbol: {symbol}, indicators: {len(specs)}")
+        return calculate_indicators(symbol, specs)
+    
+    except StockNotFoundError as e:
+        logger.warning(f"Stock not found - symbol: {symbol}")
+        raise HTTPException(
+            status_code=404,
+            detail={"error": "StockNotFound", "message": str(e)}
+        )
+    
+    except ValidationError as e:
+        logger.warning(f"Validation error - symbol: {symbol}, error: {e.message}")
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "InvalidParameter", "message": e.message}
+        )
+    
+    except Exception as e:
+        logger.error(f"Unexpected error - symbol: {symbol}, error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "InternalServerError", "message": "An unexpected error occurred"}
+        )
+
+
+@router.post("/bulk", summary="Get indicators for many symbols (NDJSON stream)")
+async def post_bulk_indicators(request: BulkIndicatorsRequest) -> StreamingResponse:
+    """
+    Calculate indicators for a whole watchlist or screener in one request.
+    
+    Histories are downloaded in concurrent batches and results are streamed
+    as newline-delimited JSON while the batches complete (cached symbols
+    first, otherwise in completion order, not request order). Each line is
+    either a result:
+        {"symbol": str, "current_price": float, "as_of": str, "indicators": {...}}
+    or an error for one symbol:
+        {"symbol": str, "error": "StockNotFound", "message": str}
+    and the last line is a summary:
+        {"done": true, "symbols": int, "errors": int, "elapsed_ms": float}
+    
+    Raises:
+        HTTPException 400: Invalid symbols or indicator specs (before streaming)
+    """
+    symbols = _normalize_bulk_symbols(request.symbols)
+    indicators = request.indicators if isinstance(request.indicators, str) else ",".join(request.indicators)
+    try:
+        specs = parse_indicator_specs(indicators)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "InvalidParameter", "message": e.message}
+        )
+    
+    logger.info(f"Bulk indicators request - symbols: {len(symbols)}, indicators: {len(specs)}")
+    
+    async def _lines() -> AsyncIterator[str]:
+        started = time.monotonic()
+        count = errors = 0
+        async for result in stream_indicators(symbols, specs):
+            count += 1
+            errors += "error" in result
+            yield json.dumps(result, separators=(",", ":")) + "\n"
+        elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        logger.info(
+            f"Bulk indicators streamed",
+            extra={"symbols": count, "errors": errors, "elapsed_ms": elapsed_ms},
+        )
+        yield json.dumps({"done": True, "symbols": count, "errors": errors, "elapsed_ms": elapsed_ms}) + "\n"
+    
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+def _normalize_bulk_symbols(raw_symbols: List[str]) -> List[str]:
+    """Upper-case, de-duplicate and validate the requested symbols."""
+    symbols = list(dict.fromkeys(s.strip().upper() for s in raw_symbols if s and s.strip()))
+    invalid = [s for s in symbols if len(s) > 10]
+    if not symbols or invalid:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "InvalidParameter",
+                "message": "Symbols must be 1-10 characters" if symbols else "No symbols requested",
+            }
+        )
+    if len(symbols) > settings.INDICATOR_BULK_MAX_SYMBOLS:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "error": "InvalidParameter",
+                "message": f"Too many symbols (maximum {settings.INDICATOR_BULK_MAX_SYMBOLS})",
+            }
+        )
+    return symbols
@@ -1,16 +1,20 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
-import yfinance as yf
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+import numpy as np
+import pandas as pd
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user, get_db_session
-from app.api.routes.stock import fetch_stock_quote
 from app.api.routes.search import _finnhub_symbol_search
+from app.core.cache import growth_series_cache
 from app.models.user import User
 from app.models.portfolio import Portfolio
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.services import portfolio_snapshots
+from app.services.market_data import Quote, market_data_gateway
 
 router = APIRouter(prefix="/portfolio", tags=["portfolio"])
 logger = logging.getLogger(__name__)
@@ -67,6 +71,23 @@ class PortfolioRemoveBody(BaseModel):
     ticker: str = Field(..., min_length=1, max_length=16, description="Stock ticker to remove")
 
 
+class PortfolioDashboardResponse(BaseModel):
+    """Combined portfolio dashboard with all key metrics."""
+    holdings: list[HoldingItem]
+    summary: PortfolioSummaryResponse
+    allocation: PortfolioAllocationResponse
+
+
+def _holding_item(row: Portfolio) -> HoldingItem:
+    return HoldingItem(
+        ticker=row.ticker.upper(),
+        quantity=row.quantity,
+        average_price=row.average_price,
+        name=_resolve_asset_name(row.ticker.upper()),
+        asset_class=_classify_asset(row.ticker.upper()),
+    )
+
+
 def _holdings_list(db: Session, user_id: int) -> list[HoldingItem]:
     rows = (
         db.query(Portfolio)
@@ -74,16 +95,7 @@ def _holdings_list(db: Session, user_id: int) -> list[HoldingItem]:
         .order_by(Portfolio.ticker)
         .all()
     )
-    return [
-        HoldingItem(
-            ticker=r.ticker.upper(),
-            quantity=r.quantity,
-            average_price=r.average_price,
-            name=_resolve_asset_name(r.ticker.upper()),
-            asset_class=_classify_asset(r.ticker.upper()),
-        )
-        for r in rows
-    ]
+    return [_holding_item(r) for r in rows]
 
 
 KNOWN_ASSET_NAMES = {
@@ -122,24 +134,17 @@ def _classify_asset(ticker: str) -> str:
     return "Technology"
 
 
-def _enrich_holding(holding: HoldingItem) -> HoldingItem:
-    """Enrich holding with current price data. Gracefully falls back on error."""
+def _enrich_holding(holding: HoldingItem, quote: Quote | None) -> HoldingItem:
+    """Enrich holding with its quote. Falls back to the average price without one."""
     quantity = float(holding.quantity or 0)
     average_price = float(holding.average_price or 0)
     invested_amount = quantity * average_price
 
     current_price = average_price
     previous_close = average_price
-    
-    try:
-        quote = fetch_stock_quote(holding.ticker)
+    if quote is not None:
         current_price = float(quote.price or average_price)
         previous_close = float(quote.previous_close or current_price)
-    except Exception as e:
-        # Graceful fallback: use average price on any error
-        logger.warning(f"Error fetching quote for {holding.ticker}: {e}")
-        current_price = average_price
-        previous_close = average_price
 
     current_value = quantity * current_price
     pl_amount = current_value - invested_amount
@@ -163,34 +168,28 @@ def _enrich_holding(holding: HoldingItem) -> HoldingItem:
     )
 
 
-def _enriched_holdings(db: Session, user_id: int) -> list[HoldingItem]:
-    return [_enrich_holding(holding) for holding in _holdings_list(db, user_id)]
-
-
-@router.get("", response_model=list[HoldingItem], summary="Get my portfolio")
-def get_portfolio(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session),
-) -> list[HoldingItem]:
-    """Return all holdings for the current user."""
-    logger.info("Portfolio requested", extra={"user_id": current_user.id})
-    return _enriched_holdings(db, current_user.id)
+def _quote_holdings(holdings: list[HoldingItem], context: dict) -> dict[str, Quote]:
+    """All tickers quoted in one concurrent pass through the market data gateway."""
+    try:
+        return market_data_gateway.resolve_quotes([holding.ticker for holding in holdings])
+    except Exception as e:
+        # Graceful fallback: average prices for every holding
+        logger.warning(f"Error fetching portfolio quotes: {e}", extra=context)
+        return {}
 
 
-@router.get("/summary", response_model=PortfolioSummaryResponse, summary="Get portfolio summary")
-def get_portfolio_summary(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session),
-) -> PortfolioSummaryResponse:
+def _enriched_holdings(holdings: list[HoldingItem], user_id: int) -> list[HoldingItem]:
     """
-    Return total invested, current value, and total P/L for the user's portfolio.
-    Uses live quotes from Finnhub; falls back to average price if a quote cannot be fetched.
+    Holdings with live prices. All tickers are quoted in one concurrent pass
+    through the market data gateway instead of one request per holding.
     """
-    logger.info("Portfolio summary requested", extra={"user_id": current_user.id})
-    holdings = _enriched_holdings(db, current_user.id)
-    total_invested = sum(float(holding.invested_amount or 0) for holding in holdings)
-    current_value = sum(float(holding.current_value or 0) for holding in holdings)
-    day_pl = sum(float(holding.day_change or 0) for holding in holdings)
+    if not holdings:
+        return []
+    quotes = _quote_holdings(holdings, {"user_id": user_id})
+    return [_enrich_holding(holding, quotes.get(holding.ticker.upper())) for holding in holdings]
+
+
+def _summary_from_totals(total_invested: float, current_value: float, day_pl: float) -> PortfolioSummaryResponse:
     total_pl = current_value - total_invested
     percent_pl = (total_pl / total_invested * 100) if total_invested > 0 else 0.0
     day_percent = (day_pl / (current_value - day_pl) * 100) if (current_value - day_pl) > 0 else 0.0
@@ -206,14 +205,15 @@ def get_portfolio_summary(
     )
 
 
-@router.get("/allocation", response_model=PortfolioAllocationResponse, summary="Get portfolio asset allocation")
-def get_portfolio_allocation(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session),
-) -> PortfolioAllocationResponse:
-    """Return portfolio allocation grouped into Technology, Crypto, Consumer, and fallbacks."""
-    logger.info("Portfolio allocation requested", extra={"user_id": current_user.id})
-    holdings = _enriched_holdings(db, current_user.id)
+def _summarize_holdings(holdings: list[HoldingItem]) -> PortfolioSummaryResponse:
+    return _summary_from_totals(
+        total_invested=sum(float(holding.invested_amount or 0) for holding in holdings),
+        current_value=sum(float(holding.current_value or 0) for holding in holdings),
+        day_pl=sum(float(holding.day_change or 0) for holding in holdings),
+    )
+
+
+def _allocate_holdings(holdings: list[HoldingItem]) -> PortfolioAllocationResponse:
     total_value = sum(float(holding.current_value or 0) for holding in holdings)
     grouped: dict[str, float] = {}
 
@@ -236,6 +236,128 @@ def get_portfolio_allocation(
     )
 
 
+def _value_holdings(holdings: list[HoldingItem]) -> PortfolioDashboardResponse:
+    return PortfolioDashboardResponse(
+        holdings=holdings,
+        summary=_summarize_holdings(holdings),
+        allocation=_allocate_holdings(holdings),
+    )
+
+
+def _value_all_portfolios(db: Session) -> dict[int, PortfolioDashboardResponse]:
+    """Valuation of every portfolio with positions, one quote batch for all tickers."""
+    rows = db.query(Portfolio).order_by(Portfolio.user_id, Portfolio.ticker).all()
+    holdings_by_user: dict[int, list[HoldingItem]] = {}
+    for row in rows:
+        holdings_by_user.setdefault(row.user_id, []).append(_holding_item(row))
+
+    all_holdings = [holding for holdings in holdings_by_user.values() for holding in holdings]
+    quotes = _quote_holdings(all_holdings, {"users": len(holdings_by_user)})
+    return {
+        user_id: _value_holdings(
+            [_enrich_holding(holding, quotes.get(holding.ticker)) for holding in holdings]
+        )
+        for user_id, holdings in holdings_by_user.items()
+    }
+
+
+def _valuation_from_snapshot(snapshot: PortfolioSnapshot) -> PortfolioDashboardResponse:
+    return PortfolioDashboardResponse(
+        holdings=[HoldingItem(**holding) for holding in snapshot.holdings],
+        summary=_summary_from_totals(snapshot.total_invested, snapshot.current_value, snapshot.day_pl),
+        allocation=PortfolioAllocationResponse(
+            total_value=round(snapshot.current_value, 2),
+            allocations=[AllocationItem(**item) for item in snapshot.allocation],
+        ),
+    )
+
+
+def _snapshot_valuation(db: Session, user_id: int) -> PortfolioDashboardResponse | None:
+    """Valuation from the latest snapshot, or None when there is no fresh one."""
+    snapshot = portfolio_snapshots.latest_snapshot(db, user_id)
+    return _valuation_from_snapshot(snapshot) if snapshot is not None else None
+
+
+def _positions_for_valuation(db: Session, user_id: int) -> tuple[list[HoldingItem], int, datetime]:
+    """Holdings to value live, with the positions version and time they were read at."""
+    taken_at = datetime.utcnow()
+    version = portfolio_snapshots.positions_versions(db, [user_id]).get(user_id, 0)
+    return _holdings_list(db, user_id), version, taken_at
+
+
+def _save_valuation(
+    db: Session, user_id: int, valuation: PortfolioDashboardResponse, taken_at: datetime, version: int
+) -> None:
+    try:
+        portfolio_snapshots.add_snapshot(
+            db, user_id, valuation.model_dump(), portfolio_snapshots.REQUEST, taken_at, version
+        )
+        db.commit()
+    except Exception as e:
+        # The valuation is still good; the next read tries again
+        db.rollback()
+        logger.warning(f"Error saving portfolio snapshot: {e}", extra={"user_id": user_id})
+
+
+def _portfolio_valuation(db: Session, user_id: int) -> PortfolioDashboardResponse:
+    """
+    Holdings, summary and allocation of a portfolio. Served from the latest
+    snapshot while it is fresh; otherwise valued live and snapshotted.
+    """
+    valuation = _snapshot_valuation(db, user_id)
+    if valuation is not None:
+        return valuation
+
+    holdings, version, taken_at = _positions_for_valuation(db, user_id)
+    valuation = _value_holdings(_enriched_holdings(holdings, user_id))
+    _save_valuation(db, user_id, valuation, taken_at, version)
+    return valuation
+
+
+def get_portfolio_valuation(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db_session),
+) -> PortfolioDashboardResponse:
+    """
+    Dependency: the current user's portfolio valuation. FastAPI caches it per
+    request, so every consumer within one request shares a single valuation.
+    """
+    return _portfolio_valuation(db, current_user.id)
+
+
+@router.get("", response_model=list[HoldingItem], summary="Get my portfolio")
+def get_portfolio(
+    current_user: User = Depends(get_current_user),
+    valuation: PortfolioDashboardResponse = Depends(get_portfolio_valuation),
+) -> list[HoldingItem]:
+    """Return all holdings for the current user."""
+    logger.info("Portfolio requested", extra={"user_id": current_user.id})
+    return valuation.holdings
+
+
+@router.get("/summary", response_model=PortfolioSummaryResponse, summary="Get portfolio summary")
+def get_portfolio_summary(
+    current_user: User = Depends(get_current_user),
+    valuation: PortfolioDashboardResponse = Depends(get_portfolio_valuation),
+) -> PortfolioSummaryResponse:
+    """
+    Return total invested, current value, and total P/L for the user's portfolio.
+    Uses live quotes; falls back to average price if a quote cannot be fetched.
+    """
+    logger.info("Portfolio summary requested", extra={"user_id": current_user.id})
+    return valuation.summary
+
+
+@router.get("/allocation", response_model=PortfolioAllocationResponse, summary="Get portfolio asset allocation")
+def get_portfolio_allocation(
+    current_user: User = Depends(get_current_user),
+    valuation: PortfolioDashboardResponse = Depends(get_portfolio_valuation),
+) -> PortfolioAllocationResponse:
+    """Return portfolio allocation grouped into Technology, Crypto, Consumer, and fallbacks."""
+    logger.info("Portfolio allocation requested", extra={"user_id": current_user.id})
+    return valuation.allocation
+
+
 _GROWTH_RANGE_CONFIG: dict[str, tuple[str, str, int]] = {
     "1d": ("5d", "1h", 24),
     "1w": ("1mo", "1d", 7),
@@ -244,6 +366,102 @@ _GROWTH_RANGE_CONFIG: dict[str, tuple[str, str, int]] = {
 }
 
 
+# Snapshot history needed to draw a range from portfolio_snapshots
+_GROWTH_SNAPSHOT_WINDOWS: dict[str, timedelta] = {
+    "1d": timedelta(days=1),
+    "1w": timedelta(days=7),
+    "1m": timedelta(days=31),
+    "1y": timedelta(days=365),
+}
+
+
+def _growth_label_format(range_key: str) -> str:
+    return "%Y-%m-%d %H:%M" if range_key == "1d" else "%Y-%m-%d"
+
+
+def _close_series(history: pd.DataFrame | None, range_key: str) -> pd.Series:
+    """Close prices of one history frame indexed by growth date label."""
+    if history is None or history.empty or "Close" not in history:
+        return pd.Series(dtype=np.float64)
+    closes = pd.to_numeric(history["Close"], errors="coerce")
+    index = pd.DatetimeIndex(closes.index)
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    closes = pd.Series(closes.to_numpy(dtype=np.float64), index=index.strftime(_growth_label_format(range_key)))
+    return closes[~closes.index.duplicated(keep="last")].dropna()
+
+
+def _growth_series(tickers: list[str], range_key: str) -> dict[str, pd.Series]:
+    """
+    Close series per ticker for a growth range. Cached per (ticker, range);
+    misses are downloaded together with one batched history request.
+    """
+    period, interval, _ = _GROWTH_RANGE_CONFIG[range_key]
+    series: dict[str, pd.Series] = {}
+    missing: list[str] = []
+    for ticker in tickers:
+        cached = growth_series_cache.get(f"growth:{ticker}:{range_key}")
+        if cached is None:
+            missing.append(ticker)
+        else:
+            series[ticker] = cached
+
+    if missing:
+        try:
+            # Shared, cached history from the market data gateway
+            histories = market_data_gateway.get_history_batch(missing, period=period, interval=interval)
+        except Exception as e:
+            # Skip these holdings on error, don't crash
+            logger.warning(f"Error fetching growth history for {', '.join(missing)}: {e}")
+            return series
+
+        ttl = market_data_gateway.history_ttl(interval)
+        for ticker in missing:
+            try:
+                closes = _close_series(histories.get(ticker), range_key)
+            except Exception as e:
+                logger.warning(f"Error parsing growth data for {ticker}: {e}")
+                continue
+            growth_series_cache.set(f"growth:{ticker}:{range_key}", closes, ttl)
+            series[ticker] = closes
+    return series
+
+
+def _snapshot_buckets(taken_at: pd.DatetimeIndex, range_key: str) -> pd.DatetimeIndex:
+    """
+    Start of the chart step each snapshot falls in, at the bar interval of
+    the range: hours for 1d, days for 1w/1m, weeks (from Monday) for 1y.
+    """
+    interval = _GROWTH_RANGE_CONFIG[range_key][1]
+    if interval == "1wk":
+        return taken_at.normalize() - pd.to_timedelta(taken_at.dayofweek, unit="D")
+    return taken_at.floor("h" if interval == "1h" else "D")
+
+
+def _snapshot_growth(db: Session, user_id: int, range_key: str) -> list[PortfolioGrowthPoint] | None:
+    """
+    Growth points from stored valuations (last snapshot per chart step),
+    None when the snapshots do not cover the whole range yet.
+    """
+    since = datetime.utcnow() - _GROWTH_SNAPSHOT_WINDOWS[range_key]
+    history = portfolio_snapshots.value_history(db, user_id, since)
+    if history is None:
+        return None
+    if not history:
+        return []
+
+    taken_at, values = zip(*history)
+    labels = _snapshot_buckets(pd.DatetimeIndex(taken_at), range_key).strftime(_growth_label_format(range_key))
+    points = pd.Series(values, index=labels)
+    points = points[~points.index.duplicated(keep="last")]
+
+    max_points = _GROWTH_RANGE_CONFIG[range_key][2]
+    return [
+        PortfolioGrowthPoint(date=date_key, value=round(float(value), 2))
+        for date_key, value in points.iloc[-max_points:].items()
+    ]
+
+
 @router.get("/growth", response_model=list[PortfolioGrowthPoint], summary="Get portfolio growth history")
 def get_portfolio_growth(
     range_key: str = Query("1y", alias="range", pattern="^(1d|1w|1m|1y)$"),
@@ -253,48 +471,44 @@ def get_portfolio_growth(
     """
     Return historical portfolio value points for the selected time range.
     Gracefully skips holdings that timeout or fail (no crash).
+
+    Read from the stored valuation snapshots once they cover the range.
+    Until then, value at each date = closes aligned on the union of all
+    dates (0 where a ticker has no bar) times current quantities, as one
+    matrix-vector product.
     """
     logger.info("Portfolio growth requested", extra={"user_id": current_user.id, "range": range_key})
+    snapshot_points = _snapshot_growth(db, current_user.id, range_key)
+    if snapshot_points is not None:
+        return snapshot_points
+
     holdings = _holdings_list(db, current_user.id)
     if not holdings:
         return []
 
-    period, interval, max_points = _GROWTH_RANGE_CONFIG[range_key]
-    portfolio_points: dict[str, float] = {}
-
+    quantities: dict[str, float] = {}
     for holding in holdings:
-        try:
-            # Fetch historical data - no signal.alarm() on Windows
-            # yfinance is generally fast, errors will be caught below
-            history = yf.Ticker(holding.ticker).history(period=period, interval=interval, auto_adjust=False)
-                
-        except Exception as e:
-            # Skip this holding on error, don't crash
-            logger.warning(f"Error fetching growth history for {holding.ticker}: {e}")
-            continue
+        ticker = holding.ticker.upper()
+        quantities[ticker] = quantities.get(ticker, 0.0) + float(holding.quantity or 0)
+
+    series = {
+        ticker: closes
+        for ticker, closes in _growth_series(list(quantities), range_key).items()
+        if not closes.empty
+    }
+    if not series:
+        return []
 
-        if history is None or history.empty:
-            continue
+    # Date labels are ISO formatted, so the sorted union is chronological
+    prices = pd.concat(series, axis=1, sort=True).fillna(0.0)
+    values = prices.to_numpy() @ np.array([quantities[ticker] for ticker in prices.columns])
 
-        quantity = float(holding.quantity or 0)
-        try:
-            for idx, row in history.iterrows():
-                if getattr(idx, "tzinfo", None) is not None:
-                    idx = idx.tz_convert(None)
-                date_label = idx.strftime("%Y-%m-%d %H:%M") if range_key == "1d" else idx.strftime("%Y-%m-%d")
-                close_price = float(row.get("Close") or 0)
-                portfolio_points[date_label] = portfolio_points.get(date_label, 0.0) + (close_price * quantity)
-        except Exception as e:
-            logger.warning(f"Error parsing growth data for {holding.ticker}: {e}")
-            continue
-
-    sorted_points = sorted(
-        (PortfolioGrowthPoint(date=date_key, value=round(value, 2)) for date_key, value in portfolio_points.items()),
-        key=lambda point: datetime.fromisoformat(point.date),
-    )
-    if len(sorted_points) > max_points:
-        sorted_points = sorted_points[-max_points:]
-    return sorted_points
+    max_points = _GROWTH_RANGE_CONFIG[range_key][2]
+    labels = prices.index[-max_points:]
+    return [
+        PortfolioGrowthPoint(date=date_key, value=round(float(value), 2))
+        for date_key, value in zip(labels, values[-max_points:])
+    ]
 
 
 @router.post("", response_model=list[HoldingItem], status_code=status.HTTP_201_CREATED, summary="Add or update position")
@@ -344,7 +558,6 @@ def add_or_update_position(
         new_average = ((float(existing.quantity or 0) * float(existing.average_price or 0)) + (body.quantity * body.price)) / new_quantity
         existing.quantity = new_quantity
         existing.average_price = new_average
-        db.commit()
     else:
         db.add(
             Portfolio(
@@ -354,7 +567,8 @@ def add_or_update_position(
                 average_price=body.price,
             )
         )
-        db.commit()
+    portfolio_snapshots.mark_stale(db, current_user.id)
+    db.commit()
 
     return _holdings_list(db, current_user.id)
 
@@ -398,6 +612,7 @@ def _remove_position(
         return _holdings_list(db, current_user.id)
 
     db.delete(position)
+    portfolio_snapshots.mark_stale(db, current_user.id)
     db.commit()
     return _holdings_list(db, current_user.id)
 
@@ -405,13 +620,6 @@ def _remove_position(
 # ============================================
 # Optimized Combined Dashboard Endpoint
 # ============================================
-class PortfolioDashboardResponse(BaseModel):
-    """Combined portfolio dashboard with all key metrics."""
-    holdings: list[HoldingItem]
-    summary: PortfolioSummaryResponse
-    allocation: PortfolioAllocationResponse
-
-
 @router.get("/dashboard/combined", response_model=PortfolioDashboardResponse, summary="Get combined portfolio dashboard")
 def get_portfolio_dashboard(
     current_user: User = Depends(get_current_user),
@@ -427,53 +635,9 @@ def get_portfolio_dashboard(
     logger.info("Portfolio dashboard requested", extra={"user_id": current_user.id})
     
     try:
-        # Fetch enriched holdings once
-        holdings = _enriched_holdings(db, current_user.id)
-        
-        # Calculate summary from holdings
-        total_invested = sum(float(holding.invested_amount or 0) for holding in holdings)
-        current_value = sum(float(holding.current_value or 0) for holding in holdings)
-        day_pl = sum(float(holding.day_change or 0) for holding in holdings)
-        total_pl = current_value - total_invested
-        percent_pl = (total_pl / total_invested * 100) if total_invested > 0 else 0.0
-        day_percent = (day_pl / (current_value - day_pl) * 100) if (current_value - day_pl) > 0 else 0.0
-        
-        summary = PortfolioSummaryResponse(
-            total_invested=round(total_invested, 2),
-            current_value=round(current_value, 2),
-            total_pl=round(total_pl, 2),
-            percent_pl=round(percent_pl, 2),
-            day_pl=round(day_pl, 2),
-            day_percent=round(day_percent, 2),
-            buying_power=0.0,
-        )
-        
-        # Calculate allocation from holdings
-        grouped: dict[str, float] = {}
-        for holding in holdings:
-            category = holding.asset_class or _classify_asset(holding.ticker)
-            grouped[category] = grouped.get(category, 0.0) + float(holding.current_value or 0)
-        
-        allocations = [
-            AllocationItem(
-                category=category,
-                value=round(value, 2),
-                percent=round((value / current_value * 100) if current_value > 0 else 0.0, 2),
-            )
-            for category, value in sorted(grouped.items(), key=lambda item: item[1], reverse=True)
-        ]
-        
-        allocation = PortfolioAllocationResponse(
-            total_value=round(current_value, 2),
-            allocations=allocations,
-        )
-        
-        return PortfolioDashboardResponse(
-            holdings=holdings,
-            summary=summary,
-            allocation=allocation,
-        )
-    
+        # One valuation (latest snapshot or live) for holdings, summary and allocation
+        return _portfolio_valuation(db, current_user.id)
+
     except Exception as e:
         logger.error(f"Error in portfolio dashboard: {e}")
         # Return minimal response on error instead of crashing
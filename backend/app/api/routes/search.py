@@ -1,56 +1,25 @@
 from __future__ import annotations
 
 import time
-import threading
 import logging
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
-from typing import Any, Dict, List, Optional
-from dataclasses import dataclass
+from typing import Any, Dict, List
 
 import requests
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 
 from app.config import settings
+from app.core.cache import search_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/search", tags=["search"])
 
 # ============================================================================
-# SEARCH CACHING - 30 second TTL
+# SEARCH CACHING - 30 second TTL (bounded shared cache, see app.core.cache)
 # ============================================================================
 SEARCH_CACHE_TTL_SECONDS = 30
 
-@dataclass(frozen=True)
-class _SearchCacheEntry:
-    results: List[Dict[str, Any]]
-    expires_at: float
-
-
-_search_cache: Dict[str, _SearchCacheEntry] = {}
-_search_cache_lock = threading.Lock()
-
-
-def _get_search_from_cache(query: str) -> Optional[List[Dict[str, Any]]]:
-    """Get cached search results if still valid (30 sec TTL)."""
-    now = time.time()
-    with _search_cache_lock:
-        entry = _search_cache.get(query)
-        if entry and entry.expires_at > now:
-            logger.debug(f"Search cache HIT for '{query}'")
-            return entry.results
-        if entry and entry.expires_at <= now:
-            del _search_cache[query]  # Clean expired
-    return None
-
-
-def _cache_search_results(query: str, results: List[Dict[str, Any]]) -> None:
-    """Cache search results with 30-second TTL."""
-    expires_at = time.time() + SEARCH_CACHE_TTL_SECONDS
-    with _search_cache_lock:
-        _search_cache[query] = _SearchCacheEntry(results=results, expires_at=expires_at)
-    logger.debug(f"Cached search results for '{query}' ({len(results)} results)")
-
 
 class SymbolSearchItem(BaseModel):
   ticker: str = Field(..., description="Ticker symbol (e.g. TSLA)")
@@ -123,7 +92,7 @@ def search_symbols(q: str = Query(..., min_length=1, max_length=64)) -> list[Sym
   start_time = time.time()
   
   # STEP 1: Check cache first
-  cached_results = _get_search_from_cache(q)
+  cached_results = search_cache.get(q)
   if cached_results is not None:
     items: list[SymbolSearchItem] = []
     for r in cached_results:
@@ -138,12 +107,9 @@ def search_symbols(q: str = Query(..., min_length=1, max_length=64)) -> list[Sym
     logger.info(f"✓ Search cache HIT for '{q}' ({fetch_time:.1f}ms)")
     return items
 
-  # STEP 2: Fetch from Finnhub with timeout protection
+  # STEP 2: Fetch from Finnhub with timeout protection (one request per query)
   logger.debug(f"Search cache miss for '{q}', fetching from Finnhub...")
-  raw_results = _finnhub_symbol_search(q)
-  
-  # Cache the results for future requests
-  _cache_search_results(q, raw_results)
+  raw_results = search_cache.get_or_set(q, lambda: _finnhub_symbol_search(q), SEARCH_CACHE_TTL_SECONDS)
   
   items: list[SymbolSearchItem] = []
   for r in raw_results:
@@ -1,9 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
 import re
-import threading
-import time
 from typing import List, Literal
 from datetime import datetime, timezone
 
@@ -11,12 +9,14 @@ from fastapi import APIRouter, Depends, Path
 from pydantic import BaseModel, Field
 
 from app.api.deps import get_current_user
+from app.config import settings
+from app.core.cache import sentiment_cache
 from app.services.news_service import get_stock_news
 from app.models.user import User
 
 router = APIRouter(prefix="/sentiment", tags=["sentiment"])
 
-_CACHE_TTL_SECONDS = 10 * 60  # 10 minutes
+_CACHE_TTL_SECONDS = settings.CACHE_SENTIMENT_SOFT_TTL_SECONDS  # Fresh for 10 minutes, then stale-while-revalidate
 
 
 SentimentLabel = Literal["bullish", "neutral", "bearish"]
@@ -39,35 +39,6 @@ class SentimentResponse(BaseModel):
     articles: List[SentimentArticle]
 
 
-# ---- Simple in-memory cache (per process) ----
-@dataclass(frozen=True)
-class _CacheEntry:
-    expires_at_monotonic: float
-    value: SentimentResponse
-
-
-_cache_lock = threading.Lock()
-_cache: dict[str, _CacheEntry] = {}
-
-
-def _cache_get(ticker: str) -> SentimentResponse | None:
-    now = time.monotonic()
-    with _cache_lock:
-        entry = _cache.get(ticker)
-        if not entry:
-            return None
-        if entry.expires_at_monotonic <= now:
-            _cache.pop(ticker, None)
-            return None
-        return entry.value
-
-
-def _cache_set(ticker: str, value: SentimentResponse) -> None:
-    expires = time.monotonic() + _CACHE_TTL_SECONDS
-    with _cache_lock:
-        _cache[ticker] = _CacheEntry(expires_at_monotonic=expires, value=value)
-
-
 # ---- Lightweight sentiment scoring (rule-based) ----
 _POS_WORDS = {
     "beats",
@@ -191,15 +162,21 @@ async def get_ticker_sentiment(
     Combines:
     - News fetch (Finnhub company-news via news service)
     - Lightweight rule-based sentiment over article headlines
-    Cached per ticker for 10 minutes (in-memory, per process).
+    Cached per ticker (in-memory, per process): fresh for 10 minutes, then
+    served stale while refreshed in the background; concurrent misses for
+    the same ticker are coalesced into one computation.
     """
     ticker_upper = ticker.upper().strip()
-    cached = _cache_get(ticker_upper)
-    if cached is not None:
-        return cached
+    return await sentiment_cache.aget_or_set(
+        f"ticker:{ticker_upper}",
+        lambda: _build_sentiment(ticker_upper),
+        _CACHE_TTL_SECONDS,
+    )
+
 
-    # Use service layer to get news
-    raw_news = get_stock_news(ticker_upper, limit=10)
+async def _build_sentiment(ticker_upper: str) -> SentimentResponse:
+    # Use service layer to get news (blocking HTTP, keep it off the event loop)
+    raw_news = await asyncio.to_thread(get_stock_news, ticker_upper, limit=10)
     articles: List[SentimentArticle] = []
     raw_scores: List[float] = []
 
@@ -234,6 +211,5 @@ async def get_ticker_sentiment(
         score=round(_normalize_01(avg_raw), 2),
         articles=articles,
     )
-    _cache_set(ticker_upper, response)
     return response
 
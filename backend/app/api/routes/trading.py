@@ -13,6 +13,7 @@ from app.api.deps import get_current_user, get_db_session
 from app.models.user import User
 from app.models.trading import Trade, TradeHistory, TradeStatus, TradeType
 from app.models.portfolio import Portfolio
+from app.services import portfolio_snapshots
 from app.schemas.trading import (
     TradeCreate,
     TradeRead,
@@ -100,6 +101,9 @@ def _update_portfolio_from_trade(
             portfolio.quantity = 0
             db.delete(portfolio)
 
+    # Committed with the trade; the next portfolio read revalues
+    portfolio_snapshots.mark_stale(db, user_id)
+
 
 @router.post("/", response_model=TradeRead, status_code=status.HTTP_201_CREATED)
 def create_trade(
@@ -3,7 +3,10 @@ WebSocket routes for real-time stock price streaming and alert notifications.
 """
 
 import json
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.config import settings
+from app.ws.fanout import WireFormat
 from app.ws.connection_manager import manager, alert_manager
 from app.ws.price_streamer import streamer
 import logging
@@ -13,8 +16,43 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
 
+def _valid_symbol(symbol) -> bool:
+    """Same basic validation as the path parameter of /ws/stocks/{symbol}."""
+    return isinstance(symbol, str) and 0 < len(symbol) <= 5 and symbol.isalpha()
+
+
+async def _ensure_stream(symbol: str):
+    """Start the price stream of a symbol if no client started it yet."""
+    stream_task_name = f"stream_{symbol}"
+    if stream_task_name not in streamer.get_active_streams():
+        await streamer.start_streaming(
+            symbol,
+            callback=manager.broadcast,
+            task_name=stream_task_name
+        )
+
+
+def _negotiate_wire(mode: Optional[str], encoding: Optional[str]) -> Optional[WireFormat]:
+    """Wire format from the ?mode=&encoding= query (None = legacy default)."""
+    if mode is None and encoding is None:
+        return None
+    return WireFormat.negotiate(mode, encoding)
+
+
+async def _release_stream(symbol: str):
+    """Stop the price stream of a symbol once its last client is gone."""
+    if manager.get_connection_count(symbol) == 0:
+        await streamer.stop_streaming(f"stream_{symbol}")
+        logger.info(f"Stopped streaming {symbol} - no active connections")
+
+
 @router.websocket("/stocks/{symbol}")
-async def websocket_stock_price(websocket: WebSocket, symbol: str):
+async def websocket_stock_price(
+    websocket: WebSocket,
+    symbol: str,
+    mode: Optional[str] = None,
+    encoding: Optional[str] = None,
+):
     """
     WebSocket endpoint for streaming real-time stock prices.
     
@@ -22,6 +60,14 @@ async def websocket_stock_price(websocket: WebSocket, symbol: str):
     
     Example:
         ws://localhost:8000/ws/stocks/AAPL
+        ws://localhost:8000/ws/stocks/AAPL?mode=delta&encoding=msgpack
+    
+    Optional query parameters (negotiated once, answered by a JSON
+    {"type": "hello", "mode": ..., "encoding": ...} frame):
+        mode: "full" (default) or "delta" - after the first snapshot only
+            changed fields are sent, with "delta": true
+        encoding: "json" (default) or "msgpack" (binary frames; falls back
+            to json when the server lacks msgpack)
     
     Receives:
         {
@@ -41,18 +87,18 @@ async def websocket_stock_price(websocket: WebSocket, symbol: str):
     
     symbol = symbol.upper()
     
+    try:
+        wire = _negotiate_wire(mode, encoding)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    
     try:
         # Connect this client
-        await manager.connect(websocket, symbol)
+        await manager.connect(websocket, symbol, wire=wire)
         
         # Start streaming for this symbol if not already streaming
-        stream_task_name = f"stream_{symbol}"
-        if stream_task_name not in streamer.get_active_streams():
-            await streamer.start_streaming(
-                symbol,
-                callback=manager.broadcast,
-                task_name=stream_task_name
-            )
+        await _ensure_stream(symbol)
         
         logger.info(f"WebSocket connected for {symbol}")
         
@@ -67,7 +113,7 @@ async def websocket_stock_price(websocket: WebSocket, symbol: str):
                     message = json.loads(data)
                     if message.get('type') == 'ping':
                         # Send pong response to keep connection alive
-                        await websocket.send_text(json.dumps({'type': 'pong'}))
+                        await manager.send(websocket, {"type": "pong"})
                         logger.debug(f"Heartbeat received and pong sent for {symbol}")
                         continue
                 except:
@@ -85,10 +131,105 @@ async def websocket_stock_price(websocket: WebSocket, symbol: str):
         await manager.disconnect(websocket, symbol)
         
         # Stop streaming if no more clients for this symbol
-        if manager.get_connection_count(symbol) == 0:
-            stream_task_name = f"stream_{symbol}"
-            await streamer.stop_streaming(stream_task_name)
-            logger.info(f"Stopped streaming {symbol} - no active connections")
+        await _release_stream(symbol)
+
+
+@router.websocket("/stream")
+async def websocket_multiplexed(
+    websocket: WebSocket,
+    mode: Optional[str] = None,
+    encoding: Optional[str] = None,
+):
+    """
+    Multiplexed WebSocket endpoint: many symbols over one connection.
+    
+    Path: /ws/stream (accepts the same ?mode=&encoding= query as /ws/stocks)
+    
+    Sends:
+        {"type": "subscribe", "symbols": ["AAPL", "MSFT"]}
+        {"type": "unsubscribe", "symbols": ["MSFT"]}
+        {"type": "ping"}
+    
+    Receives:
+        {"type": "subscribed", "symbols": ["AAPL", "MSFT"], "rejected": []}
+        {"type": "unsubscribed", "symbols": ["MSFT"]}
+        {"type": "prices", "updates": [{"symbol": "AAPL", "price": 180.25, ...}]}
+        {"type": "error", "message": "..."}
+        {"type": "pong"}
+    
+    Updates for all subscribed symbols are coalesced into one "prices"
+    frame per tick; each update has the same fields as /ws/stocks/{symbol}.
+    """
+    subscribed = set()
+    
+    try:
+        wire = _negotiate_wire(mode, encoding)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    
+    try:
+        await manager.connect_multiplexed(websocket, wire=wire)
+        
+        while True:
+            try:
+                data = await websocket.receive_text()
+            except WebSocketDisconnect:
+                break
+            
+            try:
+                message = json.loads(data)
+            except ValueError:
+                await manager.send(websocket, {"type": "error", "message": "Invalid JSON"})
+                continue
+            if not isinstance(message, dict):
+                await manager.send(websocket, {"type": "error", "message": "Expected a JSON object"})
+                continue
+            
+            message_type = message.get("type")
+            if message_type == "ping":
+                await manager.send(websocket, {"type": "pong"})
+                continue
+            
+            if message_type not in ("subscribe", "unsubscribe"):
+                await manager.send(websocket, {"type": "error", "message": f"Unknown message type: {message_type}"})
+                continue
+            
+            requested = message.get("symbols") or []
+            if not isinstance(requested, list):
+                requested = [requested]
+            valid = list(dict.fromkeys(s.upper() for s in requested if _valid_symbol(s)))
+            rejected = [s for s in requested if not _valid_symbol(s)]
+            
+            if message_type == "subscribe":
+                room = settings.WS_MAX_SYMBOLS_PER_CONNECTION - len(subscribed)
+                new_symbols = [s for s in valid if s not in subscribed]
+                rejected += new_symbols[max(room, 0):]
+                new_symbols = new_symbols[:max(room, 0)]
+                
+                for symbol in await manager.subscribe(websocket, new_symbols):
+                    subscribed.add(symbol)
+                    await _ensure_stream(symbol)
+                await manager.send(websocket, {
+                    "type": "subscribed",
+                    "symbols": sorted(subscribed),
+                    "rejected": rejected,
+                })
+            else:
+                removed = await manager.unsubscribe(websocket, valid)
+                for symbol in removed:
+                    subscribed.discard(symbol)
+                    await _release_stream(symbol)
+                await manager.send(websocket, {"type": "unsubscribed", "symbols": removed})
+    
+    except Exception as e:
+        logger.error(f"WebSocket error in multiplexed stream: {e}")
+    
+    finally:
+        await manager.disconnect_all(websocket)
+        for symbol in subscribed:
+            await _release_stream(symbol)
+        logger.info(f"Multiplexed client disconnected ({len(subscribed)} symbols)")
 
 
 @router.websocket("/alerts")
@@ -133,7 +274,7 @@ async def websocket_alerts(websocket: WebSocket):
                     message = json.loads(data)
                     if message.get('type') == 'ping':
                         # Send pong response
-                        await websocket.send_text(json.dumps({'type': 'pong'}))
+                        await alert_manager.send(websocket, {"type": "pong"})
                         logger.debug("Heartbeat pong sent")
                 except:
                     pass
@@ -161,6 +302,9 @@ async def websocket_status():
             for symbol in manager.get_all_symbols()
         },
         "active_streams": streamer.get_active_streams(),
+        "ingestion": streamer.stats(),
+        "fanout": manager.stats(),
+        "alert_fanout": alert_manager.stats(),
         "total_connections": sum(
             manager.get_connection_count(symbol)
             for symbol in manager.get_all_symbols()
@@ -44,6 +44,62 @@ class Settings(BaseSettings):
     # External APIs
     FINNHUB_API_KEY: str | None = None
 
+    # Market Data Gateway (shared quote/OHLCV cache for all routes and jobs)
+    MARKET_DATA_QUOTE_TTL_SECONDS: int = 5  # Live quotes
+    MARKET_DATA_INTRADAY_TTL_SECONDS: int = 30  # Bars with interval < 1d
+    MARKET_DATA_DAILY_TTL_SECONDS: int = 300  # Daily / weekly bars
+    MARKET_DATA_NEGATIVE_TTL_SECONDS: int = 5  # Remember "no data" answers briefly
+    MARKET_DATA_QUOTE_TIMEOUT_SECONDS: float = 2.0
+    MARKET_DATA_HISTORY_TIMEOUT_SECONDS: float = 5.0
+    MARKET_DATA_BATCH_CHUNK_SIZE: int = 100  # Symbols per batched history download
+    MARKET_DATA_BATCH_WORKERS: int = 4  # Chunks downloaded concurrently
+    MARKET_DATA_QUOTE_WORKERS: int = 16  # Cold quotes resolved concurrently by resolve_quotes()
+
+    # Bulk indicators (POST /api/indicators/bulk, NDJSON)
+    INDICATOR_BULK_MAX_SYMBOLS: int = 500  # Symbols per request
+    INDICATOR_BULK_CHUNK_SIZE: int = 25  # Symbols per batch download (results stream per chunk)
+    INDICATOR_BULK_CONCURRENCY: int = 4  # Batch downloads in flight per request
+
+    # WebSocket price ingestion (app.ws.price_feed)
+    PRICE_FEED: str = "poll"  # "poll" = batched gateway quotes, "replay" = recorded ticks
+    PRICE_FEED_REPLAY_FILE: str = ""  # JSONL recording used when PRICE_FEED=replay
+
+    # WebSocket fan-out (app.ws.fanout)
+    WS_SEND_QUEUE_SIZE: int = 64  # Frames buffered per client
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0  # A single send slower than this drops the client
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # "drop_oldest", "drop_newest" or "disconnect"
+    WS_MAX_DROPPED_MESSAGES: int = 256  # Consecutive drops before a slow client is disconnected
+    WS_COALESCE_MS: int = 50  # Window for batching multiplexed updates into one frame per client
+    WS_CONFLATE_PENDING: int = 8  # Queued frames after which a client only gets the latest price per symbol
+    WS_MAX_SYMBOLS_PER_CONNECTION: int = 100  # Subscription limit on /ws/stream
+    WS_BACKPLANE: str = "memory"  # "memory" = single process, "postgres" = LISTEN/NOTIFY across workers
+    WS_BACKPLANE_INTEREST_SECONDS: int = 5  # Leader election / symbol announcement interval
+
+    # Local OHLCV history store (app.services.history_store)
+    HISTORY_STORE_DIR: str = "data/history"  # One .npz per symbol/interval; "" = memory only
+    HISTORY_STORE_MAX_DAILY_BARS: int = 2600  # ~10 years of sessions
+    HISTORY_STORE_MAX_INTRADAY_BARS: int = 20000
+    HISTORY_STORE_MAX_SERIES: int = 2000  # Least recently used series are dropped from memory
+
+    # In-process caches (app.core.cache)
+    CACHE_DEFAULT_MAX_ENTRIES: int = 10000  # Per cache; 0 = unbounded
+    CACHE_CANDLE_MAX_MB: int = 128  # Byte budget for cached OHLCV frames
+    CACHE_SWEEP_INTERVAL_SECONDS: int = 60  # Background expiry sweep
+    CACHE_REFRESH_WORKERS: int = 4  # Threads for stale-while-revalidate refreshes
+    CACHE_INDICATOR_BUNDLE_TTL_SECONDS: int = 60  # Per-symbol indicator bundles (one history fetch each)
+
+    # Stale-while-revalidate: soft TTL = fresh, hard TTL = oldest value served
+    # instantly while a background refresh runs (quote/candle soft TTLs above)
+    CACHE_QUOTES_HARD_TTL_SECONDS: int = 60
+    CACHE_CANDLES_INTRADAY_HARD_TTL_SECONDS: int = 300
+    CACHE_CANDLES_DAILY_HARD_TTL_SECONDS: int = 3600
+    CACHE_MARKET_SUMMARY_SOFT_TTL_SECONDS: int = 10
+    CACHE_MARKET_SUMMARY_HARD_TTL_SECONDS: int = 300
+    CACHE_NEWS_SOFT_TTL_SECONDS: int = 60
+    CACHE_NEWS_HARD_TTL_SECONDS: int = 900
+    CACHE_SENTIMENT_SOFT_TTL_SECONDS: int = 600
+    CACHE_SENTIMENT_HARD_TTL_SECONDS: int = 3600
+
     # Email Configuration
     # ✅ CRITICAL FIX: Email credentials MUST be provided via environment variables
     # No default values; will fail if not set (protecting against credential exposure)
@@ -60,6 +116,24 @@ class Settings(BaseSettings):
     ENABLE_EMAIL_NOTIFICATIONS: bool = True
     EMAIL_NOTIFICATION_RETRY_COUNT: int = 3
 
+    # Notification outbox (app.services.notification_outbox)
+    OUTBOX_DISPATCHER_ENABLED: bool = True  # Drain the outbox in this process
+    OUTBOX_BATCH_SIZE: int = 100  # Rows claimed per drain
+    OUTBOX_POLL_SECONDS: float = 1.0  # Idle poll interval (triggers also wake the dispatcher)
+    OUTBOX_MAX_ATTEMPTS: int = 5  # Then the row is marked failed
+    OUTBOX_LOCK_SECONDS: int = 120  # Claimed rows of a crashed dispatcher are retried after this
+    OUTBOX_EMAIL_CONCURRENCY: int = 10
+    OUTBOX_WHATSAPP_CONCURRENCY: int = 5
+    OUTBOX_WEBSOCKET_CONCURRENCY: int = 50
+    OUTBOX_RETENTION_HOURS: int = 72  # Sent rows are purged after this
+
+    # Portfolio valuation snapshots (app.services.portfolio_snapshots)
+    PORTFOLIO_SNAPSHOTS_ENABLED: bool = True  # Run the snapshot job in this process (one process is enough)
+    PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS: int = 60  # Every portfolio is revalued this often
+    PORTFOLIO_SNAPSHOT_MAX_AGE_SECONDS: int = 90  # Older snapshots are revalued on read
+    PORTFOLIO_SNAPSHOT_COMPACT_AFTER_HOURS: int = 48  # Then only the last snapshot per user and day is kept
+    PORTFOLIO_SNAPSHOT_RETENTION_DAYS: int = 400
+
     # WhatsApp Configuration (Twilio)
     ENABLE_WHATSAPP_NOTIFICATIONS: bool = False  # Set to True to enable WhatsApp alerts
     TWILIO_ACCOUNT_SID: str | None = None
@@ -70,6 +144,14 @@ class Settings(BaseSettings):
     ALERT_COOLDOWN_MINUTES: int = 10  # Minutes between duplicate alert sends
     ALERT_DEV_MODE: bool = False  # Skip cooldown for testing (set to True locally)
     ALERT_LOG_COOLDOWN_CHECKS: bool = True  # Log when cooldown is active (verbose)
+    ALERT_PIPELINE_ASYNC: bool = True  # Run alert checks on the app event loop (False = scheduler thread)
+    ALERT_FETCH_CONCURRENCY: int = 8  # Batch history downloads in flight per tick
+    ALERT_NOTIFY_CONCURRENCY: int = 20  # Notifications dispatched concurrently
+    ALERT_DB_WORKERS: int = 4  # Threads for the async pipeline's database steps
+    ALERT_SCHEDULER_ENABLED: bool = True  # Set False on API processes when `python -m app.services.alert_worker` runs
+    ALERT_SHARD_COUNT: int = 64  # Fixed symbol-hash shards split across alert workers
+    ALERT_WORKER_INTERVAL_SECONDS: int = 30  # Tick interval of an alert worker
+    ALERT_WORKER_LEASE_SECONDS: int = 90  # Shard lease / heartbeat lifetime (a dead worker's shards move after this)
 
     class Config:
         env_file = ".env"
@@ -6,67 +6,212 @@ Features:
   - Simple key-value storage
   - Automatic expiration handling
   - Used across all API calls to prevent duplicate requests
+  - Concurrent misses on the same key share one computation (single-flight)
+  - Bounded size: max entries and/or byte budget with LRU or LFU eviction,
+    O(1) per evicted key (LFU keeps keys in per-hit-count buckets)
+  - Expired keys are dropped on read and by a background sweeper, never
+    by scanning on the write path
+  - Hit/miss/eviction counters in stats()
+  - Stale-while-revalidate: soft TTL (fresh) + hard TTL (servable while a
+    background refresh runs) per cache namespace
 """
 
+import logging
+import sys
 import threading
 import time
-from typing import Any, Optional, TypeVar, Generic, Dict
+import weakref
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar, Generic
+
+from app.config import settings
+from app.core.singleflight import AsyncSingleFlight, SingleFlight
+
+logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Approximate memory footprint of a cached value in bytes.
+    
+    Cheap, not exact: DataFrames/arrays report their buffers, containers are
+    walked two levels deep, pydantic models via their field dict.
+    """
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            usage = memory_usage(index=True, deep=False)
+            return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+        except Exception:
+            pass
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+
+    size = sys.getsizeof(value)
+    if _depth >= 2:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), _depth + 1)
+    return size
+
 
 class CacheEntry(Generic[T]):
-    """Single cache entry with expiration tracking."""
+    """
+    Single cache entry with expiration tracking.
     
-    def __init__(self, value: T, ttl_seconds: int):
+    fresh_until_monotonic is the soft TTL; between it and expires_at_monotonic
+    (the hard TTL) the value is stale but may still be served.
+    """
+    
+    __slots__ = ("value", "fresh_until_monotonic", "expires_at_monotonic", "size_bytes", "hits")
+    
+    def __init__(self, value: T, ttl_seconds: int, size_bytes: int = 0, stale_ttl_seconds: int = 0):
+        now = time.monotonic()
         self.value = value
-        self.expires_at_monotonic = time.monotonic() + ttl_seconds
+        self.fresh_until_monotonic = now + ttl_seconds
+        self.expires_at_monotonic = self.fresh_until_monotonic + max(stale_ttl_seconds, 0)
+        self.size_bytes = size_bytes
+        self.hits = 0
     
-    def is_expired(self) -> bool:
-        """Check if this entry has expired."""
-        return time.monotonic() >= self.expires_at_monotonic
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """Check if this entry is past its hard TTL."""
+        return (now if now is not None else time.monotonic()) >= self.expires_at_monotonic
+    
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        """Check if this entry is past its soft TTL."""
+        return (now if now is not None else time.monotonic()) >= self.fresh_until_monotonic
 
 
 class Cache(Generic[T]):
     """
-    Thread-safe TTL cache.
+    Thread-safe, size-bounded TTL cache.
     
     Usage:
         cache = Cache(ttl_seconds=300)
         cache.set('user:1:data', some_data)
         data = cache.get('user:1:data')
+    
+        # Bounded: at most 1000 keys / 16 MB, least recently used evicted first
+        cache = Cache(ttl_seconds=30, max_entries=1000, max_bytes=16 * 1024 * 1024)
+    
+        # Stale-while-revalidate: fresh for 10s, then served for up to 5 more
+        # minutes while get_or_set() refreshes it in the background
+        cache = Cache(ttl_seconds=10, stale_ttl_seconds=300)
+        summary = cache.get_or_set('summary', build_summary)
     """
     
-    def __init__(self, ttl_seconds: int = 300):
+    def __init__(
+        self,
+        ttl_seconds: int = 300,
+        name: str = "cache",
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        eviction: str = "lru",
+        stale_ttl_seconds: int = 0,
+    ):
         """
         Initialize cache.
         
         Args:
             ttl_seconds: Time-to-live for all entries (default: 5 minutes)
+            name: Label used in statistics
+            max_entries: Max number of keys (default: settings.CACHE_DEFAULT_MAX_ENTRIES, 0 = unbounded)
+            max_bytes: Optional approximate memory budget for all values
+            eviction: "lru" (least recently used) or "lfu" (least frequently used)
+            stale_ttl_seconds: Extra window after ttl_seconds during which
+                get_or_set() serves the stale value and refreshes in the background
         """
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of {EVICTION_POLICIES}, got {eviction!r}")
+        
         self.ttl_seconds = ttl_seconds
-        self._storage: Dict[str, CacheEntry[Any]] = {}
+        self.name = name
+        self.max_entries = settings.CACHE_DEFAULT_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self.stale_ttl_seconds = stale_ttl_seconds
+        # Insertion/access ordered: first key is the LRU eviction candidate
+        self._storage: "OrderedDict[str, CacheEntry[Any]]" = OrderedDict()
+        # LFU only: hit count -> keys with that count, oldest first
+        self._lfu_buckets: "Dict[int, OrderedDict[str, None]]" = {}
         self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._stale_hits = 0
+        self._refreshes = 0
+        self._refresh_errors = 0
+        self._refreshing: set = set()
+        self._flight = SingleFlight(name)
+        self._async_flight = AsyncSingleFlight(f"{name}_async")
+        _register_cache(self)
     
     def get(self, key: str) -> Optional[T]:
         """
         Get value from cache.
         
-        Returns None if key doesn't exist or is expired.
+        Returns None if key doesn't exist or is expired (stale counts as expired).
         """
+        result = self.get_stale(key)
+        if result is None:
+            return None
+        value, is_stale = result
+        return None if is_stale else value
+    
+    def get_stale(self, key: str) -> Optional[Tuple[T, bool]]:
+        """
+        Get value and staleness from cache.
+        
+        Returns (value, is_stale) while the entry is within its hard TTL,
+        None if the key doesn't exist or is hard-expired.
+        """
+        now = time.monotonic()
         with self._lock:
             entry = self._storage.get(key)
             if entry is None:
+                self._misses += 1
                 return None
             
-            if entry.is_expired():
+            if entry.is_expired(now):
                 # Clean up expired entry
-                del self._storage[key]
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
                 return None
             
-            return entry.value
+            is_stale = entry.is_stale(now)
+            if is_stale:
+                self._stale_hits += 1
+            else:
+                self._hits += 1
+            if self.eviction == "lru":
+                self._storage.move_to_end(key)
+            else:
+                self._lfu_unlink(key, entry.hits)
+                self._lfu_buckets.setdefault(entry.hits + 1, OrderedDict())[key] = None
+            entry.hits += 1
+            return entry.value, is_stale
     
-    def set(self, key: str, value: T, ttl_seconds: Optional[int] = None) -> None:
+    def set(
+        self,
+        key: str,
+        value: T,
+        ttl_seconds: Optional[int] = None,
+        stale_ttl_seconds: Optional[int] = None,
+    ) -> None:
         """
         Set value in cache.
         
@@ -74,64 +219,379 @@ class Cache(Generic[T]):
             key: Cache key
             value: Value to cache
             ttl_seconds: Optional custom TTL (uses instance default if not provided)
+            stale_ttl_seconds: Optional custom stale window (instance default if not provided)
         """
         ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        stale_ttl = stale_ttl_seconds if stale_ttl_seconds is not None else self.stale_ttl_seconds
+        size_bytes = estimate_size(value) if self.max_bytes else 0
         with self._lock:
-            self._storage[key] = CacheEntry(value, ttl)
+            if key in self._storage:
+                self._remove(key)
+            self._storage[key] = CacheEntry(value, ttl, size_bytes, stale_ttl)
+            if self.eviction == "lfu":
+                self._lfu_buckets.setdefault(0, OrderedDict())[key] = None
+            self._total_bytes += size_bytes
+            self._enforce_limits(protect=key)
     
     def delete(self, key: str) -> None:
         """Delete a cache entry."""
         with self._lock:
-            self._storage.pop(key, None)
+            if key in self._storage:
+                self._remove(key)
     
     def clear(self) -> None:
         """Clear all cache entries."""
         with self._lock:
             self._storage.clear()
+            self._lfu_buckets.clear()
+            self._total_bytes = 0
+    
+    def purge_expired(self) -> int:
+        """Remove every expired entry; returns how many were dropped."""
+        now = time.monotonic()
+        with self._lock:
+            expired_keys = [key for key, entry in self._storage.items() if entry.is_expired(now)]
+            for key in expired_keys:
+                self._remove(key)
+            self._expirations += len(expired_keys)
+        return len(expired_keys)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._storage)
+    
+    # ------------------------------------------------------------------
+    # Eviction (callers hold self._lock)
+    # ------------------------------------------------------------------
+    
+    def _remove(self, key: str) -> None:
+        entry = self._storage.pop(key)
+        self._total_bytes -= entry.size_bytes
+        if self.eviction == "lfu":
+            self._lfu_unlink(key, entry.hits)
+    
+    def _lfu_unlink(self, key: str, hits: int) -> None:
+        bucket = self._lfu_buckets[hits]
+        del bucket[key]
+        if not bucket:
+            del self._lfu_buckets[hits]
+    
+    def _over_budget(self) -> bool:
+        if self.max_entries and len(self._storage) > self.max_entries:
+            return True
+        return bool(self.max_bytes) and self._total_bytes > self.max_bytes
+    
+    def _enforce_limits(self, protect: str) -> None:
+        # Expired keys are left to reads and the sweeper: scanning for them
+        # here would make every set() on a full cache O(n) under the lock
+        while self._over_budget() and len(self._storage) > 1:
+            victim = self._pick_victim(protect)
+            self._remove(victim)
+            self._evictions += 1
     
-    def get_or_set(self, key: str, default_factory, ttl_seconds: Optional[int] = None) -> T:
+    def _pick_victim(self, protect: str) -> str:
+        # The protected key was just appended, so it is never at the head of
+        # its bucket (LFU) or of _storage (LRU) while another key remains
+        if self.eviction == "lfu":
+            # Fewest hits; ties broken by age within the bucket
+            lowest = min(self._lfu_buckets)
+            key = next(iter(self._lfu_buckets[lowest]))
+            if key == protect:
+                lowest = min(hits for hits in self._lfu_buckets if hits != lowest)
+                key = next(iter(self._lfu_buckets[lowest]))
+            return key
+        return next(iter(self._storage))
+    
+    def get_or_set(
+        self,
+        key: str,
+        default_factory: Callable[[], T],
+        ttl_seconds: Optional[int] = None,
+        stale_ttl_seconds: Optional[int] = None,
+    ) -> T:
         """
         Get value from cache, or compute and cache a default.
         
+        Concurrent callers missing the same key wait for a single
+        default_factory() call instead of each running their own. A stale
+        value (past soft TTL, within hard TTL) is returned immediately and
+        refreshed in the background.
+        
         Args:
             key: Cache key
             default_factory: Callable that returns default value if key not found
             ttl_seconds: Optional custom TTL
+            stale_ttl_seconds: Optional custom stale window
         
         Returns:
             Cached value or newly computed default
         """
-        value = self.get(key)
-        if value is not None:
+        def _load() -> T:
+            # Another leader may have filled the key while we queued
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            computed = default_factory()
+            self.set(key, computed, ttl_seconds, stale_ttl_seconds)
+            return computed
+        
+        result = self.get_stale(key)
+        if result is not None:
+            value, is_stale = result
+            if is_stale:
+                self.refresh_in_background(key, _load)
             return value
         
-        # Compute default
-        value = default_factory()
-        self.set(key, value, ttl_seconds)
-        return value
+        return self._flight.do(key, _load)
+    
+    async def aget_or_set(
+        self,
+        key: str,
+        default_factory: Callable[[], Awaitable[T]],
+        ttl_seconds: Optional[int] = None,
+        stale_ttl_seconds: Optional[int] = None,
+    ) -> T:
+        """
+        Async variant of get_or_set for coroutine factories.
+        
+        Concurrent tasks missing the same key await a single default_factory();
+        stale values are returned at once and refreshed in a background task.
+        """
+        async def _load() -> T:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            computed = await default_factory()
+            self.set(key, computed, ttl_seconds, stale_ttl_seconds)
+            return computed
+        
+        result = self.get_stale(key)
+        if result is not None:
+            value, is_stale = result
+            if is_stale:
+                self._refresh_async(key, _load)
+            return value
+        
+        return await self._async_flight.do(key, _load)
+    
+    def coalesce(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn once for all concurrent callers of key (no caching by itself)."""
+        return self._flight.do(key, fn)
+    
+    def refresh_in_background(self, key: str, fn: Callable[[], Any]) -> bool:
+        """
+        Run fn on the shared refresh pool unless a refresh for key is already queued.
+        
+        fn is responsible for storing the new value. Returns True if a refresh
+        was scheduled.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._refreshes += 1
+        
+        def _run() -> None:
+            try:
+                self._flight.do(key, fn)
+            except Exception as e:
+                with self._lock:
+                    self._refresh_errors += 1
+                logger.warning(f"Background refresh failed for {self.name}:{key}: {str(e)[:100]}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        
+        _get_refresh_executor().submit(_run)
+        return True
+    
+    def _refresh_async(self, key: str, load: Callable[[], Awaitable[Any]]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._refreshes += 1
+        
+        async def _run() -> None:
+            try:
+                await self._async_flight.do(key, load)
+            except Exception as e:
+                with self._lock:
+                    self._refresh_errors += 1
+                logger.warning(f"Background refresh failed for {self.name}:{key}: {str(e)[:100]}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        
+        # The loop only keeps weak references to tasks; hold one until done
+        task = asyncio.ensure_future(_run())
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
     
     def stats(self) -> dict:
         """Get cache statistics."""
+        now = time.monotonic()
         with self._lock:
-            expired_count = sum(1 for entry in self._storage.values() if entry.is_expired())
-            return {
+            expired_count = sum(1 for entry in self._storage.values() if entry.is_expired(now))
+            lookups = self._hits + self._misses
+            stats = {
+                "name": self.name,
                 "total_entries": len(self._storage),
                 "expired_entries": expired_count,
                 "active_entries": len(self._storage) - expired_count,
+                "max_entries": self.max_entries or None,
+                "size_bytes": self._total_bytes if self.max_bytes else None,
+                "max_bytes": self.max_bytes,
+                "eviction": self.eviction,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "background_refreshes": self._refreshes,
+                "refresh_errors": self._refresh_errors,
+                "stale_ttl_seconds": self.stale_ttl_seconds,
             }
+        sync_flight = self._flight.stats()
+        async_flight = self._async_flight.stats()
+        stats["coalesced_calls"] = sync_flight["coalesced"] + async_flight["coalesced"]
+        stats["in_flight"] = sync_flight["in_flight"] + async_flight["in_flight"]
+        return stats
+
+
+# ============================================================================
+# Cache registry and background expiry sweeper
+# ============================================================================
+
+_caches: "weakref.WeakSet[Cache[Any]]" = weakref.WeakSet()
+_caches_lock = threading.Lock()
+_sweeper_thread: Optional[threading.Thread] = None
+_sweeper_stop = threading.Event()
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+_refresh_executor_lock = threading.Lock()
+_refresh_tasks: "set[asyncio.Future[None]]" = set()
+
+
+def _get_refresh_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for stale-while-revalidate refreshes (created lazily)."""
+    global _refresh_executor
+    
+    with _refresh_executor_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(
+                max_workers=settings.CACHE_REFRESH_WORKERS,
+                thread_name_prefix="cache-refresh",
+            )
+        return _refresh_executor
+
+
+def _register_cache(cache: "Cache[Any]") -> None:
+    with _caches_lock:
+        _caches.add(cache)
+
+
+def get_all_cache_stats() -> list:
+    """Statistics for every live Cache instance in the process."""
+    with _caches_lock:
+        caches = list(_caches)
+    return [cache.stats() for cache in caches]
+
+
+def sweep_expired_entries() -> int:
+    """Purge expired entries from every registered cache."""
+    with _caches_lock:
+        caches = list(_caches)
+    return sum(cache.purge_expired() for cache in caches)
+
+
+def _sweeper_loop(interval_seconds: float) -> None:
+    while not _sweeper_stop.wait(interval_seconds):
+        try:
+            removed = sweep_expired_entries()
+            if removed:
+                logger.debug(f"Cache sweeper removed {removed} expired entries")
+        except Exception as e:
+            logger.error(f"Cache sweeper error: {e}", exc_info=True)
+
+
+def start_cache_sweeper(interval_seconds: Optional[float] = None) -> None:
+    """Start the background expiry sweeper (idempotent)."""
+    global _sweeper_thread
+    
+    if _sweeper_thread is not None and _sweeper_thread.is_alive():
+        return
+    
+    interval = interval_seconds or settings.CACHE_SWEEP_INTERVAL_SECONDS
+    _sweeper_stop.clear()
+    _sweeper_thread = threading.Thread(
+        target=_sweeper_loop,
+        args=(interval,),
+        name="cache-sweeper",
+        daemon=True,
+    )
+    _sweeper_thread.start()
+    logger.info(f"Cache sweeper started (interval: {interval}s)")
+
+
+def stop_cache_sweeper() -> None:
+    """Stop the background expiry sweeper."""
+    global _sweeper_thread
+    
+    if _sweeper_thread is None:
+        return
+    _sweeper_stop.set()
+    _sweeper_thread.join(timeout=5)
+    _sweeper_thread = None
+    logger.info("Cache sweeper stopped")
+
+
+# Stale-while-revalidate policy per namespace: ttl_seconds is the soft TTL,
+# stale_ttl_seconds the extra window (hard TTL - soft TTL) a value may be
+# served while it is refreshed in the background.
+
+# Global stock quote cache
+stock_quote_cache = Cache(
+    ttl_seconds=settings.MARKET_DATA_QUOTE_TTL_SECONDS,
+    name="stock_quote",
+    stale_ttl_seconds=settings.CACHE_QUOTES_HARD_TTL_SECONDS - settings.MARKET_DATA_QUOTE_TTL_SECONDS,
+)
+
+# Global stock candle cache; DataFrames, so bounded by bytes. The market data
+# gateway passes per-interval soft/hard TTLs on every set().
+stock_candle_cache = Cache(
+    ttl_seconds=settings.MARKET_DATA_DAILY_TTL_SECONDS,
+    name="stock_candle",
+    max_bytes=settings.CACHE_CANDLE_MAX_MB * 1024 * 1024,
+)
 
+# Global portfolio growth cache: per-(ticker, range) close series keyed by
+# date label (app.api.routes.portfolio); TTLs follow the bar interval
+growth_series_cache = Cache(ttl_seconds=settings.MARKET_DATA_DAILY_TTL_SECONDS, name="growth_series")
 
-# Global stock quote cache (5 second TTL)
-stock_quote_cache = Cache(ttl_seconds=5)
+# Global market summary / snapshot cache
+market_summary_cache = Cache(
+    ttl_seconds=settings.CACHE_MARKET_SUMMARY_SOFT_TTL_SECONDS,
+    name="market_summary",
+    stale_ttl_seconds=settings.CACHE_MARKET_SUMMARY_HARD_TTL_SECONDS - settings.CACHE_MARKET_SUMMARY_SOFT_TTL_SECONDS,
+)
 
-# Global stock candle cache (5 second TTL)
-stock_candle_cache = Cache(ttl_seconds=5)
+# Global indicator cache: per-symbol indicator bundles (app.services.indicator_service)
+indicator_cache = Cache(ttl_seconds=settings.CACHE_INDICATOR_BUNDLE_TTL_SECONDS, name="indicator")
 
-# Global indicator cache (10 second TTL)
-indicator_cache = Cache(ttl_seconds=10)
+# Global news cache
+news_cache = Cache(
+    ttl_seconds=settings.CACHE_NEWS_SOFT_TTL_SECONDS,
+    name="news",
+    stale_ttl_seconds=settings.CACHE_NEWS_HARD_TTL_SECONDS - settings.CACHE_NEWS_SOFT_TTL_SECONDS,
+)
 
-# Global news cache (30 second TTL)
-news_cache = Cache(ttl_seconds=30)
+# Global sentiment cache
+sentiment_cache = Cache(
+    ttl_seconds=settings.CACHE_SENTIMENT_SOFT_TTL_SECONDS,
+    name="sentiment",
+    stale_ttl_seconds=settings.CACHE_SENTIMENT_HARD_TTL_SECONDS - settings.CACHE_SENTIMENT_SOFT_TTL_SECONDS,
+)
 
-# Global sentiment cache (60 second TTL)
-sentiment_cache = Cache(ttl_seconds=60)
+# Global symbol search cache (30 second TTL); free-text keys, LFU keeps popular queries
+search_cache = Cache(ttl_seconds=30, name="symbol_search", max_entries=2000, eviction="lfu")
@@ -0,0 +1,203 @@
+"""
+Single-flight request coalescing for Stock Sentinel API.
+
+Features:
+  - One in-flight call per key; concurrent callers wait for and share its result
+  - Works for threads (SingleFlight) and asyncio tasks (AsyncSingleFlight)
+  - Errors are propagated to every waiter, nothing is cached
+  - Per-group counters (calls, executions, coalesced) for monitoring
+
+Usage:
+    quotes_flight = SingleFlight("quotes")
+    quote = quotes_flight.do("AAPL", lambda: fetch_quote("AAPL"))
+
+    news_flight = AsyncSingleFlight("news")
+    news = await news_flight.do("AAPL", lambda: fetch_news("AAPL"))
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class _Call:
+    """Result slot shared by the leader and every waiter of one key."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class _FlightStats:
+    """Thread-safe counters shared by the sync and async implementations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def record(self, executed: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if executed:
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+            }
+
+
+class SingleFlight:
+    """
+    Thread-safe single-flight group.
+
+    The first caller for a key runs the function; callers arriving while it
+    is running block until it finishes and receive the same result (or
+    exception).
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = _FlightStats()
+        _register(self)
+
+    def do(self, key: str, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """
+        Run fn once for all concurrent callers of the same key.
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument callable producing the value
+            timeout: Max seconds a waiter blocks for the leader (None = no limit)
+
+        Raises:
+            TimeoutError: If a waiter gives up before the leader finishes
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        self._stats.record(executed=is_leader)
+
+        if not is_leader:
+            if not call.event.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call '{self.name}:{key}'")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            self._stats.record_error()
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self) -> int:
+        """Number of keys currently being fetched."""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        """Get coalescing statistics."""
+        stats = self._stats.snapshot()
+        stats["name"] = self.name
+        stats["in_flight"] = self.in_flight()
+        return stats
+
+
+class AsyncSingleFlight:
+    """
+    Single-flight group for coroutines.
+
+    The first caller for a key starts the coroutine as a task; later callers
+    await the same task. Cancelling one waiter does not cancel the shared
+    fetch for the others.
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._tasks: Dict[str, "asyncio.Task[Any]"] = {}
+        self._stats = _FlightStats()
+        _register(self)
+
+    async def do(self, key: str, coro_factory: Callable[[], Awaitable[T]]) -> T:
+        """Await coro_factory() once for all concurrent callers of the same key."""
+        task = self._tasks.get(key)
+        is_leader = task is None or task.get_loop() is not asyncio.get_running_loop()
+        self._stats.record(executed=is_leader)
+
+        if is_leader:
+            task = asyncio.ensure_future(coro_factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done, k=key: self._finish(k, done))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            self._stats.record_error()
+
+    def in_flight(self) -> int:
+        """Number of keys currently being fetched."""
+        return len(self._tasks)
+
+    def stats(self) -> dict:
+        """Get coalescing statistics."""
+        stats = self._stats.snapshot()
+        stats["name"] = self.name
+        stats["in_flight"] = self.in_flight()
+        return stats
+
+
+# ============================================================================
+# Registry (for monitoring)
+# ============================================================================
+
+# Weak so per-instance groups do not outlive their owners
+_groups: "weakref.WeakSet[Any]" = weakref.WeakSet()
+_groups_lock = threading.Lock()
+
+
+def _register(group: Any) -> None:
+    with _groups_lock:
+        _groups.add(group)
+
+
+def get_singleflight_stats() -> List[dict]:
+    """Coalescing statistics for every single-flight group in the process."""
+    with _groups_lock:
+        groups = list(_groups)
+    return [group.stats() for group in groups]
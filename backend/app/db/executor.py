@@ -0,0 +1,56 @@
+"""
+Run blocking SQLAlchemy work from asyncio code.
+
+The project uses the synchronous engine (psycopg2). Coroutines hand database
+work to a small dedicated thread pool instead of blocking the event loop;
+every call gets its own session.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+T = TypeVar("T")
+
+# Created lazily so importing the module never starts threads
+_db_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_db_executor() -> ThreadPoolExecutor:
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=max(settings.ALERT_DB_WORKERS, 1),
+            thread_name_prefix="db",
+        )
+    return _db_executor
+
+
+async def run_db(work: Callable[[Session], T]) -> T:
+    """Run ``work(db)`` with its own session on the database executor."""
+    from app.db.session import SessionLocal
+
+    def _run() -> T:
+        db = SessionLocal()
+        try:
+            return work(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_db_executor(), _run)
+
+
+def shutdown_db_executor() -> None:
+    """Stop the database executor (called on application shutdown)."""
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=False)
+        _db_executor = None
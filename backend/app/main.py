@@ -24,6 +24,11 @@ from app.core.error_handlers import setup_middleware, setup_exception_handlers
 
 # Import scheduler
 from app.services.scheduler import start_scheduler, stop_scheduler
+from app.core.cache import start_cache_sweeper, stop_cache_sweeper
+from app.services.notification_outbox import notification_dispatcher
+from app.ws.backplane import backplane
+from app.ws.connection_manager import alert_manager  # noqa: F401 - registers the alert relay
+from app.ws.price_streamer import streamer
 
 # Then import routes
 from app.api.routes import auth as auth_routes
@@ -62,10 +67,16 @@ async def lifespan(app: FastAPI):
     Startup:
       - Initialize database tables
       - Start background scheduler for alert checking
+      - Start cache expiry sweeper
+      - Start notification outbox dispatcher
+      - Connect the WebSocket backplane and join price ingestion
       - Log startup message
     
     Shutdown:
       - Stop background scheduler
+      - Stop cache expiry sweeper
+      - Stop notification outbox dispatcher
+      - Leave price ingestion and disconnect the WebSocket backplane
       - Clean up resources
       - Log shutdown message
     """
@@ -100,6 +111,20 @@ async def lifespan(app: FastAPI):
             "This is only acceptable in development environment."
         )
     
+    # Start background sweeper so never-read cache keys do not pile up
+    start_cache_sweeper()
+    
+    # Deliver queued alert notifications (email, WhatsApp, WebSocket)
+    if settings.OUTBOX_DISPATCHER_ENABLED:
+        await notification_dispatcher.start()
+    
+    # Cross-worker WebSocket fan-out: one ingestion leader, local fan-out everywhere
+    try:
+        await backplane.start()
+        await streamer.start()
+    except Exception as e:
+        logger.error(f"Failed to start WebSocket backplane ({backplane.name}): {e}", exc_info=True)
+    
     logger.info(f"{settings.APP_NAME} started successfully")
     
     yield
@@ -112,6 +137,13 @@ async def lifespan(app: FastAPI):
         stop_scheduler()
     except Exception as e:
         logger.error(f"Error stopping scheduler: {e}")
+    
+    stop_cache_sweeper()
+    
+    await notification_dispatcher.stop()
+    
+    await streamer.stop()
+    await backplane.stop()
 
 
 # ============================================
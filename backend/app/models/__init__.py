@@ -1,7 +1,10 @@
 from app.db.session import Base
 
 from .alert import Alert, AlertCondition  # noqa: F401
+from .alert_worker import AlertShardLease, AlertWorkerHeartbeat  # noqa: F401
+from .notification_outbox import NotificationOutbox  # noqa: F401
 from .portfolio import Portfolio  # noqa: F401
+from .portfolio_snapshot import PortfolioSnapshot  # noqa: F401
 from .prediction import StockPrediction  # noqa: F401
 from .sentiment import SentimentRecord  # noqa: F401
 from .stock import Stock  # noqa: F401
@@ -12,8 +15,12 @@ from .watchlist import Watchlist  # noqa: F401
 __all__ = [
     "Alert",
     "AlertCondition",
+    "AlertShardLease",
+    "AlertWorkerHeartbeat",
     "Base",
+    "NotificationOutbox",
     "Portfolio",
+    "PortfolioSnapshot",
     "SentimentRecord",
     "Stock",
     "StockPrediction",
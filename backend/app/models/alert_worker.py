@@ -0,0 +1,36 @@
+"""
+Coordination tables for sharded alert workers (app.services.alert_worker).
+
+Alerts are partitioned into a fixed number of shards by a hash of the stock
+symbol. Each running worker heartbeats a row in `alert_workers` and holds
+time-limited leases on the shards it checks in `alert_shard_leases`.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class AlertWorkerHeartbeat(Base):
+    """One row per running alert worker; stale heartbeats mean a dead worker."""
+
+    __tablename__ = "alert_workers"
+
+    worker_id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    shard_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class AlertShardLease(Base):
+    """Lease on one alert shard; only the owner of an unexpired lease checks it."""
+
+    __tablename__ = "alert_shard_leases"
+
+    shard_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    owner: Mapped[Optional[str]] = mapped_column(String(128), nullable=True, index=True)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,49 @@
+"""
+Transactional outbox for alert notifications.
+
+A row per (alert history entry, channel) is written in the same transaction
+as the AlertHistory entry; app.services.notification_outbox delivers them.
+"""
+
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class OutboxStatus:
+    """Delivery states of an outbox row."""
+    PENDING = "pending"
+    PROCESSING = "processing"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class NotificationOutbox(Base):
+    """One pending or finished notification delivery (email, WhatsApp, WebSocket)."""
+
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Idempotency key: one delivery per trigger and channel
+        UniqueConstraint("alert_history_id", "channel", name="uq_notification_outbox_history_channel"),
+        Index("ix_notification_outbox_status_available", "status", "available_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    alert_history_id: Mapped[int] = mapped_column(
+        ForeignKey("alert_history.id", ondelete="CASCADE"), nullable=False
+    )
+    alert_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    channel: Mapped[str] = mapped_column(String(20), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), default=OutboxStatus.PENDING, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    available_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_by: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
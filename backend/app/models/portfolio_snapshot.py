@@ -0,0 +1,40 @@
+"""
+Materialized portfolio valuations.
+
+app.services.portfolio_snapshots writes one row per user and valuation
+(periodic job or on-demand after a position change), stamped with the time
+the valuation started; the portfolio and
+dashboard endpoints serve the latest row and the growth chart reads the
+history.
+"""
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.session import Base
+
+
+class PortfolioSnapshot(Base):
+    """Valuation of one user's portfolio at a point in time."""
+
+    __tablename__ = "portfolio_snapshots"
+    __table_args__ = (Index("ix_portfolio_snapshots_user_taken", "user_id", "taken_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    taken_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    total_invested: Mapped[float] = mapped_column(Float, nullable=False)
+    current_value: Mapped[float] = mapped_column(Float, nullable=False)
+    day_pl: Mapped[float] = mapped_column(Float, nullable=False)
+    # [{"category", "value", "percent"}, ...], largest bucket first
+    allocation: Mapped[list[dict[str, Any]]] = mapped_column(JSON, nullable=False)
+    # Enriched holdings as served by GET /portfolio
+    holdings: Mapped[list[dict[str, Any]]] = mapped_column(JSON, nullable=False)
+    # "scheduled" (background job) or "request" (valued on read)
+    source: Mapped[str] = mapped_column(String(20), nullable=False)
+    # users.portfolio_version read before the positions were; a snapshot
+    # whose version is behind the user's is outdated and revalued on read
+    positions_version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
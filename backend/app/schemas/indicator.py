@@ -4,6 +4,8 @@ Technical Indicators API Schemas
 Pydantic models for request/response validation
 """
 
+from typing import List, Union
+
 from pydantic import BaseModel, Field
 
 
@@ -36,3 +38,17 @@ class EMAResponse(BaseModel):
     period: int = Field(description="EMA period in days")
     ema: float = Field(description="Exponential Moving Average value")
     current_price: float = Field(description="Current stock price")
+
+
+# ============================================================================
+# Request Schemas
+# ============================================================================
+
+class BulkIndicatorsRequest(BaseModel):
+    """Request body for bulk indicator calculation (watchlists, screeners)"""
+    
+    symbols: List[str] = Field(min_length=1, description='Stock symbols, e.g. ["AAPL", "MSFT"]')
+    indicators: Union[str, List[str]] = Field(
+        default="sma:14,ema:20,rsi:14",
+        description='name:period specs as a comma-separated string or a list, e.g. ["sma:50", "rsi:14"]',
+    )
@@ -188,6 +188,16 @@ class StockHistoricalData(BaseModel):
     volume: int
 
 
+class ColumnarCandles(BaseModel):
+    """Candles as parallel arrays (?format=columnar); t is in epoch seconds."""
+    t: list[int]
+    o: list[float]
+    h: list[float]
+    l: list[float]
+    c: list[float]
+    v: list[int]
+
+
 class StockIndicators(BaseModel):
     sma_20: Optional[float] = None
     sma_50: Optional[float] = None
@@ -214,7 +224,8 @@ class StockDetailsRead(BaseModel):
     dividend_yield: Optional[float]
     pe_ratio: Optional[float]
     indicators: StockIndicators
-    historical_data: list[StockHistoricalData]
+    # A list of candles, or ColumnarCandles with format=columnar
+    historical_data: list[StockHistoricalData] | ColumnarCandles
     timestamp: datetime
 
 
@@ -0,0 +1,475 @@
+"""
+Vectorized alert evaluation engine for Stock Sentinel.
+
+Compiles the active alerts of a check cycle into NumPy columns, computes
+every indicator once per (symbol, indicator, period) from the shared OHLCV
+frame of each symbol, and evaluates all thresholds as array comparisons
+instead of one if/elif branch per alert.
+
+Features:
+  - One SMA/EMA/RSI computation per distinct (symbol, period) per tick
+  - Indicator math from app.services.technical_indicators (EMA and Wilder
+    RSI in closed form, no per-bar Python loop)
+  - Same semantics as the per-alert checks in app.models.alert and
+    app.services.indicator_service (values rounded to 2 decimals)
+  - Alerts with missing/invalid configuration are flagged, not evaluated
+  - Compiled from a column-only query; ORM objects are loaded only for the
+    alerts that trigger, re-arm or carry per-tick state
+
+Usage:
+    compiled = compile_alerts(fetch_active_alert_rows(db))
+    snapshots = {symbol: MarketSnapshot.from_history(history, VOLUME_AVERAGE_BARS), ...}
+    evaluation = evaluate_alerts(compiled, snapshots)
+    alerts = load_alerts(db, compiled.alert_ids[evaluation.needs_attention])
+"""
+
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.models.alert import Alert, AlertCondition, AlertType
+from app.services import technical_indicators as ta
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# Codes
+# ============================================================================
+
+_ALERT_TYPES: List[AlertType] = list(AlertType)
+TYPE_CODES: Dict[AlertType, int] = {alert_type: code for code, alert_type in enumerate(_ALERT_TYPES)}
+
+_CONDITION_CODES: Dict[AlertCondition, int] = {
+    AlertCondition.GREATER_THAN: 0,
+    AlertCondition.LESS_THAN: 1,
+    AlertCondition.GREATER_THAN_OR_EQUAL: 2,
+    AlertCondition.LESS_THAN_OR_EQUAL: 3,
+}
+_NO_CONDITION = -1
+
+# Same limits as app.services.indicator_service
+MIN_INDICATOR_PERIOD = 2
+MAX_EMA_PERIOD = 500
+
+RSI_OVERBOUGHT_LEVEL = 70.0
+RSI_OVERSOLD_LEVEL = 30.0
+
+
+def _type_mask(*alert_types: AlertType) -> np.ndarray:
+    """Lookup table indexed by type code; the extra last slot covers unknown (-1)."""
+    mask = np.zeros(len(_ALERT_TYPES) + 1, dtype=np.bool_)
+    mask[[TYPE_CODES[t] for t in alert_types]] = True
+    return mask
+
+
+_PRICE_CONDITION_TYPES = _type_mask(AlertType.PRICE, AlertType.CUSTOM)
+_SMA_TYPES = _type_mask(
+    AlertType.SMA_ABOVE, AlertType.SMA_BELOW, AlertType.SMA_CROSSOVER,
+    AlertType.STRONG_BUY_SIGNAL, AlertType.STRONG_SELL_SIGNAL,
+)
+_EMA_TYPES = _type_mask(
+    AlertType.EMA_ABOVE, AlertType.EMA_BELOW, AlertType.EMA_CROSSOVER,
+    AlertType.STRONG_BUY_SIGNAL, AlertType.STRONG_SELL_SIGNAL,
+)
+_RSI_TYPES = _type_mask(
+    AlertType.RSI_OVERBOUGHT, AlertType.RSI_OVERSOLD, AlertType.RSI_CROSSOVER,
+    AlertType.STRONG_BUY_SIGNAL, AlertType.STRONG_SELL_SIGNAL,
+)
+# Types whose state (last_price / last_rsi) is updated every tick
+_LAST_PRICE_TYPES = _type_mask(
+    AlertType.PERCENTAGE_CHANGE, AlertType.CRASH,
+    AlertType.SMA_CROSSOVER, AlertType.EMA_CROSSOVER,
+)
+_STATEFUL_TYPES = _LAST_PRICE_TYPES | _type_mask(AlertType.RSI_CROSSOVER)
+
+
+def alert_type_of(code: int) -> Optional[AlertType]:
+    """Inverse of TYPE_CODES (None for unknown codes)."""
+    return _ALERT_TYPES[code] if 0 <= code < len(_ALERT_TYPES) else None
+
+
+def tracks_last_price(alert_type: AlertType) -> bool:
+    """Whether the alert type compares against the previous tick's price."""
+    return bool(_LAST_PRICE_TYPES[TYPE_CODES[alert_type]])
+
+
+# ============================================================================
+# Compiled alerts and market snapshot
+# ============================================================================
+
+@dataclass
+class CompiledAlerts:
+    """Column-oriented view of every active alert in a check cycle."""
+
+    symbols: List[str]         # distinct upper-cased symbols
+    symbol_index: np.ndarray   # int64, index into symbols per alert
+    alert_ids: np.ndarray      # int64
+    type_code: np.ndarray      # int8, TYPE_CODES or -1
+    condition: np.ndarray      # int8, _CONDITION_CODES or -1
+    target: np.ndarray         # float64
+    last_price: np.ndarray     # float64, NaN when unset
+    last_rsi: np.ndarray       # float64, NaN when unset
+    sma_period: np.ndarray     # int64, 0 when unset
+    ema_period: np.ndarray     # int64, 0 when unset
+    rsi_period: np.ndarray     # int64, 0 when unset
+    is_triggered: np.ndarray   # bool
+
+    def __len__(self) -> int:
+        return len(self.alert_ids)
+
+    def symbol_of(self, index: int) -> str:
+        return self.symbols[self.symbol_index[index]]
+
+    def alert_counts(self) -> np.ndarray:
+        """Number of alerts per entry of ``symbols``."""
+        return np.bincount(self.symbol_index, minlength=len(self.symbols))
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """Per-symbol market inputs shared by every alert of the symbol."""
+
+    closes: np.ndarray
+    current_price: float
+    current_volume: float
+    avg_volume: float
+
+    @classmethod
+    def from_history(
+        cls,
+        history: pd.DataFrame,
+        volume_bars: int,
+        live_price: Optional[float] = None,
+        live_volume: Optional[float] = None,
+        new_bar: bool = False,
+    ) -> "MarketSnapshot":
+        """
+        Build a snapshot from a daily OHLCV frame (oldest bar first).
+
+        avg_volume is the mean of the last ``volume_bars`` bars excluding the
+        current one, falling back to the current volume on a single bar.
+
+        ``live_price``/``live_volume`` (a fresh quote) replace the close and
+        volume of the newest bar, or are appended as a new bar when
+        ``new_bar`` is set (the cached history ends before the quote's session).
+        """
+        closes = history["Close"].to_numpy(dtype=np.float64)
+        volumes = history["Volume"].to_numpy(dtype=np.float64)
+        if live_price is not None:
+            if new_bar:
+                closes = np.append(closes, live_price)
+                volumes = np.append(volumes, live_volume or 0.0)
+            else:
+                closes = closes.copy()
+                closes[-1] = live_price
+                if live_volume:
+                    volumes = volumes.copy()
+                    volumes[-1] = live_volume
+        current_volume = float(volumes[-1])
+        volume_window = volumes[-(volume_bars + 1):-1]
+        avg_volume = float(volume_window.mean()) if len(volume_window) > 0 else current_volume
+        return cls(
+            closes=closes,
+            current_price=float(closes[-1]),
+            current_volume=current_volume,
+            avg_volume=avg_volume,
+        )
+
+
+@dataclass
+class AlertEvaluation:
+    """Per-alert result of evaluating CompiledAlerts against market snapshots."""
+
+    has_data: np.ndarray       # bool, a snapshot exists for the alert's symbol
+    valid: np.ndarray          # bool, has_data and configuration/indicators usable
+    met: np.ndarray            # bool, condition met (always False when not valid)
+    needs_attention: np.ndarray  # bool, valid alerts with a trigger, re-arm or state update
+    price: np.ndarray          # float64, current price of the alert's symbol
+    sma: np.ndarray            # float64, NaN where not used by the alert type
+    ema: np.ndarray
+    rsi: np.ndarray
+
+    @property
+    def invalid(self) -> np.ndarray:
+        """Alerts that had market data but could not be evaluated."""
+        return self.has_data & ~self.valid
+
+    def indicator_values(self, compiled: CompiledAlerts, index: int) -> dict:
+        """trigger_alert keyword arguments for one alert (None where unused)."""
+        return {
+            "sma_value": _optional_float(self.sma[index]),
+            "sma_period": _optional_period(compiled.sma_period[index], self.sma[index]),
+            "ema_value": _optional_float(self.ema[index]),
+            "ema_period": _optional_period(compiled.ema_period[index], self.ema[index]),
+            "rsi_value": _optional_float(self.rsi[index]),
+            "rsi_period": _optional_period(compiled.rsi_period[index], self.rsi[index]),
+        }
+
+
+def _optional_float(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def _optional_period(period: int, value: float) -> Optional[int]:
+    return None if np.isnan(value) else int(period)
+
+
+# ============================================================================
+# Loading
+# ============================================================================
+
+# Columns the engine needs, in the order compile_alerts expects. Fetched as
+# plain rows, which is an order of magnitude cheaper than hydrating Alert objects.
+_ALERT_COLUMNS = (
+    Alert.id, Alert.stock_symbol, Alert.alert_type, Alert.condition, Alert.target_value,
+    Alert.last_price, Alert.last_rsi, Alert.sma_period, Alert.ema_period, Alert.rsi_period,
+    Alert.is_triggered,
+)
+(_COL_ID, _COL_SYMBOL, _COL_TYPE, _COL_CONDITION, _COL_TARGET, _COL_LAST_PRICE, _COL_LAST_RSI,
+ _COL_SMA_PERIOD, _COL_EMA_PERIOD, _COL_RSI_PERIOD, _COL_TRIGGERED) = range(len(_ALERT_COLUMNS))
+
+# Bound on IN (...) parameters per query when loading alerts by id
+_LOAD_CHUNK_SIZE = 500
+
+
+def shard_of(symbol: str, shard_count: int) -> int:
+    """Stable shard of a stock symbol (same on every process and restart)."""
+    return zlib.crc32(symbol.upper().strip().encode("utf-8")) % shard_count
+
+
+def fetch_active_alert_rows(
+    db: Session,
+    symbol_filter: Optional[Callable[[str], bool]] = None,
+) -> List[Any]:
+    """
+    Active alerts as lightweight column rows (no ORM identity map).
+
+    With ``symbol_filter`` only alerts whose stock symbol passes it are read
+    (distinct symbols are listed first, then rows are loaded by symbol).
+    """
+    query = db.query(*_ALERT_COLUMNS).filter(Alert.is_active == True)
+    if symbol_filter is None:
+        return query.all()
+
+    symbols = [
+        symbol
+        for (symbol,) in db.query(Alert.stock_symbol).filter(Alert.is_active == True).distinct()
+        if symbol and symbol_filter(symbol)
+    ]
+    rows: List[Any] = []
+    for start in range(0, len(symbols), _LOAD_CHUNK_SIZE):
+        rows.extend(query.filter(Alert.stock_symbol.in_(symbols[start:start + _LOAD_CHUNK_SIZE])).all())
+    return rows
+
+
+def load_alerts(db: Session, alert_ids: Iterable[int]) -> Dict[int, Alert]:
+    """Load mapped Alert instances by id, chunked to keep IN lists bounded."""
+    ids = [int(alert_id) for alert_id in alert_ids]
+    alerts: Dict[int, Alert] = {}
+    for start in range(0, len(ids), _LOAD_CHUNK_SIZE):
+        chunk = ids[start:start + _LOAD_CHUNK_SIZE]
+        for alert in db.query(Alert).filter(Alert.id.in_(chunk)).all():
+            alerts[alert.id] = alert
+    return alerts
+
+
+def _float_column(values: np.ndarray) -> np.ndarray:
+    """Object column to float64 with None -> NaN."""
+    return np.array(values.tolist(), dtype=np.float64)
+
+
+def _period_column(values: np.ndarray) -> np.ndarray:
+    """Object column to int64 with None -> 0."""
+    return np.array([p or 0 for p in values], dtype=np.int64)
+
+
+def compile_alerts(rows: Iterable[Sequence[Any]]) -> CompiledAlerts:
+    """
+    Pack alert rows into arrays.
+
+    Rows are tuples in _ALERT_COLUMNS order, as returned by
+    fetch_active_alert_rows.
+    """
+    table = np.array([tuple(row) for row in rows], dtype=object).reshape(-1, len(_ALERT_COLUMNS))
+    symbols, symbol_index = np.unique(
+        np.array([symbol.upper() for symbol in table[:, _COL_SYMBOL]], dtype=str),
+        return_inverse=True,
+    )
+    return CompiledAlerts(
+        symbols=[str(symbol) for symbol in symbols],
+        symbol_index=symbol_index.astype(np.int64).reshape(-1),
+        alert_ids=table[:, _COL_ID].astype(np.int64),
+        type_code=np.array([TYPE_CODES.get(t, -1) for t in table[:, _COL_TYPE]], dtype=np.int8),
+        condition=np.array(
+            [_CONDITION_CODES.get(c, _NO_CONDITION) for c in table[:, _COL_CONDITION]], dtype=np.int8
+        ),
+        target=_float_column(table[:, _COL_TARGET]),
+        last_price=_float_column(table[:, _COL_LAST_PRICE]),
+        last_rsi=_float_column(table[:, _COL_LAST_RSI]),
+        sma_period=_period_column(table[:, _COL_SMA_PERIOD]),
+        ema_period=_period_column(table[:, _COL_EMA_PERIOD]),
+        rsi_period=_period_column(table[:, _COL_RSI_PERIOD]),
+        is_triggered=np.array([bool(t) for t in table[:, _COL_TRIGGERED]], dtype=np.bool_),
+    )
+
+
+# ============================================================================
+# Indicators (last value only, NaN when the window is not available)
+# ============================================================================
+
+def sma_last(closes: np.ndarray, period: int) -> float:
+    """Average of the last ``period`` closes."""
+    if period < MIN_INDICATOR_PERIOD:
+        return np.nan
+    return ta.sma_last(closes, period)
+
+
+def ema_last(closes: np.ndarray, period: int) -> float:
+    """EMA seeded with the SMA of the first ``period`` closes, k = 2 / (period + 1)."""
+    if period < MIN_INDICATOR_PERIOD or period > MAX_EMA_PERIOD:
+        return np.nan
+    return ta.ema_last(closes, period)
+
+
+def rsi_last(closes: np.ndarray, period: int) -> float:
+    """RSI with Wilder's smoothing of average gain / loss."""
+    if period < MIN_INDICATOR_PERIOD:
+        return np.nan
+    return ta.rsi_last(closes, period, method="wilder")
+
+
+def _indicator_per_alert(
+    closes_by_symbol: List[Optional[np.ndarray]],
+    symbol_index: np.ndarray,
+    periods: np.ndarray,
+    used: np.ndarray,
+    fn: Callable[[np.ndarray, int], float],
+) -> np.ndarray:
+    """Compute ``fn`` once per distinct (symbol, period) and broadcast it back to the alerts."""
+    values = np.full(len(periods), np.nan)
+    if not used.any():
+        return values
+    stride = int(periods.max()) + 1
+    keys, inverse = np.unique(symbol_index[used] * stride + periods[used], return_inverse=True)
+    computed = np.array(
+        [fn(closes_by_symbol[key // stride], int(key % stride)) for key in keys],
+        dtype=np.float64,
+    )
+    values[used] = np.round(computed, 2)[inverse.reshape(-1)]
+    return values
+
+
+# ============================================================================
+# Evaluation
+# ============================================================================
+
+def evaluate_alerts(compiled: CompiledAlerts, snapshots: Mapping[str, MarketSnapshot]) -> AlertEvaluation:
+    """
+    Evaluate every compiled alert with array operations.
+
+    Alerts whose symbol has no snapshot are neither valid nor met.
+    """
+    per_symbol = [snapshots.get(symbol) for symbol in compiled.symbols]
+    sym = compiled.symbol_index
+    closes_by_symbol = [s.closes if s is not None else None for s in per_symbol]
+
+    def _per_alert(values: List[Any], dtype) -> np.ndarray:
+        return np.array(values, dtype=dtype)[sym] if per_symbol else np.empty(0, dtype=dtype)
+
+    has_data = _per_alert([s is not None for s in per_symbol], np.bool_)
+    price = _per_alert([s.current_price if s else np.nan for s in per_symbol], np.float64)
+    current_volume = _per_alert([s.current_volume if s else np.nan for s in per_symbol], np.float64)
+    avg_volume = _per_alert([s.avg_volume if s else np.nan for s in per_symbol], np.float64)
+
+    t = compiled.type_code
+    target = compiled.target
+    last_price = compiled.last_price
+    last_rsi = compiled.last_rsi
+
+    uses_sma = _SMA_TYPES[t]
+    uses_ema = _EMA_TYPES[t]
+    uses_rsi = _RSI_TYPES[t]
+
+    sma = _indicator_per_alert(closes_by_symbol, sym, compiled.sma_period, uses_sma & has_data, sma_last)
+    ema = _indicator_per_alert(closes_by_symbol, sym, compiled.ema_period, uses_ema & has_data, ema_last)
+    rsi = _indicator_per_alert(closes_by_symbol, sym, compiled.rsi_period, uses_rsi & has_data, rsi_last)
+
+    valid = (
+        has_data
+        & (t >= 0)
+        & ~(uses_sma & np.isnan(sma))
+        & ~(uses_ema & np.isnan(ema))
+        & ~(uses_rsi & np.isnan(rsi))
+        & ~(_PRICE_CONDITION_TYPES[t] & (compiled.condition == _NO_CONDITION))
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cond = compiled.condition
+        price_met = (
+            ((cond == 0) & (price > target))
+            | ((cond == 1) & (price < target))
+            | ((cond == 2) & (price >= target))
+            | ((cond == 3) & (price <= target))
+        )
+
+        has_last_price = ~np.isnan(last_price)
+        has_base_price = has_last_price & (last_price != 0)
+        pct_change = (price - last_price) / last_price * 100
+        percentage_met = has_base_price & (np.abs(pct_change) >= target)
+        crash_met = has_base_price & (pct_change <= -target)
+
+        volume_met = (avg_volume != 0) & (current_volume > avg_volume * target)
+
+        sma_cross = has_last_price & ((last_price > sma) != (price > sma))
+        ema_cross = has_last_price & ((last_price > ema) != (price > ema))
+        rsi_cross = ~np.isnan(last_rsi) & (
+            ((last_rsi <= RSI_OVERSOLD_LEVEL) & (rsi > RSI_OVERSOLD_LEVEL))
+            | ((last_rsi >= RSI_OVERBOUGHT_LEVEL) & (rsi < RSI_OVERBOUGHT_LEVEL))
+        )
+        strong_buy = (price > sma) & (price > ema) & (rsi < RSI_OVERSOLD_LEVEL)
+        strong_sell = (price < sma) & (price < ema) & (rsi > RSI_OVERBOUGHT_LEVEL)
+
+        by_type = {
+            AlertType.PRICE: price_met,
+            AlertType.CUSTOM: price_met,
+            AlertType.PERCENTAGE_CHANGE: percentage_met,
+            AlertType.VOLUME_SPIKE: volume_met,
+            AlertType.CRASH: crash_met,
+            AlertType.SMA_ABOVE: price > sma,
+            AlertType.SMA_BELOW: price < sma,
+            AlertType.SMA_CROSSOVER: sma_cross,
+            AlertType.EMA_ABOVE: price > ema,
+            AlertType.EMA_BELOW: price < ema,
+            AlertType.EMA_CROSSOVER: ema_cross,
+            AlertType.RSI_OVERBOUGHT: rsi > RSI_OVERBOUGHT_LEVEL,
+            AlertType.RSI_OVERSOLD: rsi < RSI_OVERSOLD_LEVEL,
+            AlertType.RSI_CROSSOVER: rsi_cross,
+            AlertType.STRONG_BUY_SIGNAL: strong_buy,
+            AlertType.STRONG_SELL_SIGNAL: strong_sell,
+        }
+
+    # Row per type code (plus an all-False row for unknown types), then pick
+    # each alert's own row
+    count = len(t)
+    outcomes = np.stack(
+        [by_type[alert_type] for alert_type in _ALERT_TYPES] + [np.zeros(count, dtype=np.bool_)]
+    )
+    met = outcomes[t, np.arange(count)] & valid
+
+    needs_attention = valid & (met | compiled.is_triggered | _STATEFUL_TYPES[t])
+
+    return AlertEvaluation(
+        has_data=has_data,
+        valid=valid,
+        met=met,
+        needs_attention=needs_attention,
+        price=price,
+        sma=np.where(uses_sma, sma, np.nan),
+        ema=np.where(uses_ema, ema, np.nan),
+        rsi=np.where(uses_rsi, rsi, np.nan),
+    )
@@ -0,0 +1,165 @@
+"""
+Asyncio alert checking pipeline for Stock Sentinel.
+
+Runs the same tick as alert_service.check_all_alerts() as a coroutine on the
+application event loop, so a single process can check thousands of symbols
+without parking a scheduler thread on every blocking call.
+
+Features:
+  - Database steps run on a small dedicated executor (app.db.executor, one
+    session per step), never on the event loop
+  - Symbol histories are fetched as concurrent chunked batch downloads,
+    bounded by a semaphore, alongside one batch of fresh quotes for the
+    current prices
+  - Triggers only write the notification outbox; delivery happens in
+    app.services.notification_outbox
+  - Alert evaluation (NumPy) runs off the loop as well
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from app.config import settings
+from app.db.executor import run_db
+from app.services.alert_engine import (
+    AlertEvaluation,
+    compile_alerts,
+    evaluate_alerts,
+    fetch_active_alert_rows,
+)
+from app.services.alert_service import apply_alert_decisions, build_snapshots, fetch_live_quotes, log_invalid_alerts
+from app.services.indicator_service import INDICATOR_HISTORY_PERIOD
+from app.services.market_data import market_data_gateway
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# Market data
+# ============================================================================
+
+async def fetch_histories(
+    symbols: Sequence[str],
+    period: str = INDICATOR_HISTORY_PERIOD,
+    chunk_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Daily history for many symbols as concurrent batch downloads.
+
+    Symbols are split into chunks of ``chunk_size`` (one gateway batch call
+    each) and at most ``concurrency`` chunks are in flight at once. A failed
+    chunk only drops its own symbols.
+    """
+    chunk_size = max(chunk_size or settings.MARKET_DATA_BATCH_CHUNK_SIZE, 1)
+    semaphore = asyncio.Semaphore(max(concurrency or settings.ALERT_FETCH_CONCURRENCY, 1))
+    chunks = [list(symbols[i:i + chunk_size]) for i in range(0, len(symbols), chunk_size)]
+
+    async def _fetch(chunk: List[str]) -> Dict[str, pd.DataFrame]:
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(
+                    market_data_gateway.get_history_batch,
+                    chunk,
+                    period=period,
+                    chunk_size=len(chunk),
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error fetching batch price data",
+                    extra={
+                        "symbols_count": len(chunk),
+                        "error": str(e),
+                        "error_type": type(e).__name__,
+                    },
+                    exc_info=True,
+                )
+                return {}
+
+    histories: Dict[str, pd.DataFrame] = {}
+    for fetched in await asyncio.gather(*(_fetch(chunk) for chunk in chunks)):
+        histories.update(fetched)
+    return histories
+
+
+# ============================================================================
+# Alert check cycle
+# ============================================================================
+
+async def check_all_alerts_async(symbol_filter: Optional[Callable[[str], bool]] = None) -> None:
+    """
+    Check all active alerts on the event loop (asyncio version of check_all_alerts).
+
+    Same steps and semantics as alert_service.check_all_alerts(); only the
+    scheduling differs. All errors are logged but don't propagate to avoid
+    scheduler failures.
+
+    Args:
+        symbol_filter: Only check alerts whose stock symbol passes it (used
+            by sharded alert workers); None checks every active alert
+    """
+    try:
+        active_alerts = await run_db(lambda db: fetch_active_alert_rows(db, symbol_filter))
+
+        if not active_alerts:
+            logger.debug("No active alerts to check")
+            return
+
+        logger.info(
+            f"Starting alert check cycle",
+            extra={"total_alerts": len(active_alerts), "pipeline": "asyncio"},
+        )
+
+        compiled = await asyncio.to_thread(compile_alerts, active_alerts)
+
+        fetch_started = time.monotonic()
+        batches_before = market_data_gateway.counter("history_batches")
+        histories, quotes = await asyncio.gather(
+            fetch_histories(compiled.symbols),
+            asyncio.to_thread(fetch_live_quotes, compiled.symbols),
+        )
+        fetch_ms = (time.monotonic() - fetch_started) * 1000
+        fetch_batches = market_data_gateway.counter("history_batches") - batches_before
+
+        def _evaluate() -> Tuple[AlertEvaluation, List[str]]:
+            snapshots, symbols_with_errors = build_snapshots(compiled, histories, quotes)
+            evaluation = evaluate_alerts(compiled, snapshots)
+            log_invalid_alerts(compiled, evaluation)
+            return evaluation, symbols_with_errors
+
+        evaluation, symbols_with_errors = await asyncio.to_thread(_evaluate)
+        total_checked = int(evaluation.has_data.sum())
+
+        total_triggered, stats_by_type = await run_db(
+            lambda db: apply_alert_decisions(db, compiled, evaluation)
+        )
+
+        logger.info(
+            f"Alert check cycle completed",
+            extra={
+                "pipeline": "asyncio",
+                "total_alerts_checked": total_checked,
+                "alerts_triggered": total_triggered,
+                "symbols_processed": len(compiled.symbols),
+                "fetch_ms": round(fetch_ms, 1),
+                "fetch_batches": fetch_batches,
+                "symbols_with_errors": len(symbols_with_errors),
+                "error_symbols": symbols_with_errors if symbols_with_errors else None,
+                "triggers_by_type": stats_by_type,
+            },
+        )
+
+    except Exception as e:
+        logger.error(
+            f"Fatal error in alert check cycle",
+            extra={
+                "pipeline": "asyncio",
+                "error": str(e),
+                "error_type": type(e).__name__,
+            },
+            exc_info=True,
+        )
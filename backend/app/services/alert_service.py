@@ -7,17 +7,20 @@ Handles:
   - Stock price fetching
   - Alert condition checking
   - Alert triggering and logging
-  - Email notifications for triggered alerts
-  - Real-time WebSocket notifications for triggered alerts
+  - Email, WhatsApp and real-time WebSocket notifications for triggered
+    alerts (queued in the notification outbox)
 """
 
 import asyncio
 import logging
+import time
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from typing import Optional, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
 
 import httpx
-import yfinance as yf
+import numpy as np
+import pandas as pd
 from sqlalchemy.orm import Session
 
 from app.core.exceptions import (
@@ -30,13 +33,29 @@ from app.config import settings
 from app.models.alert import Alert, AlertCondition
 from app.models.user import User
 from app.schemas.alert import AlertResponse, CreateAlertRequest, UpdateAlertRequest
-from app.services.indicator_service import calculate_sma, calculate_rsi, calculate_ema
+from app.services.alert_engine import (
+    AlertEvaluation,
+    CompiledAlerts,
+    MarketSnapshot,
+    alert_type_of,
+    compile_alerts,
+    evaluate_alerts,
+    fetch_active_alert_rows,
+    load_alerts,
+    tracks_last_price,
+)
+from app.services.indicator_service import INDICATOR_HISTORY_PERIOD
+from app.services.market_data import Quote, market_data_gateway
 from app.services.email_smtp import send_alert_notification
+from app.services.notification_outbox import EMAIL, WEBSOCKET, WHATSAPP, enqueue_notifications, notification_dispatcher
 from app.services.whatsapp_service import send_whatsapp_alert, send_whatsapp_notification
-from app.ws.connection_manager import alert_manager
 
 logger = logging.getLogger(__name__)
 
+# Trading days averaged for VOLUME_SPIKE alerts (~20 calendar days)
+VOLUME_AVERAGE_BARS = 14
+
+
 class AlertService:
     """Service for managing stock price alerts."""
     
@@ -433,9 +452,10 @@ class AlertService:
     @staticmethod
     async def fetch_stock_price(symbol: str, timeout: int = 10) -> Optional[float]:
         """
-        Fetch current stock price using yfinance.
+        Fetch current stock price through the shared market data gateway.
         
-        Falls back to httpx for HTTP requests if needed.
+        The blocking gateway call runs in a worker thread so the event loop
+        stays free; repeated calls within the quote TTL are served from cache.
         
         Args:
             symbol: Stock ticker symbol
@@ -445,17 +465,18 @@ class AlertService:
             Current stock price or None if fetch fails
         """
         try:
-            stock = yf.Ticker(symbol)
-            data = stock.history(period="1d")
+            current_price = await asyncio.wait_for(
+                asyncio.to_thread(market_data_gateway.get_price, symbol),
+                timeout=timeout,
+            )
             
-            if data.empty:
+            if current_price is None:
                 logger.warning(
                     f"No price data available for symbol",
                     extra={"symbol": symbol},
                 )
                 return None
             
-            current_price = float(data["Close"].iloc[-1])
             logger.debug(
                 f"Stock price fetched successfully",
                 extra={"symbol": symbol, "price": current_price},
@@ -691,7 +712,64 @@ class AlertService:
 # Standalone Functions for Background Scheduler
 # ============================================================================
 
-def trigger_alert(
+@dataclass
+class AlertNotification:
+    """Everything needed to notify a user about a recorded trigger (no ORM state)."""
+    
+    alert_id: int
+    history_id: int
+    user_id: int
+    symbol: str
+    alert_type: str
+    condition: Optional[str]
+    target_value: float
+    current_price: float
+    triggered_at: str
+    user_email: Optional[str] = None
+    whatsapp_phone: Optional[str] = None
+    indicators: Dict[str, Any] = field(default_factory=dict)
+    
+    def channels(self) -> List[str]:
+        """Outbox channels this notification is delivered on."""
+        channels = [WEBSOCKET]
+        if settings.ENABLE_EMAIL_NOTIFICATIONS and self.user_email:
+            channels.append(EMAIL)
+        if settings.ENABLE_WHATSAPP_NOTIFICATIONS and self.whatsapp_phone:
+            channels.append(WHATSAPP)
+        return channels
+    
+    def broadcast_payload(self) -> dict:
+        """WebSocket message for alert subscribers."""
+        return {
+            "type": "alert",
+            "alert_id": self.alert_id,
+            "symbol": self.symbol,
+            "message": f"🔔 Alert triggered: {self.symbol} hit target {self.condition or ''} ${self.target_value:.2f} (Current: ${self.current_price:.2f})",
+            "current_price": self.current_price,
+            "target_value": self.target_value,
+            "condition": self.condition or "N/A",
+            "alert_type": self.alert_type,
+            "timestamp": self.triggered_at,
+        }
+    
+    def whatsapp_message(self) -> str:
+        """Formatted WhatsApp message body."""
+        time_now = datetime.utcnow().strftime("%d-%m-%Y %H:%M")
+        condition_str = self.condition or "N/A"
+        return f"""🚨 *STOCK ALERT*
+
+📈 Symbol: *{self.symbol}*
+🎯 Target Hit: ₹{self.target_value:.2f}
+📊 Condition: {self.symbol} {condition_str} ₹{self.target_value:.2f}
+💹 Current Price: ₹{self.current_price:.2f}
+🕒 Time: {time_now}
+
+⚡ *Action:* Check your dashboard now!
+
+_- StockSentinel_"""
+
+
+def record_alert_trigger(
     db: Session,
     alert: Alert,
     current_price: float,
@@ -701,35 +779,19 @@ def trigger_alert(
     ema_period: Optional[int] = None,
     rsi_value: Optional[float] = None,
     rsi_period: Optional[int] = None,
-) -> bool:
+) -> Optional[AlertNotification]:
     """
-    Trigger an alert by marking it as inactive and setting triggered_at timestamp.
+    Mark an alert as triggered and write its AlertHistory entry together
+    with one notification outbox row per channel (one commit).
     
-    This function is called when an alert condition is matched.
-    It updates the alert in the database atomically, records alert history, and sends email notification.
+    Notifications are not sent here; app.services.notification_outbox
+    delivers the outbox rows in the background.
     
-    Production enhancements:
-    - Sets is_triggered = True (prevents duplicate emails within cooldown period)
-    - Records is_triggered not for 10-minute cooldown before re-arming
-    - Creates AlertHistory entry for complete audit trail
-    - Sends email with comprehensive alert details
-    
-    Args:
-        db: Database session
-        alert: Alert to trigger
-        current_price: Current stock price that matched the condition
-        sma_value: Optional SMA value (for SMA alerts)
-        sma_period: Optional SMA period (for SMA alerts)
-        ema_value: Optional EMA value (for EMA alerts and combined signals)
-        ema_period: Optional EMA period (for EMA alerts and combined signals)
-        rsi_value: Optional RSI value (for RSI alerts and combined signals)
-        rsi_period: Optional RSI period (for RSI alerts and combined signals)
-        
     Returns:
-        True if alert was triggered successfully, False if already triggered
+        The queued notification, or None if the alert was not triggered
     """
     try:
-        from app.models.alert import AlertHistory, AlertType
+        from app.models.alert import AlertHistory
         
         # CRITICAL: Validate alert_type is not None (prevents crash on corrupt data)
         if not alert.alert_type:
@@ -741,7 +803,7 @@ def trigger_alert(
                     "symbol": alert.stock_symbol,
                 },
             )
-            return False
+            return None
         
         # Prevent duplicate triggers - check if already triggered recently (cooldown check)
         if not alert.is_active:
@@ -749,7 +811,7 @@ def trigger_alert(
                 f"Alert already triggered, skipping",
                 extra={"alert_id": alert.id},
             )
-            return False
+            return None
         
         now = datetime.utcnow()
         
@@ -778,6 +840,39 @@ def trigger_alert(
         )
         
         db.add(history_entry)
+        db.flush()  # Assigns history_entry.id for the outbox rows
+        
+        user = alert.user
+        notification = AlertNotification(
+            alert_id=alert.id,
+            history_id=history_entry.id,
+            user_id=alert.user_id,
+            symbol=alert.stock_symbol,
+            alert_type=alert.alert_type.value,
+            condition=alert.condition.value if alert.condition else None,
+            target_value=alert.target_value,
+            current_price=current_price,
+            triggered_at=triggered_at_str,
+            user_email=user.email if user else None,
+            whatsapp_phone=getattr(user, "whatsapp_phone", None) if user else None,
+            indicators={
+                "sma_value": sma_value,
+                "sma_period": sma_period,
+                "ema_value": ema_value,
+                "ema_period": ema_period,
+                "rsi_value": rsi_value,
+                "rsi_period": rsi_period,
+            },
+        )
+        
+        # Notifications go out through the outbox, committed with the trigger
+        enqueue_notifications(
+            db,
+            alert_history_id=history_entry.id,
+            alert_id=alert.id,
+            payload=asdict(notification),
+            channels=notification.channels(),
+        )
         db.commit()
         
         logger.warning(
@@ -797,168 +892,399 @@ def trigger_alert(
             },
         )
         
-        # Send email notification if enabled and user email is available
-        email_sent = False
-        if settings.ENABLE_EMAIL_NOTIFICATIONS and alert.user and alert.user.email:
-            try:
-                email_sent = send_alert_notification(
-                    user_email=alert.user.email,
-                    symbol=alert.stock_symbol,
-                    current_price=current_price,
-                    condition=alert.condition.value if alert.condition else "N/A",
-                    target_value=alert.target_value,
-                    triggered_at=triggered_at_str,
-                    alert_type=alert.alert_type.value,
-                    sma_value=sma_value,
-                    sma_period=sma_period,
-                    ema_value=ema_value,
-                    ema_period=ema_period,
-                    rsi_value=rsi_value,
-                    rsi_period=rsi_period,
-                )
-                
-                # Update history entry with email sent timestamp
-                if email_sent:
-                    history_entry.email_sent = True
-                    history_entry.email_sent_at = now
-                    db.commit()
-                    
-                    logger.info(
-                        f"Email notification sent for alert",
-                        extra={
-                            "alert_id": alert.id,
-                            "user_email": alert.user.email,
-                            "history_id": history_entry.id,
-                        },
-                    )
-            except Exception as e:
-                # Don't fail alert trigger if email fails
-                logger.warning(
-                    f"Failed to send email notification",
-                    extra={
-                        "alert_id": alert.id,
-                        "history_id": history_entry.id,
-                        "error": str(e),
-                        "error_type": type(e).__name__,
-                    },
-                )
+        return notification
         
-        # Broadcast alert via WebSocket to all connected clients
-        try:
-            alert_data = {
-                "type": "alert",
+    except Exception as e:
+        db.rollback()
+        logger.error(
+            f"Failed to trigger alert",
+            extra={
                 "alert_id": alert.id,
-                "symbol": alert.stock_symbol,
-                "message": f"🔔 Alert triggered: {alert.stock_symbol} hit target {alert.condition.value if alert.condition else ''} ${alert.target_value:.2f} (Current: ${current_price:.2f})",
-                "current_price": current_price,
-                "target_value": alert.target_value,
-                "condition": alert.condition.value if alert.condition else "N/A",
-                "alert_type": alert.alert_type.value,
-                "timestamp": triggered_at_str,
-            }
+                "error": str(e),
+                "error_type": type(e).__name__,
+            },
+            exc_info=True,
+        )
+        return None
+
+
+def send_email_notification(notification: AlertNotification) -> bool:
+    """Send the trigger email (blocking SMTP); False if disabled or failed."""
+    if not settings.ENABLE_EMAIL_NOTIFICATIONS or not notification.user_email:
+        return False
+    try:
+        return send_alert_notification(
+            user_email=notification.user_email,
+            symbol=notification.symbol,
+            current_price=notification.current_price,
+            condition=notification.condition or "N/A",
+            target_value=notification.target_value,
+            triggered_at=notification.triggered_at,
+            alert_type=notification.alert_type,
+            **notification.indicators,
+        )
+    except Exception as e:
+        # Don't fail alert trigger if email fails
+        logger.warning(
+            f"Failed to send email notification",
+            extra={
+                "alert_id": notification.alert_id,
+                "history_id": notification.history_id,
+                "error": str(e),
+                "error_type": type(e).__name__,
+            },
+        )
+        return False
+
+
+def send_whatsapp_for_alert(notification: AlertNotification) -> bool:
+    """Send the WhatsApp message (blocking HTTP); False if disabled or failed."""
+    if not settings.ENABLE_WHATSAPP_NOTIFICATIONS or not notification.whatsapp_phone:
+        return False
+    try:
+        whatsapp_sent = send_whatsapp_notification(
+            phone_number=notification.whatsapp_phone,
+            message=notification.whatsapp_message(),
+        )
+        if whatsapp_sent:
+            logger.info(
+                f"✅ WhatsApp alert sent with formatted message",
+                extra={
+                    "alert_id": notification.alert_id,
+                    "phone": notification.whatsapp_phone,
+                    "symbol": notification.symbol,
+                },
+            )
+        return bool(whatsapp_sent)
+    except Exception as e:
+        # Don't fail alert trigger if WhatsApp fails
+        logger.warning(
+            f"Failed to send WhatsApp alert",
+            extra={
+                "alert_id": notification.alert_id,
+                "error": str(e),
+                "error_type": type(e).__name__,
+            },
+        )
+        return False
+
+
+def trigger_alert(
+    db: Session,
+    alert: Alert,
+    current_price: float,
+    sma_value: Optional[float] = None,
+    sma_period: Optional[int] = None,
+    ema_value: Optional[float] = None,
+    ema_period: Optional[int] = None,
+    rsi_value: Optional[float] = None,
+    rsi_period: Optional[int] = None,
+) -> bool:
+    """
+    Trigger an alert by marking it as inactive and setting triggered_at timestamp.
+    
+    This function is called when an alert condition is matched.
+    It updates the alert in the database atomically, records alert history, and queues
+    email/WhatsApp/WebSocket notifications in the outbox (delivered by the outbox dispatcher).
+    
+    Production enhancements:
+    - Sets is_triggered = True (prevents duplicate emails within cooldown period)
+    - Records is_triggered not for 10-minute cooldown before re-arming
+    - Creates AlertHistory entry for complete audit trail
+    - Queues notifications in the same transaction (no SMTP call on the alert tick)
+    
+    Args:
+        db: Database session
+        alert: Alert to trigger
+        current_price: Current stock price that matched the condition
+        sma_value: Optional SMA value (for SMA alerts)
+        sma_period: Optional SMA period (for SMA alerts)
+        ema_value: Optional EMA value (for EMA alerts and combined signals)
+        ema_period: Optional EMA period (for EMA alerts and combined signals)
+        rsi_value: Optional RSI value (for RSI alerts and combined signals)
+        rsi_period: Optional RSI period (for RSI alerts and combined signals)
+        
+    Returns:
+        True if alert was triggered successfully, False if already triggered
+    """
+    notification = record_alert_trigger(
+        db,
+        alert,
+        current_price,
+        sma_value=sma_value,
+        sma_period=sma_period,
+        ema_value=ema_value,
+        ema_period=ema_period,
+        rsi_value=rsi_value,
+        rsi_period=rsi_period,
+    )
+    if notification is None:
+        return False
+    notification_dispatcher.wake()
+    return True
+
+
+# ----------------------------------------------------------------------------
+# Alert check cycle steps (shared by the thread and asyncio pipelines)
+# ----------------------------------------------------------------------------
+
+def fetch_live_quotes(symbols: List[str]) -> Dict[str, Quote]:
+    """
+    Fresh quotes for the alert tick.
+
+    Daily histories come from the history cache and store, which may lag the
+    market by minutes; the quotes are fetched without stale-while-revalidate
+    so current prices are at most MARKET_DATA_QUOTE_TTL_SECONDS old. Errors
+    leave the tick on cached bars.
+    """
+    try:
+        return market_data_gateway.get_quotes(symbols, allow_stale=False)
+    except Exception as e:
+        logger.error(
+            f"Error fetching live quotes",
+            extra={
+                "symbols_count": len(symbols),
+                "error": str(e),
+                "error_type": type(e).__name__,
+            },
+            exc_info=True,
+        )
+        return {}
+
+
+def _starts_new_bar(data: Any, quote: Quote) -> bool:
+    """
+    True when the quote belongs to a session after the newest cached bar:
+    the quote is dated later and its previous close is that bar's close.
+    """
+    last_bar = data.index[-1]
+    quote_time = pd.Timestamp(quote.timestamp)
+    if last_bar.tzinfo is not None:
+        quote_time = quote_time.tz_convert(last_bar.tzinfo)
+    else:
+        quote_time = quote_time.tz_localize(None)
+    if quote_time.date() <= last_bar.date():
+        return False
+    return bool(np.isclose(float(data["Close"].iloc[-1]), quote.previous_close, rtol=1e-4))
+
+
+def build_snapshots(
+    compiled: CompiledAlerts,
+    histories: Dict[str, Any],
+    quotes: Optional[Dict[str, Quote]] = None,
+) -> Tuple[Dict[str, MarketSnapshot], List[str]]:
+    """
+    Market snapshots for every compiled symbol with usable history.
+    
+    Args:
+        compiled: Compiled active alerts
+        histories: Daily OHLCV frames by symbol (indicator inputs)
+        quotes: Live quotes by symbol (see fetch_live_quotes); they set the
+            current price and volume on top of the cached bars
+    
+    Returns:
+        (snapshots by symbol, symbols without data)
+    """
+    quotes = quotes or {}
+    snapshots = {}
+    symbols_with_errors = []
+    for symbol, alerts_count in zip(compiled.symbols, compiled.alert_counts().tolist()):
+        try:
+            data = histories.get(symbol)
             
-            # Broadcast via WebSocket (async operation)
-            asyncio.create_task(alert_manager.broadcast_alert(alert_data))
+            if data is None or data.empty:
+                logger.warning(
+                    f"No price data available",
+                    extra={"symbol": symbol, "alerts_count": alerts_count},
+                )
+                symbols_with_errors.append(symbol)
+                continue
             
-            logger.info(
-                f"✅ Alert broadcasted via WebSocket",
+            quote = quotes.get(symbol)
+            if quote is not None:
+                snapshot = MarketSnapshot.from_history(
+                    data,
+                    VOLUME_AVERAGE_BARS,
+                    live_price=quote.price,
+                    live_volume=float(quote.volume),
+                    new_bar=_starts_new_bar(data, quote),
+                )
+            else:
+                snapshot = MarketSnapshot.from_history(data, VOLUME_AVERAGE_BARS)
+            snapshots[symbol] = snapshot
+            
+            logger.debug(
+                f"Fetched data for symbol",
                 extra={
-                    "alert_id": alert.id,
-                    "symbol": alert.stock_symbol,
-                    "subscribers": alert_manager.get_subscriber_count(),
+                    "symbol": symbol,
+                    "current_price": snapshot.current_price,
+                    "current_volume": snapshot.current_volume,
+                    "avg_volume": snapshot.avg_volume,
+                    "alerts_count": alerts_count,
                 },
             )
         except Exception as e:
-            # Don't fail alert trigger if WebSocket broadcast fails
-            logger.warning(
-                f"Failed to broadcast alert via WebSocket",
+            logger.error(
+                f"Error reading data for symbol",
                 extra={
-                    "alert_id": alert.id,
+                    "symbol": symbol,
+                    "alerts_count": alerts_count,
                     "error": str(e),
+                    "error_type": type(e).__name__,
                 },
+                exc_info=True,
             )
-        
-        # Send WhatsApp notification if enabled and user has phone configured
-        try:
-            # Check if user has WhatsApp notifications enabled and phone number set
-            if (
-                settings.ENABLE_WHATSAPP_NOTIFICATIONS
-                and alert.user
-                and hasattr(alert.user, "whatsapp_phone")
-                and alert.user.whatsapp_phone
-            ):
-                # Format beautifully structured WhatsApp message
-                time_now = datetime.utcnow().strftime("%d-%m-%Y %H:%M")
-                condition_str = alert.condition.value if alert.condition else "N/A"
-                
-                formatted_message = f"""🚨 *STOCK ALERT*
+            symbols_with_errors.append(symbol)
+    return snapshots, symbols_with_errors
 
-📈 Symbol: *{alert.stock_symbol}*
-🎯 Target Hit: ₹{alert.target_value:.2f}
-📊 Condition: {alert.stock_symbol} {condition_str} ₹{alert.target_value:.2f}
-💹 Current Price: ₹{current_price:.2f}
-🕒 Time: {time_now}
 
-⚡ *Action:* Check your dashboard now!
+def log_invalid_alerts(compiled: CompiledAlerts, evaluation: AlertEvaluation) -> None:
+    """Log alerts skipped for missing/invalid configuration or insufficient data."""
+    for index in np.flatnonzero(evaluation.invalid):
+        invalid_type = alert_type_of(int(compiled.type_code[index]))
+        logger.error(
+            f"Alert skipped: missing/invalid configuration or insufficient data",
+            extra={
+                "alert_id": int(compiled.alert_ids[index]),
+                "alert_type": invalid_type.value if invalid_type else None,
+                "symbol": compiled.symbol_of(index),
+                "sma_period": int(compiled.sma_period[index]) or None,
+                "ema_period": int(compiled.ema_period[index]) or None,
+                "rsi_period": int(compiled.rsi_period[index]) or None,
+            },
+        )
 
-_- StockSentinel_"""
-                
-                whatsapp_sent = send_whatsapp_notification(
-                    phone_number=alert.user.whatsapp_phone,
-                    message=formatted_message,
+
+def apply_alert_decisions(
+    db: Session,
+    compiled: CompiledAlerts,
+    evaluation: AlertEvaluation,
+    trigger: Callable[..., bool] = trigger_alert,
+) -> Tuple[int, Dict[str, int]]:
+    """
+    Apply cooldown/re-arm logic, trigger matching alerts and store per-tick state.
+    
+    Args:
+        db: Database session (committed once at the end)
+        compiled: Compiled alert table of this tick
+        evaluation: evaluate_alerts() result for ``compiled``
+        trigger: Called as trigger(db, alert, price, **indicator_values) for
+            every alert that fires; returns True if it was triggered
+    
+    Returns:
+        (total triggered, triggers by alert type)
+    """
+    from app.models.alert import AlertType
+    
+    total_triggered = 0
+    stats_by_type = {alert_type.value: 0 for alert_type in AlertType}
+    
+    # Only alerts that trigger, re-arm or carry per-tick state need to
+    # touch the ORM; everything else is already decided.
+    attention = np.flatnonzero(evaluation.needs_attention)
+    loaded_alerts = load_alerts(db, compiled.alert_ids[attention])
+    
+    cooldown_seconds = settings.ALERT_COOLDOWN_MINUTES * 60
+    dev_mode = settings.ALERT_DEV_MODE
+    
+    for index in attention:
+        alert = loaded_alerts.get(int(compiled.alert_ids[index]))
+        if alert is None or not alert.is_active:
+            # Deleted or deactivated since the rows were read
+            continue
+        
+        symbol = compiled.symbol_of(index)
+        current_price = float(evaluation.price[index])
+        try:
+            alert_type = alert.alert_type
+            should_trigger = bool(evaluation.met[index])
+            
+            # PRODUCTION: Implement cooldown and re-arm logic
+            # =============================================
+            if should_trigger:
+                # Condition is met - check if we're in cooldown period
+                if alert.is_triggered and alert.last_triggered_at:
+                    # Check if cooldown period is still active (unless in dev mode)
+                    time_since_trigger = datetime.utcnow() - alert.last_triggered_at
+                    
+                    if not dev_mode and time_since_trigger.total_seconds() < cooldown_seconds:
+                        # Still in cooldown period - skip this trigger
+                        if settings.ALERT_LOG_COOLDOWN_CHECKS:
+                            logger.debug(
+                                f"Alert in cooldown period, skipping trigger",
+                                extra={
+                                    "alert_id": alert.id,
+                                    "seconds_until_rearm": cooldown_seconds - int(time_since_trigger.total_seconds()),
+                                },
+                            )
+                        should_trigger = False  # Don't trigger during cooldown
+                    elif dev_mode and alert.is_triggered:
+                        # Dev mode: Allow re-trigger despite cooldown
+                        logger.info(
+                            f"Dev mode: Overriding cooldown, allowing trigger",
+                            extra={
+                                "alert_id": alert.id,
+                                "seconds_since_trigger": int(time_since_trigger.total_seconds()),
+                            },
+                        )
+            elif alert.is_triggered:
+                # Condition NOT met - re-arm so the alert can fire again
+                # after the cooldown expires
+                logger.info(
+                    f"Re-arming alert (condition no longer met)",
+                    extra={
+                        "alert_id": alert.id,
+                        "alert_type": alert_type.value,
+                        "symbol": symbol,
+                    },
                 )
-                
-                if whatsapp_sent:
-                    logger.info(
-                        f"✅ WhatsApp alert sent with formatted message",
-                        extra={
-                            "alert_id": alert.id,
-                            "phone": alert.user.whatsapp_phone,
-                            "symbol": alert.stock_symbol,
-                        },
-                    )
+                alert.is_triggered = False
+                alert.last_triggered_at = None
+            
+            # Trigger alert if condition met AND not in cooldown
+            if should_trigger:
+                if trigger(
+                    db,
+                    alert,
+                    current_price,
+                    **evaluation.indicator_values(compiled, index),
+                ):
+                    total_triggered += 1
+                    stats_by_type[alert_type.value] += 1
+            
+            # Per-tick state for percentage change, crash and crossover alerts
+            if tracks_last_price(alert_type):
+                alert.last_price = current_price
+            if alert_type == AlertType.EMA_CROSSOVER:
+                alert.last_ema = float(evaluation.ema[index])
+            if alert_type == AlertType.RSI_CROSSOVER:
+                alert.last_rsi = float(evaluation.rsi[index])
+            
         except Exception as e:
-            # Don't fail alert trigger if WhatsApp fails
-            logger.warning(
-                f"Failed to send WhatsApp alert",
+            logger.error(
+                f"Error checking individual alert",
                 extra={
                     "alert_id": alert.id,
+                    "alert_type": alert.alert_type.value,
+                    "symbol": symbol,
                     "error": str(e),
                     "error_type": type(e).__name__,
                 },
+                exc_info=True,
             )
-        
-        logger.info(
-            f"Alert trigger complete",
-            extra={
-                "alert_id": alert.id,
-                "email_sent": email_sent,
-                "history_recorded": True,
-                "is_triggered": True,
-            },
-        )
-        
-        return True
-        
-    except Exception as e:
-        db.rollback()
-        logger.error(
-            f"Failed to trigger alert",
-            extra={
-                "alert_id": alert.id,
-                "error": str(e),
-                "error_type": type(e).__name__,
-            },
-            exc_info=True,
-        )
-        return False
+            continue
+    
+    # One commit for re-arms and per-tick state (triggers commit themselves)
+    db.commit()
+    return total_triggered, stats_by_type
 
 
 def check_all_alerts() -> None:
     """
     Check all active alerts and trigger those whose conditions are met.
     
-    This function is called by the background scheduler every 30 seconds.
+    This function is called by the background scheduler every 30 seconds
+    (thread mode; see app.services.alert_pipeline for the asyncio pipeline).
     Supports multiple alert types:
       - PRICE: Simple price threshold (existing)
       - PERCENTAGE_CHANGE: Monitor percentage change from last price
@@ -968,9 +1294,11 @@ def check_all_alerts() -> None:
     
     It:
       1. Fetches all active alerts from the database
-      2. Groups them by stock symbol for efficient price/volume fetching
-      3. Fetches current prices and volume data using yfinance
-      4. Compares against alert conditions based on alert type
+      2. Compiles them into NumPy columns (app.services.alert_engine)
+      3. Fetches the daily history of every symbol in chunked batch downloads
+         through the market data gateway (cached per symbol)
+      4. Computes each indicator once per (symbol, indicator, period) and
+         evaluates every alert of the symbol as array comparisons
       5. Triggers matching alerts and updates last_price
       6. Handles errors gracefully without stopping other checks
     
@@ -981,13 +1309,12 @@ def check_all_alerts() -> None:
     
     try:
         from app.db.session import SessionLocal
-        from app.models.alert import AlertType
         
         # Create database session for this check
         db = SessionLocal()
         
-        # Fetch all active alerts
-        active_alerts = db.query(Alert).filter(Alert.is_active == True).all()
+        # Fetch all active alerts (column rows; ORM objects are loaded lazily below)
+        active_alerts = fetch_active_alert_rows(db)
         
         if not active_alerts:
             logger.debug("No active alerts to check")
@@ -998,786 +1325,40 @@ def check_all_alerts() -> None:
             extra={"total_alerts": len(active_alerts)},
         )
         
-        # Group alerts by symbol for efficient fetching
-        alerts_by_symbol = {}
-        for alert in active_alerts:
-            symbol = alert.stock_symbol.upper()
-            if symbol not in alerts_by_symbol:
-                alerts_by_symbol[symbol] = []
-            alerts_by_symbol[symbol].append(alert)
-        
-        # Track results
-        total_checked = 0
-        total_triggered = 0
-        symbols_with_errors = []
-        stats_by_type = {alert_type.value: 0 for alert_type in AlertType}
-        
-        # Check each symbol
-        for symbol, alerts in alerts_by_symbol.items():
-            try:
-                # Fetch stock data (price and volume)
-                stock = yf.Ticker(symbol)
-                data = stock.history(period="20d")  # Get 20 days for volume average
-                
-                if data.empty:
-                    logger.warning(
-                        f"No price data available",
-                        extra={"symbol": symbol, "alerts_count": len(alerts)},
-                    )
-                    symbols_with_errors.append(symbol)
-                    continue
-                
-                # Extract current values
-                current_price = float(data["Close"].iloc[-1])
-                current_volume = float(data["Volume"].iloc[-1])
-                
-                # Calculate average volume (20-day, excluding current)
-                avg_volume = float(data["Volume"].iloc[:-1].mean()) if len(data) > 1 else current_volume
-                
-                logger.debug(
-                    f"Fetched data for symbol",
-                    extra={
-                        "symbol": symbol,
-                        "current_price": current_price,
-                        "current_volume": current_volume,
-                        "avg_volume": avg_volume,
-                        "alerts_count": len(alerts),
-                    },
-                )
-                
-                # Check each alert for this symbol
-                for alert in alerts:
-                    try:
-                        total_checked += 1
-                        alert_type = alert.alert_type
-                        should_trigger = False
-                        sma_value_for_email = None
-                        sma_period_for_email = None
-                        ema_value_for_email = None
-                        ema_period_for_email = None
-                        rsi_value_for_email = None
-                        rsi_period_for_email = None
-                        
-                        # Dispatch to appropriate check method based on alert type
-                        if alert_type == AlertType.PRICE:
-                            should_trigger = alert.check_alert(current_price)
-                        
-                        elif alert_type == AlertType.PERCENTAGE_CHANGE:
-                            should_trigger = alert.check_alert(
-                                current_price,
-                                avg_volume=avg_volume,
-                                current_volume=current_volume
-                            )
-                        
-                        elif alert_type == AlertType.VOLUME_SPIKE:
-                            should_trigger = alert.check_alert(
-                                current_price,
-                                avg_volume=avg_volume,
-                                current_volume=current_volume
-                            )
-                        
-                        elif alert_type == AlertType.CRASH:
-                            should_trigger = alert.check_alert(current_price)
-                        
-                        elif alert_type == AlertType.SMA_ABOVE:
-                            # Price above SMA
-                            try:
-                                if alert.sma_period is None:
-                                    logger.error(
-                                        f"SMA_ABOVE alert missing sma_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                sma_data = calculate_sma(symbol, alert.sma_period)
-                                sma_value_for_email = sma_data["sma"]
-                                sma_period_for_email = alert.sma_period
-                                should_trigger = current_price > sma_value_for_email
-                                logger.debug(
-                                    f"SMA_ABOVE check",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "current_price": current_price,
-                                        "sma": sma_value_for_email,
-                                        "period": alert.sma_period,
-                                        "should_trigger": should_trigger,
-                                    }
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating SMA for SMA_ABOVE alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.SMA_BELOW:
-                            # Price below SMA
-                            try:
-                                if alert.sma_period is None:
-                                    logger.error(
-                                        f"SMA_BELOW alert missing sma_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                sma_data = calculate_sma(symbol, alert.sma_period)
-                                sma_value_for_email = sma_data["sma"]
-                                sma_period_for_email = alert.sma_period
-                                should_trigger = current_price < sma_value_for_email
-                                logger.debug(
-                                    f"SMA_BELOW check",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "current_price": current_price,
-                                        "sma": sma_value_for_email,
-                                        "period": alert.sma_period,
-                                        "should_trigger": should_trigger,
-                                    }
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating SMA for SMA_BELOW alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.SMA_CROSSOVER:
-                            # Price crosses SMA (from below to above or above to below)
-                            try:
-                                if alert.sma_period is None:
-                                    logger.error(
-                                        f"SMA_CROSSOVER alert missing sma_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                sma_data = calculate_sma(symbol, alert.sma_period)
-                                sma_value_for_email = sma_data["sma"]
-                                sma_period_for_email = alert.sma_period
-                                
-                                # Check for crossover: price was on one side, now on other
-                                if alert.last_price is not None:
-                                    prev_above = alert.last_price > sma_value_for_email
-                                    curr_above = current_price > sma_value_for_email
-                                    should_trigger = prev_above != curr_above
-                                    
-                                    if should_trigger:
-                                        direction = "above" if curr_above else "below"
-                                        logger.info(
-                                            f"SMA_CROSSOVER detected",
-                                            extra={
-                                                "alert_id": alert.id,
-                                                "symbol": symbol,
-                                                "previous_price": alert.last_price,
-                                                "current_price": current_price,
-                                                "sma": sma_value_for_email,
-                                                "period": alert.sma_period,
-                                                "direction": direction,
-                                            }
-                                        )
-                                    else:
-                                        logger.debug(
-                                            f"SMA_CROSSOVER no cross detected",
-                                            extra={
-                                                "alert_id": alert.id,
-                                                "symbol": symbol,
-                                                "previous_price": alert.last_price,
-                                                "current_price": current_price,
-                                                "sma": sma_value_for_email,
-                                            }
-                                        )
-                                else:
-                                    # First check - establish baseline
-                                    logger.debug(
-                                        f"SMA_CROSSOVER first check (establishing baseline)",
-                                        extra={
-                                            "alert_id": alert.id,
-                                            "symbol": symbol,
-                                            "current_price": current_price,
-                                            "sma": sma_value_for_email,
-                                        }
-                                    )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating SMA for SMA_CROSSOVER alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.RSI_OVERBOUGHT:
-                            # RSI > 70 (overbought condition)
-                            try:
-                                if alert.rsi_period is None:
-                                    logger.error(
-                                        f"RSI_OVERBOUGHT alert missing rsi_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                rsi_data = calculate_rsi(symbol, alert.rsi_period)
-                                rsi_value_for_email = rsi_data["rsi"]
-                                rsi_period_for_email = alert.rsi_period
-                                should_trigger = rsi_value_for_email > 70
-                                logger.debug(
-                                    f"RSI_OVERBOUGHT check",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "rsi": rsi_value_for_email,
-                                        "period": alert.rsi_period,
-                                        "should_trigger": should_trigger,
-                                    }
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating RSI for RSI_OVERBOUGHT alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.RSI_OVERSOLD:
-                            # RSI < 30 (oversold condition)
-                            try:
-                                if alert.rsi_period is None:
-                                    logger.error(
-                                        f"RSI_OVERSOLD alert missing rsi_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                rsi_data = calculate_rsi(symbol, alert.rsi_period)
-                                rsi_value_for_email = rsi_data["rsi"]
-                                rsi_period_for_email = alert.rsi_period
-                                should_trigger = rsi_value_for_email < 30
-                                logger.debug(
-                                    f"RSI_OVERSOLD check",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "rsi": rsi_value_for_email,
-                                        "period": alert.rsi_period,
-                                        "should_trigger": should_trigger,
-                                    }
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating RSI for RSI_OVERSOLD alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.RSI_CROSSOVER:
-                            # RSI crosses 30 or 70 thresholds
-                            try:
-                                if alert.rsi_period is None:
-                                    logger.error(
-                                        f"RSI_CROSSOVER alert missing rsi_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                rsi_data = calculate_rsi(symbol, alert.rsi_period)
-                                rsi_value_for_email = rsi_data["rsi"]
-                                rsi_period_for_email = alert.rsi_period
-                                
-                                # Check for RSI crossing thresholds
-                                if alert.last_rsi is not None:
-                                    # Crossover from oversold to overbought zone
-                                    crossed_30_up = alert.last_rsi <= 30 and rsi_value_for_email > 30
-                                    # Crossover from overbought to oversold zone
-                                    crossed_70_down = alert.last_rsi >= 70 and rsi_value_for_email < 70
-                                    should_trigger = crossed_30_up or crossed_70_down
-                                    
-                                    if should_trigger:
-                                        if crossed_30_up:
-                                            direction = "above 30"
-                                        else:
-                                            direction = "below 70"
-                                        logger.info(
-                                            f"RSI_CROSSOVER detected",
-                                            extra={
-                                                "alert_id": alert.id,
-                                                "symbol": symbol,
-                                                "previous_rsi": alert.last_rsi,
-                                                "current_rsi": rsi_value_for_email,
-                                                "period": alert.rsi_period,
-                                                "direction": direction,
-                                            }
-                                        )
-                                    else:
-                                        logger.debug(
-                                            f"RSI_CROSSOVER no cross detected",
-                                            extra={
-                                                "alert_id": alert.id,
-                                                "symbol": symbol,
-                                                "previous_rsi": alert.last_rsi,
-                                                "current_rsi": rsi_value_for_email,
-                                            }
-                                        )
-                                else:
-                                    # First check - establish baseline
-                                    logger.debug(
-                                        f"RSI_CROSSOVER first check (establishing baseline)",
-                                        extra={
-                                            "alert_id": alert.id,
-                                            "symbol": symbol,
-                                            "current_rsi": rsi_value_for_email,
-                                        }
-                                    )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating RSI for RSI_CROSSOVER alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.EMA_ABOVE:
-                            # Price above EMA
-                            try:
-                                if alert.ema_period is None:
-                                    logger.error(
-                                        f"EMA_ABOVE alert missing ema_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                ema_data = calculate_ema(symbol, alert.ema_period)
-                                ema_value_for_email = ema_data["ema"]
-                                ema_period_for_email = alert.ema_period
-                                should_trigger = current_price > ema_value_for_email
-                                logger.debug(
-                                    f"EMA_ABOVE check",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "current_price": current_price,
-                                        "ema": ema_value_for_email,
-                                        "period": alert.ema_period,
-                                        "should_trigger": should_trigger,
-                                    }
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating EMA for EMA_ABOVE alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.EMA_BELOW:
-                            # Price below EMA
-                            try:
-                                if alert.ema_period is None:
-                                    logger.error(
-                                        f"EMA_BELOW alert missing ema_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                ema_data = calculate_ema(symbol, alert.ema_period)
-                                ema_value_for_email = ema_data["ema"]
-                                ema_period_for_email = alert.ema_period
-                                should_trigger = current_price < ema_value_for_email
-                                logger.debug(
-                                    f"EMA_BELOW check",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "current_price": current_price,
-                                        "ema": ema_value_for_email,
-                                        "period": alert.ema_period,
-                                        "should_trigger": should_trigger,
-                                    }
-                                )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating EMA for EMA_BELOW alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.EMA_CROSSOVER:
-                            # Price crosses EMA (from below to above or above to below)
-                            try:
-                                if alert.ema_period is None:
-                                    logger.error(
-                                        f"EMA_CROSSOVER alert missing ema_period",
-                                        extra={"alert_id": alert.id}
-                                    )
-                                    continue
-                                ema_data = calculate_ema(symbol, alert.ema_period)
-                                ema_value_for_email = ema_data["ema"]
-                                ema_period_for_email = alert.ema_period
-                                
-                                # Check for crossover: price was on one side, now on other
-                                if alert.last_price is not None:
-                                    prev_above = alert.last_price > ema_value_for_email
-                                    curr_above = current_price > ema_value_for_email
-                                    should_trigger = prev_above != curr_above
-                                    
-                                    if should_trigger:
-                                        direction = "above" if curr_above else "below"
-                                        logger.info(
-                                            f"EMA_CROSSOVER detected",
-                                            extra={
-                                                "alert_id": alert.id,
-                                                "symbol": symbol,
-                                                "previous_price": alert.last_price,
-                                                "current_price": current_price,
-                                                "ema": ema_value_for_email,
-                                                "period": alert.ema_period,
-                                                "direction": direction,
-                                            }
-                                        )
-                                    else:
-                                        logger.debug(
-                                            f"EMA_CROSSOVER no cross detected",
-                                            extra={
-                                                "alert_id": alert.id,
-                                                "symbol": symbol,
-                                                "previous_price": alert.last_price,
-                                                "current_price": current_price,
-                                                "ema": ema_value_for_email,
-                                            }
-                                        )
-                                else:
-                                    # First check - establish baseline
-                                    logger.debug(
-                                        f"EMA_CROSSOVER first check (establishing baseline)",
-                                        extra={
-                                            "alert_id": alert.id,
-                                            "symbol": symbol,
-                                            "current_price": current_price,
-                                            "ema": ema_value_for_email,
-                                        }
-                                    )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating EMA for EMA_CROSSOVER alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.STRONG_BUY_SIGNAL:
-                            # Combined signal: Price > SMA AND Price > EMA AND RSI < 30 (oversold)
-                            try:
-                                if alert.sma_period is None or alert.ema_period is None or alert.rsi_period is None:
-                                    logger.error(
-                                        f"STRONG_BUY_SIGNAL alert missing required periods",
-                                        extra={
-                                            "alert_id": alert.id,
-                                            "sma_period": alert.sma_period,
-                                            "ema_period": alert.ema_period,
-                                            "rsi_period": alert.rsi_period,
-                                        }
-                                    )
-                                    continue
-                                
-                                # Calculate all three indicators
-                                sma_data = calculate_sma(symbol, alert.sma_period)
-                                ema_data = calculate_ema(symbol, alert.ema_period)
-                                rsi_data = calculate_rsi(symbol, alert.rsi_period)
-                                
-                                sma_value_for_email = sma_data["sma"]
-                                ema_value_for_email = ema_data["ema"]
-                                rsi_value_for_email = rsi_data["rsi"]
-                                sma_period_for_email = alert.sma_period
-                                ema_period_for_email = alert.ema_period
-                                rsi_period_for_email = alert.rsi_period
-                                
-                                # All conditions must be met for strong buy signal
-                                price_above_sma = current_price > sma_value_for_email
-                                price_above_ema = current_price > ema_value_for_email
-                                rsi_oversold = rsi_value_for_email < 30
-                                
-                                should_trigger = price_above_sma and price_above_ema and rsi_oversold
-                                
-                                logger.debug(
-                                    f"STRONG_BUY_SIGNAL check",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "current_price": current_price,
-                                        "sma": sma_value_for_email,
-                                        "ema": ema_value_for_email,
-                                        "rsi": rsi_value_for_email,
-                                        "price_above_sma": price_above_sma,
-                                        "price_above_ema": price_above_ema,
-                                        "rsi_oversold": rsi_oversold,
-                                        "should_trigger": should_trigger,
-                                    }
-                                )
-                                
-                                if should_trigger:
-                                    logger.info(
-                                        f"🚀 STRONG_BUY_SIGNAL detected",
-                                        extra={
-                                            "alert_id": alert.id,
-                                            "symbol": symbol,
-                                            "current_price": current_price,
-                                            "sma": sma_value_for_email,
-                                            "ema": ema_value_for_email,
-                                            "rsi": rsi_value_for_email,
-                                        }
-                                    )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating indicators for STRONG_BUY_SIGNAL alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.STRONG_SELL_SIGNAL:
-                            # Combined signal: Price < SMA AND Price < EMA AND RSI > 70 (overbought)
-                            try:
-                                if alert.sma_period is None or alert.ema_period is None or alert.rsi_period is None:
-                                    logger.error(
-                                        f"STRONG_SELL_SIGNAL alert missing required periods",
-                                        extra={
-                                            "alert_id": alert.id,
-                                            "sma_period": alert.sma_period,
-                                            "ema_period": alert.ema_period,
-                                            "rsi_period": alert.rsi_period,
-                                        }
-                                    )
-                                    continue
-                                
-                                # Calculate all three indicators
-                                sma_data = calculate_sma(symbol, alert.sma_period)
-                                ema_data = calculate_ema(symbol, alert.ema_period)
-                                rsi_data = calculate_rsi(symbol, alert.rsi_period)
-                                
-                                sma_value_for_email = sma_data["sma"]
-                                ema_value_for_email = ema_data["ema"]
-                                rsi_value_for_email = rsi_data["rsi"]
-                                sma_period_for_email = alert.sma_period
-                                ema_period_for_email = alert.ema_period
-                                rsi_period_for_email = alert.rsi_period
-                                
-                                # All conditions must be met for strong sell signal
-                                price_below_sma = current_price < sma_value_for_email
-                                price_below_ema = current_price < ema_value_for_email
-                                rsi_overbought = rsi_value_for_email > 70
-                                
-                                should_trigger = price_below_sma and price_below_ema and rsi_overbought
-                                
-                                logger.debug(
-                                    f"STRONG_SELL_SIGNAL check",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "current_price": current_price,
-                                        "sma": sma_value_for_email,
-                                        "ema": ema_value_for_email,
-                                        "rsi": rsi_value_for_email,
-                                        "price_below_sma": price_below_sma,
-                                        "price_below_ema": price_below_ema,
-                                        "rsi_overbought": rsi_overbought,
-                                        "should_trigger": should_trigger,
-                                    }
-                                )
-                                
-                                if should_trigger:
-                                    logger.info(
-                                        f"📉 STRONG_SELL_SIGNAL detected",
-                                        extra={
-                                            "alert_id": alert.id,
-                                            "symbol": symbol,
-                                            "current_price": current_price,
-                                            "sma": sma_value_for_email,
-                                            "ema": ema_value_for_email,
-                                            "rsi": rsi_value_for_email,
-                                        }
-                                    )
-                            except Exception as e:
-                                logger.error(
-                                    f"Error calculating indicators for STRONG_SELL_SIGNAL alert",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                    exc_info=True
-                                )
-                                continue
-                        
-                        elif alert_type == AlertType.CUSTOM:
-                            should_trigger = alert.check_alert(current_price)
-                        
-                        # PRODUCTION: Implement cooldown and re-arm logic
-                        # =============================================
-                        cooldown_minutes = settings.ALERT_COOLDOWN_MINUTES
-                        dev_mode = settings.ALERT_DEV_MODE
-                        
-                        if should_trigger:
-                            # Condition is met - check if we're in cooldown period
-                            if alert.is_triggered and alert.last_triggered_at:
-                                # Check if cooldown period is still active (unless in dev mode)
-                                time_since_trigger = datetime.utcnow() - alert.last_triggered_at
-                                cooldown_seconds = cooldown_minutes * 60
-                                
-                                if not dev_mode and time_since_trigger.total_seconds() < cooldown_seconds:
-                                    # Still in cooldown period - skip this trigger
-                                    if settings.ALERT_LOG_COOLDOWN_CHECKS:
-                                        logger.debug(
-                                            f"Alert in cooldown period, skipping trigger",
-                                            extra={
-                                                "alert_id": alert.id,
-                                                "seconds_until_rearm": cooldown_seconds - int(time_since_trigger.total_seconds()),
-                                            },
-                                        )
-                                    should_trigger = False  # Don't trigger during cooldown
-                                elif dev_mode and alert.is_triggered:
-                                    # Dev mode: Allow re-trigger despite cooldown
-                                    logger.info(
-                                        f"Dev mode: Overriding cooldown, allowing trigger",
-                                        extra={
-                                            "alert_id": alert.id,
-                                            "seconds_since_trigger": int(time_since_trigger.total_seconds()),
-                                        },
-                                    )
-                        else:
-                            # Condition NOT met - implement re-arm logic
-                            if alert.is_triggered:
-                                # Alert was previously triggered but condition is now false
-                                # Reset is_triggered to allow triggering again after cooldown expires
-                                logger.info(
-                                    f"Re-arming alert (condition no longer met)",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "alert_type": alert_type.value,
-                                        "symbol": symbol,
-                                    },
-                                )
-                                alert.is_triggered = False
-                                alert.last_triggered_at = None
-                                db.commit()
-                        
-                        # Trigger alert if condition met AND not in cooldown
-                        if should_trigger:
-                            if trigger_alert(
-                                db,
-                                alert,
-                                current_price,
-                                sma_value=sma_value_for_email,
-                                sma_period=sma_period_for_email,
-                                ema_value=ema_value_for_email,
-                                ema_period=ema_period_for_email,
-                                rsi_value=rsi_value_for_email,
-                                rsi_period=rsi_period_for_email,
-                            ):
-                                total_triggered += 1
-                                stats_by_type[alert_type.value] += 1
-                        
-                        # Update last_price for percentage change, crash, SMA crossover, and EMA crossover alerts
-                        if alert_type in [AlertType.PERCENTAGE_CHANGE, AlertType.CRASH, AlertType.SMA_CROSSOVER, AlertType.EMA_CROSSOVER]:
-                            alert.last_price = current_price
-                            db.commit()
-                        
-                        # Update last_ema for EMA crossover alerts
-                        if alert_type == AlertType.EMA_CROSSOVER:
-                            try:
-                                if alert.ema_period is not None:
-                                    ema_data = calculate_ema(symbol, alert.ema_period)
-                                    alert.last_ema = ema_data["ema"]
-                                    db.commit()
-                            except Exception as e:
-                                logger.error(
-                                    f"Error updating last_ema for EMA_CROSSOVER",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                )
-                        
-                        # Update last_rsi for RSI crossover alerts
-                        if alert_type == AlertType.RSI_CROSSOVER:
-                            try:
-                                if alert.rsi_period is not None:
-                                    rsi_data = calculate_rsi(symbol, alert.rsi_period)
-                                    alert.last_rsi = rsi_data["rsi"]
-                                    db.commit()
-                            except Exception as e:
-                                logger.error(
-                                    f"Error updating last_rsi for RSI_CROSSOVER",
-                                    extra={
-                                        "alert_id": alert.id,
-                                        "symbol": symbol,
-                                        "error": str(e),
-                                    },
-                                )
-                        
-                    except Exception as e:
-                        logger.error(
-                            f"Error checking individual alert",
-                            extra={
-                                "alert_id": alert.id,
-                                "alert_type": alert.alert_type.value,
-                                "symbol": symbol,
-                                "error": str(e),
-                                "error_type": type(e).__name__,
-                            },
-                            exc_info=True,
-                        )
-                        continue
-                
-            except Exception as e:
-                logger.error(
-                    f"Error fetching data for symbol",
-                    extra={
-                        "symbol": symbol,
-                        "alerts_count": len(alerts),
-                        "error": str(e),
-                        "error_type": type(e).__name__,
-                    },
-                    exc_info=True,
-                )
-                symbols_with_errors.append(symbol)
-                continue
+        # Compile alerts into columns (see app.services.alert_engine)
+        compiled = compile_alerts(active_alerts)
+        
+        # Fetch stock data (price and volume) for all symbols in chunked batch
+        # downloads. The same cached window feeds every SMA/EMA/RSI the engine
+        # computes for a symbol.
+        fetch_started = time.monotonic()
+        batches_before = market_data_gateway.counter("history_batches")
+        try:
+            histories = market_data_gateway.get_history_batch(compiled.symbols, period=INDICATOR_HISTORY_PERIOD)
+        except Exception as e:
+            logger.error(
+                f"Error fetching batch price data",
+                extra={
+                    "symbols_count": len(compiled.symbols),
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                },
+                exc_info=True,
+            )
+            histories = {}
+        # Current prices from fresh quotes; the cached bars may lag the market
+        quotes = fetch_live_quotes(compiled.symbols)
+        fetch_ms = (time.monotonic() - fetch_started) * 1000
+        fetch_batches = market_data_gateway.counter("history_batches") - batches_before
+        
+        snapshots, symbols_with_errors = build_snapshots(compiled, histories, quotes)
+        
+        # Evaluate every alert at once
+        evaluation = evaluate_alerts(compiled, snapshots)
+        total_checked = int(evaluation.has_data.sum())
+        log_invalid_alerts(compiled, evaluation)
+        
+        total_triggered, stats_by_type = apply_alert_decisions(db, compiled, evaluation)
         
         # Log detailed summary
         logger.info(
@@ -1785,7 +1366,9 @@ def check_all_alerts() -> None:
             extra={
                 "total_alerts_checked": total_checked,
                 "alerts_triggered": total_triggered,
-                "symbols_processed": len(alerts_by_symbol),
+                "symbols_processed": len(compiled.symbols),
+                "fetch_ms": round(fetch_ms, 1),
+                "fetch_batches": fetch_batches,
                 "symbols_with_errors": len(symbols_with_errors),
                 "error_symbols": symbols_with_errors if symbols_with_errors else None,
                 "triggers_by_type": stats_by_type,
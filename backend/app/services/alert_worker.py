@@ -0,0 +1,291 @@
+"""
+Sharded alert worker for Stock Sentinel.
+
+Runs alert checking outside the API processes so it can scale horizontally:
+
+    python -m app.services.alert_worker [--worker-id NAME]
+
+Set ALERT_SCHEDULER_ENABLED=false on the API processes when workers run,
+otherwise the API scheduler checks every alert as well.
+
+Features:
+  - Alerts are partitioned into ALERT_SHARD_COUNT shards by a stable hash of
+    the stock symbol (alert_engine.shard_of)
+  - Workers coordinate through the database only (no leader): each one
+    heartbeats `alert_workers` and leases shards in `alert_shard_leases`
+  - Shards are spread with rendezvous hashing over the live workers, so a
+    joining or leaving worker only moves its own share of shards
+  - A shard is checked only by the holder of its unexpired lease; shards of
+    a dead worker move to the others once its lease expires
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import signal
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import FrozenSet, List, Optional, Set
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.executor import run_db, shutdown_db_executor
+from app.models.alert_worker import AlertShardLease, AlertWorkerHeartbeat
+from app.services.alert_engine import shard_of
+from app.services.alert_pipeline import check_all_alerts_async
+
+logger = logging.getLogger(__name__)
+
+# Heartbeat rows older than this many lease periods are deleted
+_PRUNE_AFTER_LEASES = 10
+
+
+def default_worker_id() -> str:
+    """Unique id for this process: host, pid and a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _rendezvous_score(worker_id: str, shard_id: int) -> int:
+    digest = hashlib.blake2b(f"{worker_id}:{shard_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def assign_shards(worker_id: str, live_workers: List[str], shard_count: int) -> Set[int]:
+    """Shards whose highest rendezvous score among ``live_workers`` is ``worker_id``."""
+    return {
+        shard_id
+        for shard_id in range(shard_count)
+        if max(live_workers, key=lambda worker: _rendezvous_score(worker, shard_id)) == worker_id
+    }
+
+
+# ============================================================================
+# Shard coordination (database leases)
+# ============================================================================
+
+class ShardCoordinator:
+    """
+    Heartbeat and shard leases of one worker.
+
+    Every method takes a session and commits its own work; call them through
+    app.db.executor.run_db() so they never run on the event loop.
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        shard_count: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+    ):
+        self.worker_id = worker_id
+        self.shard_count = max(shard_count or settings.ALERT_SHARD_COUNT, 1)
+        self.lease_seconds = max(lease_seconds or settings.ALERT_WORKER_LEASE_SECONDS, 1)
+        self.owned: FrozenSet[int] = frozenset()
+
+    def ensure_shards(self, db: Session) -> None:
+        """Create missing lease rows for the configured shard count."""
+        existing = {shard_id for (shard_id,) in db.query(AlertShardLease.shard_id)}
+        missing = [shard_id for shard_id in range(self.shard_count) if shard_id not in existing]
+        if not missing:
+            return
+        db.add_all(AlertShardLease(shard_id=shard_id) for shard_id in missing)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker created them at the same time
+            db.rollback()
+
+    def rebalance(self, db: Session) -> FrozenSet[int]:
+        """
+        Heartbeat, release shards that now belong to others, claim or renew
+        our own, and return the shards this worker holds a lease on.
+        """
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        live_since = now - timedelta(seconds=self.lease_seconds)
+
+        db.merge(AlertWorkerHeartbeat(worker_id=self.worker_id, heartbeat_at=now, shard_count=len(self.owned)))
+        db.commit()
+
+        live_workers = sorted(
+            worker_id
+            for (worker_id,) in db.query(AlertWorkerHeartbeat.worker_id).filter(
+                AlertWorkerHeartbeat.heartbeat_at >= live_since
+            )
+        )
+        if self.worker_id not in live_workers:
+            live_workers.append(self.worker_id)
+        wanted = sorted(assign_shards(self.worker_id, live_workers, self.shard_count))
+
+        # Release first so the new owner can claim on its next tick
+        db.query(AlertShardLease).filter(
+            AlertShardLease.owner == self.worker_id,
+            AlertShardLease.shard_id.notin_(wanted),
+        ).update({AlertShardLease.owner: None, AlertShardLease.expires_at: None}, synchronize_session=False)
+
+        if wanted:
+            # Conditional update: free, expired or already ours
+            db.query(AlertShardLease).filter(
+                AlertShardLease.shard_id.in_(wanted),
+                or_(
+                    AlertShardLease.owner == self.worker_id,
+                    AlertShardLease.owner.is_(None),
+                    AlertShardLease.expires_at < now,
+                ),
+            ).update({AlertShardLease.owner: self.worker_id, AlertShardLease.expires_at: lease_until}, synchronize_session=False)
+        db.commit()
+
+        self.owned = frozenset(
+            shard_id
+            for (shard_id,) in db.query(AlertShardLease.shard_id).filter(
+                AlertShardLease.owner == self.worker_id,
+                AlertShardLease.expires_at > now,
+            )
+        )
+
+        db.query(AlertWorkerHeartbeat).filter(AlertWorkerHeartbeat.worker_id == self.worker_id).update(
+            {AlertWorkerHeartbeat.shard_count: len(self.owned)}, synchronize_session=False
+        )
+        db.query(AlertWorkerHeartbeat).filter(
+            AlertWorkerHeartbeat.heartbeat_at < now - timedelta(seconds=self.lease_seconds * _PRUNE_AFTER_LEASES)
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        if len(self.owned) < len(wanted):
+            logger.info(
+                f"Waiting for shard leases held by other workers",
+                extra={
+                    "worker_id": self.worker_id,
+                    "owned": len(self.owned),
+                    "wanted": len(wanted),
+                    "live_workers": len(live_workers),
+                },
+            )
+        return self.owned
+
+    def release_all(self, db: Session) -> None:
+        """Give up every lease and drop the heartbeat (graceful shutdown)."""
+        db.query(AlertShardLease).filter(AlertShardLease.owner == self.worker_id).update(
+            {AlertShardLease.owner: None, AlertShardLease.expires_at: None}, synchronize_session=False
+        )
+        db.query(AlertWorkerHeartbeat).filter(AlertWorkerHeartbeat.worker_id == self.worker_id).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        self.owned = frozenset()
+
+    def owns_symbol(self, symbol: str) -> bool:
+        return shard_of(symbol, self.shard_count) in self.owned
+
+
+# ============================================================================
+# Worker loop
+# ============================================================================
+
+class AlertWorker:
+    """Checks the alerts of the shards it leases, once per interval."""
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        interval_seconds: Optional[int] = None,
+        coordinator: Optional[ShardCoordinator] = None,
+    ):
+        self.worker_id = worker_id or default_worker_id()
+        self.interval_seconds = interval_seconds or settings.ALERT_WORKER_INTERVAL_SECONDS
+        self.coordinator = coordinator or ShardCoordinator(self.worker_id)
+        self._stop = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def run_tick(self) -> None:
+        """Rebalance leases, then check the alerts of the owned shards."""
+        started = time.monotonic()
+        try:
+            owned = await run_db(self.coordinator.rebalance)
+        except Exception as e:
+            logger.error(
+                f"Shard rebalance failed, skipping tick",
+                extra={"worker_id": self.worker_id, "error": str(e), "error_type": type(e).__name__},
+                exc_info=True,
+            )
+            return
+
+        if owned:
+            await check_all_alerts_async(symbol_filter=self.coordinator.owns_symbol)
+
+        logger.debug(
+            f"Alert worker tick completed",
+            extra={
+                "worker_id": self.worker_id,
+                "shards": len(owned),
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            },
+        )
+
+    async def run(self) -> None:
+        """Tick until stop() is called, then release all leases."""
+        await run_db(self.coordinator.ensure_shards)
+        logger.info(
+            f"✅ Alert worker started",
+            extra={
+                "worker_id": self.worker_id,
+                "shard_count": self.coordinator.shard_count,
+                "interval_seconds": self.interval_seconds,
+            },
+        )
+        try:
+            while not self._stop.is_set():
+                tick_started = time.monotonic()
+                await self.run_tick()
+                remaining = self.interval_seconds - (time.monotonic() - tick_started)
+                if remaining > 0:
+                    try:
+                        await asyncio.wait_for(self._stop.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            try:
+                await run_db(self.coordinator.release_all)
+            except Exception as e:
+                logger.warning(f"Failed to release shard leases: {e}", extra={"worker_id": self.worker_id})
+            shutdown_db_executor()
+            logger.info("✅ Alert worker stopped", extra={"worker_id": self.worker_id})
+
+
+async def _main(worker_id: Optional[str]) -> None:
+    worker = AlertWorker(worker_id=worker_id)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except (NotImplementedError, RuntimeError):
+            # Windows: fall back to KeyboardInterrupt
+            pass
+    await worker.run()
+
+
+def main() -> None:
+    from app.core.logging_config import setup_logging
+
+    parser = argparse.ArgumentParser(description="Run a sharded Stock Sentinel alert worker")
+    parser.add_argument("--worker-id", default=None, help="Stable worker id (default: host:pid:random)")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        asyncio.run(_main(args.worker_id))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
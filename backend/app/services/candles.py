@@ -0,0 +1,143 @@
+"""
+Columnar serialization of OHLCV frames for Stock Sentinel.
+
+Candle endpoints used to walk frames with DataFrame.iterrows() and build a
+Pydantic object per row. The helpers here read each column once as a NumPy
+array and produce response JSON directly.
+
+Features:
+  - candle_columns(): cleaned columns; rows without a full OHLC are
+    dropped, missing volume becomes 0
+  - candle_records(): [{time_key, "open", "high", "low", "close",
+    "volume"}, ...] in the shape of the existing response models
+  - candle_columnar(): compact {"t": [...], "o", "h", "l", "c", "v"} with
+    t in epoch seconds (the ?format=columnar option)
+  - Timestamps are formatted per column with NumPy; ISO strings match
+    what Pydantic writes for the same datetimes
+"""
+
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Response formats of the candle endpoints
+ROWS = "rows"
+COLUMNAR = "columnar"
+CANDLE_FORMATS = (ROWS, COLUMNAR)
+
+_PRICE_COLUMNS = ("Open", "High", "Low", "Close")
+
+
+class CandleColumns(NamedTuple):
+    index: pd.DatetimeIndex
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+def candle_columns(frame: Optional[pd.DataFrame]) -> CandleColumns:
+    """OHLCV columns of a frame (DatetimeIndex, Open/High/Low/Close/Volume)."""
+    if frame is None or frame.empty:
+        empty = np.empty(0)
+        return CandleColumns(pd.DatetimeIndex([]), empty, empty, empty, empty, np.empty(0, dtype=np.int64))
+
+    prices = np.column_stack(
+        [pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64) for column in _PRICE_COLUMNS]
+    )
+    complete = ~np.isnan(prices).any(axis=1)
+    if "Volume" in frame:
+        volume = pd.to_numeric(frame["Volume"], errors="coerce").to_numpy(dtype=np.float64)
+    else:
+        volume = np.zeros(len(frame))
+    if not complete.all():
+        logger.debug(f"Dropping {int((~complete).sum())} incomplete candles")
+
+    prices = prices[complete]
+    return CandleColumns(
+        index=pd.DatetimeIndex(frame.index[complete]),
+        open=prices[:, 0],
+        high=prices[:, 1],
+        low=prices[:, 2],
+        close=prices[:, 3],
+        volume=np.nan_to_num(volume[complete], nan=0.0).astype(np.int64),
+    )
+
+
+def _offset_suffix(seconds: int) -> str:
+    if seconds == 0:
+        return "Z"
+    sign = "+" if seconds > 0 else "-"
+    hours, minutes = divmod(abs(seconds) // 60, 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+def _wall_clock(index: pd.DatetimeIndex, unit: str) -> np.ndarray:
+    """Local wall-clock times of an index as datetime64 strings with the given unit."""
+    local = index.tz_localize(None) if index.tz is not None else index
+    return np.datetime_as_string(local.to_numpy().astype(f"datetime64[{unit}]"), unit=unit)
+
+
+def iso_timestamps(index: pd.DatetimeIndex) -> List[str]:
+    """
+    ISO 8601 strings (whole seconds) as Pydantic writes datetimes: "Z" for
+    UTC, "+HH:MM" for other time zones, no suffix for naive times.
+    """
+    text = _wall_clock(index, "s")
+    if index.tz is None:
+        return text.tolist()
+    # Offsets east of UTC in seconds; an index only holds a handful of them
+    offsets = index.tz_localize(None).as_unit("s").asi8 - index.as_unit("s").asi8
+    unique, inverse = np.unique(offsets, return_inverse=True)
+    suffixes = np.array([_offset_suffix(int(offset)) for offset in unique])
+    return np.char.add(text, suffixes[inverse]).tolist()
+
+
+def _format_times(index: pd.DatetimeIndex, time_format: Optional[str]) -> List[str]:
+    if time_format is None:
+        return iso_timestamps(index)
+    if time_format == "%Y-%m-%d":
+        return _wall_clock(index, "D").tolist()
+    return list(index.strftime(time_format))
+
+
+def candle_records(
+    candles: CandleColumns,
+    time_key: str = "timestamp",
+    time_format: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    One JSON-ready dict per candle. Times are ISO 8601, or formatted with
+    ``time_format`` (strftime) when given.
+    """
+    times = _format_times(candles.index, time_format)
+    keys = (time_key, "open", "high", "low", "close", "volume")
+    columns = zip(
+        times,
+        candles.open.tolist(),
+        candles.high.tolist(),
+        candles.low.tolist(),
+        candles.close.tolist(),
+        candles.volume.tolist(),
+    )
+    return [dict(zip(keys, row)) for row in columns]
+
+
+def candle_columnar(candles: CandleColumns) -> Dict[str, list]:
+    """Compact columnar candles: {"t": epoch seconds, "o", "h", "l", "c", "v"}."""
+    return {
+        "t": candles.index.as_unit("s").asi8.tolist(),
+        "o": candles.open.tolist(),
+        "h": candles.high.tolist(),
+        "l": candles.low.tolist(),
+        "c": candles.close.tolist(),
+        "v": candles.volume.tolist(),
+    }
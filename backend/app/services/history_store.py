@@ -0,0 +1,559 @@
+"""
+Local OHLCV history store for Stock Sentinel.
+
+Keeps daily and intraday bars per (symbol, interval) so that repeated history
+requests only go upstream for the bars added since the last stored one.
+MarketDataGateway serves every get_history()/get_history_batch() call from
+here, which covers the indicator service, the alert engine, stock charts and
+portfolio growth.
+
+Features:
+  - In-process window per series, bounded to the newest N bars
+  - Incremental tail fetch: only bars since the last stored bar are requested,
+    plus one overlapping completed bar; when upstream has re-adjusted it (a
+    split or dividend since the last sync) the series is refetched in full
+  - Backfill when a longer period than the stored one is requested
+  - Periods are sliced from the newest bar, so weekends/holidays still
+    return the last sessions; "1d" and "5d" count trading sessions like
+    Yahoo's native ranges ("1d" of 5-minute bars is the last session only)
+  - A series at its bar limit serves longer periods (and "max") from what it
+    holds instead of refetching bars that would be truncated again
+  - Optional persistence as one NumPy .npz file per series (survives restarts)
+  - Batch sync: every series that needs a tail shares one upstream call
+"""
+
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+INTRADAY_INTERVALS = {"1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"}
+
+# Relative change of an overlapping bar's close that means upstream has
+# re-adjusted the history (splits/dividends; auto_adjust=True downloads)
+_ADJUSTMENT_TOLERANCE = 1e-4
+
+_PERIOD_PATTERN = re.compile(r"^(\d+)(d|wk|mo|y)$")
+# Yahoo ranges that count trading sessions rather than calendar days
+_SESSION_PERIODS = {"1d": 1, "5d": 5}
+
+
+def empty_ohlcv_frame() -> pd.DataFrame:
+    """Empty OHLCV frame returned when no history is available."""
+    return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+
+def period_offset(period: str) -> Optional[pd.DateOffset]:
+    """
+    Calendar length of a yfinance-style period ("5d", "1wk", "3mo", "1y").
+
+    Returns None for open-ended or unknown periods ("max", "ytd", ...).
+    """
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        return None
+    amount, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return pd.DateOffset(days=amount)
+    if unit == "wk":
+        return pd.DateOffset(weeks=amount)
+    if unit == "mo":
+        return pd.DateOffset(months=amount)
+    return pd.DateOffset(years=amount)
+
+
+def period_sessions(period: str) -> Optional[int]:
+    """
+    Number of trading sessions of Yahoo's session ranges ("1d", "5d"), None
+    for other periods. yfinance turns custom "Nd" periods ("30d") into a
+    calendar start date, so those stay calendar offsets here as well.
+    """
+    return _SESSION_PERIODS.get(period)
+
+
+def period_start(period: str, anchor: pd.Timestamp) -> Optional[pd.Timestamp]:
+    """First timestamp covered by ``period`` ending at ``anchor`` (None = unbounded)."""
+    if period == "ytd":
+        return anchor.normalize().replace(month=1, day=1)
+    offset = period_offset(period)
+    if offset is None:
+        return None
+    return anchor - offset
+
+
+# ============================================================================
+# Series
+# ============================================================================
+
+@dataclass
+class _Series:
+    """Stored bars for one (symbol, interval)."""
+
+    frame: pd.DataFrame
+    # Oldest timestamp we have asked upstream for (None = nothing fetched yet)
+    covered_from: Optional[pd.Timestamp] = None
+    # Full history ("max") fetched; no backfill ever needed
+    complete: bool = False
+    synced_at: float = 0.0
+
+    def __post_init__(self):
+        self.lock = threading.Lock()
+
+    @property
+    def last_bar(self) -> Optional[pd.Timestamp]:
+        return self.frame.index[-1] if len(self.frame) else None
+
+
+def _normalize_index(frame: pd.DataFrame) -> pd.DataFrame:
+    """Sorted DatetimeIndex without duplicates, OHLCV columns only."""
+    if not isinstance(frame.index, pd.DatetimeIndex):
+        frame = frame.set_axis(pd.DatetimeIndex(frame.index), axis=0)
+    columns = [column for column in OHLCV_COLUMNS if column in frame.columns]
+    frame = frame[columns]
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+    if frame.index.has_duplicates:
+        frame = frame[~frame.index.duplicated(keep="last")]
+    return frame
+
+
+def _align_tz(index_from: pd.DatetimeIndex, frame: pd.DataFrame) -> pd.DataFrame:
+    """Convert frame's index to the timezone of index_from (stored series win)."""
+    target_tz = index_from.tz
+    source_tz = frame.index.tz
+    if target_tz is None and source_tz is None:
+        return frame
+    if target_tz is None:
+        return frame.set_axis(frame.index.tz_convert(None), axis=0)
+    if source_tz is None:
+        return frame.set_axis(frame.index.tz_localize("UTC").tz_convert(target_tz), axis=0)
+    return frame.set_axis(frame.index.tz_convert(target_tz), axis=0)
+
+
+# ============================================================================
+# Store
+# ============================================================================
+
+class HistoryStore:
+    """
+    Per-symbol OHLCV store with incremental sync from a MarketDataProvider.
+
+    Usage:
+        frame = history_store.read("AAPL", "3mo", "1d", provider)
+        frames = history_store.read_batch(["AAPL", "MSFT"], "3mo", "1d", provider)
+
+    Returned frames share memory with the store and must be treated as
+    read-only.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_daily_bars: Optional[int] = None,
+        max_intraday_bars: Optional[int] = None,
+        max_series: Optional[int] = None,
+    ):
+        self.directory = settings.HISTORY_STORE_DIR if directory is None else directory
+        self.max_daily_bars = max_daily_bars or settings.HISTORY_STORE_MAX_DAILY_BARS
+        self.max_intraday_bars = max_intraday_bars or settings.HISTORY_STORE_MAX_INTRADAY_BARS
+        self.max_series = max_series or settings.HISTORY_STORE_MAX_SERIES
+
+        self._series: "OrderedDict[Tuple[str, str], _Series]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "reads": 0,
+            "local_reads": 0,
+            "tail_fetches": 0,
+            "full_fetches": 0,
+            "refetches": 0,
+            "bars_fetched": 0,
+            "disk_loads": 0,
+            "disk_writes": 0,
+            "disk_errors": 0,
+            "evictions": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def read(self, symbol: str, period: str, interval: str, provider: Any) -> pd.DataFrame:
+        """Bars for ``period`` (synced from the provider if needed)."""
+        symbol = symbol.upper()
+        series = self._get_series(symbol, interval)
+        self._count("reads")
+
+        with series.lock:
+            plan = self._plan(series, period, interval)
+            if plan == "full":
+                self._count("full_fetches")
+                frame = self._safe_fetch(lambda: provider.fetch_history(symbol, period, interval), symbol)
+                self._merge(symbol, interval, series, frame, period)
+            elif plan == "tail":
+                self._count("tail_fetches")
+                frame = self._safe_fetch(
+                    lambda: provider.fetch_history_since(symbol, _tail_start(series), interval), symbol
+                )
+                if self._readjusted(series, frame):
+                    self._count("refetches")
+                    frame = self._safe_fetch(lambda: provider.fetch_history(symbol, period, interval), symbol)
+                    self._replace(symbol, interval, series, frame, period)
+                else:
+                    self._merge(symbol, interval, series, frame, None)
+            else:
+                self._count("local_reads")
+            return self._slice(series.frame, period)
+
+    def read_batch(
+        self,
+        symbols: Sequence[str],
+        period: str,
+        interval: str,
+        provider: Any,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Bars for many symbols. Series that need a tail share one batch call,
+        series that need a full fetch (including tails that revealed a
+        re-adjusted history) share another.
+        """
+        normalized = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        self._count("reads", len(normalized))
+        series_by_symbol = {symbol: self._get_series(symbol, interval) for symbol in normalized}
+
+        full: List[str] = []
+        tail: List[str] = []
+        for symbol, series in series_by_symbol.items():
+            with series.lock:
+                plan = self._plan(series, period, interval)
+            if plan == "full":
+                full.append(symbol)
+            elif plan == "tail":
+                tail.append(symbol)
+            else:
+                self._count("local_reads")
+
+        readjusted: List[str] = []
+        if tail:
+            self._count("tail_fetches")
+            start = min(_as_utc(_tail_start(series_by_symbol[symbol])) for symbol in tail)
+            fetched = self._safe_fetch(
+                lambda: provider.fetch_history_since_batch(tail, start, interval), ",".join(tail)
+            )
+            for symbol in tail:
+                series = series_by_symbol[symbol]
+                frame = fetched.get(symbol) if fetched else None
+                with series.lock:
+                    if self._readjusted(series, frame):
+                        readjusted.append(symbol)
+                    else:
+                        self._merge(symbol, interval, series, frame, None)
+
+        if readjusted:
+            self._count("refetches", len(readjusted))
+            full.extend(readjusted)
+
+        if full:
+            self._count("full_fetches")
+            fetched = self._safe_fetch(lambda: provider.fetch_history_batch(full, period, interval), ",".join(full))
+            for symbol in full:
+                series = series_by_symbol[symbol]
+                frame = fetched.get(symbol) if fetched else None
+                with series.lock:
+                    if symbol in readjusted:
+                        self._replace(symbol, interval, series, frame, period)
+                    else:
+                        self._merge(symbol, interval, series, frame, period)
+
+        frames: Dict[str, pd.DataFrame] = {}
+        for symbol, series in series_by_symbol.items():
+            with series.lock:
+                frames[symbol] = self._slice(series.frame, period)
+        return frames
+
+    def clear(self) -> None:
+        """Drop every in-memory series (files on disk are kept)."""
+        with self._lock:
+            self._series.clear()
+
+    def stats(self) -> dict:
+        """Store counters plus series count and in-memory size."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._lock:
+            series = list(self._series.values())
+        stats["series"] = len(series)
+        stats["bars"] = sum(len(s.frame) for s in series)
+        stats["size_bytes"] = int(sum(s.frame.memory_usage(deep=False).sum() for s in series))
+        stats["persistent"] = bool(self.directory)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Sync planning / merging
+    # ------------------------------------------------------------------
+
+    def _plan(self, series: _Series, period: str, interval: str) -> str:
+        """'full' (nothing or too little stored), 'tail' (stale) or 'local'."""
+        if series.last_bar is None or (series.covered_from is None and not series.complete):
+            return "full"
+        # At the bar limit older bars would be truncated right away, so the
+        # stored window is all this store can answer for any longer period
+        at_capacity = len(series.frame) >= self._max_bars(interval)
+        if not series.complete and not at_capacity:
+            needed_from = period_start(period, pd.Timestamp.now(tz="UTC"))
+            if needed_from is None:
+                return "full"
+            if needed_from < _as_utc(series.covered_from):
+                return "full"
+        if time.monotonic() - series.synced_at >= self._sync_interval(interval):
+            return "tail"
+        return "local"
+
+    def _merge(
+        self,
+        symbol: str,
+        interval: str,
+        series: _Series,
+        frame: Optional[pd.DataFrame],
+        period: Optional[str],
+    ) -> None:
+        """
+        Merge fetched bars into the series (newer bars replace stored ones).
+
+        A full fetch only extends the covered window when upstream returned
+        bars: an error or empty answer leaves coverage as it was, so the
+        window is requested again on the next read.
+        """
+        if frame is None or frame.empty:
+            if period is None:
+                # Nothing new since the last bar; retry after the sync interval
+                series.synced_at = time.monotonic()
+            return
+
+        series.synced_at = time.monotonic()
+        if period is not None:
+            # We asked upstream for this whole window, even if it returned less
+            requested_from = period_start(period, pd.Timestamp.now(tz="UTC"))
+            if requested_from is None:
+                series.complete = True
+            elif series.covered_from is None or requested_from < _as_utc(series.covered_from):
+                series.covered_from = requested_from
+
+        new_bars = _normalize_index(frame)
+        self._count("bars_fetched", len(new_bars))
+        if len(series.frame):
+            new_bars = _align_tz(series.frame.index, new_bars)
+            stored = series.frame
+            combined = pd.concat([stored[stored.index < new_bars.index[0]], new_bars, stored[stored.index > new_bars.index[-1]]])
+            combined = _normalize_index(combined)
+        else:
+            combined = new_bars
+
+        max_bars = self._max_bars(interval)
+        if len(combined) > max_bars:
+            combined = combined.iloc[-max_bars:]
+            series.complete = False
+            first_bar = _as_utc(combined.index[0])
+            if series.covered_from is None or first_bar > _as_utc(series.covered_from):
+                series.covered_from = first_bar
+
+        series.frame = combined
+        self._persist(symbol, interval, series)
+
+    @staticmethod
+    def _readjusted(series: _Series, frame: Optional[pd.DataFrame]) -> bool:
+        """
+        True when a tail fetch returned the overlapping completed bar with a
+        different close than the stored one: upstream adjusted the history
+        for a split or dividend, so the stored bars are on an old scale.
+        """
+        if frame is None or frame.empty or len(series.frame) < 2 or "Close" not in frame:
+            return False
+        reference = series.frame.index[-2]
+        new_bars = _align_tz(series.frame.index, _normalize_index(frame))
+        if reference not in new_bars.index:
+            return False
+        stored = float(series.frame["Close"].iloc[-2])
+        fetched = float(new_bars["Close"].loc[reference])
+        if stored <= 0 or np.isnan(stored) or np.isnan(fetched):
+            return False
+        return abs(fetched - stored) / stored > _ADJUSTMENT_TOLERANCE
+
+    def _replace(
+        self,
+        symbol: str,
+        interval: str,
+        series: _Series,
+        frame: Optional[pd.DataFrame],
+        period: str,
+    ) -> None:
+        """
+        Swap a re-adjusted series for a full fetch. On an error or empty
+        answer the stored bars are kept and the next read tries again.
+        """
+        if frame is None or frame.empty:
+            return
+        logger.info(f"History of {symbol} ({interval}) was re-adjusted upstream; refetched {period}")
+        series.frame = empty_ohlcv_frame()
+        series.covered_from = None
+        series.complete = False
+        self._merge(symbol, interval, series, frame, period)
+
+    @staticmethod
+    def _slice(frame: pd.DataFrame, period: str) -> pd.DataFrame:
+        """
+        Bars of ``period`` counted back from the newest bar (a view, not a
+        copy): the last sessions for "1d"/"5d", calendar time otherwise.
+        """
+        if frame.empty:
+            return empty_ohlcv_frame()
+        sessions = period_sessions(period)
+        if sessions is not None:
+            # Session dates in the exchange time zone of the index
+            days = frame.index.normalize().asi8
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1))
+            position = starts[-sessions] if sessions < len(starts) else 0
+            return frame.iloc[position:]
+        start = period_start(period, frame.index[-1])
+        if start is None:
+            return frame
+        position = frame.index.searchsorted(start, side="right")
+        return frame.iloc[position:]
+
+    def _safe_fetch(self, fetch, label: str) -> Any:
+        try:
+            return fetch()
+        except Exception as e:
+            logger.warning(f"History store upstream fetch failed for {label}: {str(e)[:100]}")
+            return None
+
+    def _max_bars(self, interval: str) -> int:
+        return self.max_intraday_bars if interval in INTRADAY_INTERVALS else self.max_daily_bars
+
+    @staticmethod
+    def _sync_interval(interval: str) -> int:
+        """Minimum seconds between upstream syncs of one series."""
+        if interval in INTRADAY_INTERVALS:
+            return settings.MARKET_DATA_INTRADAY_TTL_SECONDS
+        return settings.MARKET_DATA_DAILY_TTL_SECONDS
+
+    # ------------------------------------------------------------------
+    # Series registry
+    # ------------------------------------------------------------------
+
+    def _get_series(self, symbol: str, interval: str) -> _Series:
+        key = (symbol, interval)
+        with self._lock:
+            series = self._series.get(key)
+            if series is not None:
+                self._series.move_to_end(key)
+                return series
+
+        loaded = self._load(symbol, interval) or _Series(frame=empty_ohlcv_frame())
+
+        with self._lock:
+            series = self._series.setdefault(key, loaded)
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+                self._count("evictions")
+            return series
+
+    # ------------------------------------------------------------------
+    # Persistence (one .npz per series)
+    # ------------------------------------------------------------------
+
+    def _path(self, symbol: str, interval: str) -> str:
+        safe_symbol = re.sub(r"[^A-Z0-9._-]", "_", symbol)
+        return os.path.join(self.directory, interval, f"{safe_symbol}.npz")
+
+    def _load(self, symbol: str, interval: str) -> Optional[_Series]:
+        if not self.directory:
+            return None
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                tz = str(data["tz"]) or None
+                index = pd.DatetimeIndex(data["index"].astype("datetime64[ns]"))
+                index = index.tz_localize("UTC").tz_convert(tz) if tz else index
+                frame = pd.DataFrame(
+                    {column: data[column] for column in OHLCV_COLUMNS if column in data.files},
+                    index=index,
+                )
+                covered_from = int(data["covered_from"])
+                series = _Series(
+                    frame=frame,
+                    covered_from=pd.Timestamp(covered_from, tz="UTC") if covered_from >= 0 else None,
+                    complete=bool(data["complete"]),
+                )
+            self._count("disk_loads")
+            return series
+        except Exception as e:
+            self._count("disk_errors")
+            logger.warning(f"Could not load stored history {path}: {str(e)[:100]}")
+            return None
+
+    def _persist(self, symbol: str, interval: str, series: _Series) -> None:
+        if not self.directory:
+            return
+        path = self._path(symbol, interval)
+        index = series.frame.index
+        arrays = {
+            column: series.frame[column].to_numpy(dtype=np.float64)
+            for column in OHLCV_COLUMNS
+            if column in series.frame.columns
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                np.savez(
+                    handle,
+                    index=index.asi8,
+                    tz=np.array(str(index.tz) if index.tz is not None else ""),
+                    covered_from=np.array(series.covered_from.value if series.covered_from is not None else -1),
+                    complete=np.array(series.complete),
+                    **arrays,
+                )
+            os.replace(tmp_path, path)
+            self._count("disk_writes")
+        except Exception as e:
+            self._count("disk_errors")
+            logger.warning(f"Could not persist history {path}: {str(e)[:100]}")
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+
+def _tail_start(series: _Series) -> pd.Timestamp:
+    """
+    Start of a tail fetch: the last completed bar (the one before the newest,
+    which may still be forming) so the fetch overlaps the stored history.
+    """
+    index = series.frame.index
+    return index[-2] if len(index) > 1 else index[-1]
+
+
+def _as_utc(value: pd.Timestamp) -> pd.Timestamp:
+    return value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+
+# Global history store instance (used by market_data_gateway)
+history_store = HistoryStore()
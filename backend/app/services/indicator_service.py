@@ -5,19 +5,37 @@ Provides simple calculations for technical indicators:
 - Simple Moving Average (SMA)
 
 Features:
-- Clean, simple implementation using yfinance
+- Clean, simple implementation on top of the market data gateway
 - Standard error handling using app.core.exceptions
-- No caching (can be added later if needed)
+- SMA/EMA/RSI share one cached daily history per symbol
+- Indicator math from app.services.technical_indicators
+- Multi-indicator requests ("sma:14,ema:20,rsi:14") are answered from one
+  cached per-symbol bundle built from a single history fetch, over a window
+  long enough for the largest requested period
+- Bulk requests for many symbols stream results chunk by chunk over
+  concurrent batch history downloads (stream_indicators)
 """
 
+import asyncio
 import logging
+import math
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-import yfinance as yf
+import numpy as np
+import pandas as pd
 
+from app.config import settings
+from app.core.cache import indicator_cache
 from app.core.exceptions import ValidationError, StockNotFoundError
+from app.services import technical_indicators
+from app.services.market_data import market_data_gateway
 
 logger = logging.getLogger(__name__)
 
+# One history window for every indicator so SMA/EMA/RSI for a symbol
+# resolve to the same cached gateway entry.
+INDICATOR_HISTORY_PERIOD = "3mo"
+
 
 def calculate_sma(
     symbol: str,
@@ -54,11 +72,8 @@ def calculate_sma(
         logger.info(f"Calculating SMA - symbol: {symbol}, period: {period}")
         
         try:
-            # Fetch historical data (1 month should be sufficient for SMA)
-            # No timeout on macOS/Linux - yfinance is simple and usually fast
-            # On Windows, signal.alarm() is not supported anyway
-            ticker = yf.Ticker(symbol)
-            history = ticker.history(period="1mo")
+            # Fetch daily history (shared with EMA/RSI via the gateway cache)
+            history = market_data_gateway.get_history(symbol, period=INDICATOR_HISTORY_PERIOD)
         except Exception as e:
             logger.warning(f"Error fetching SMA data for {symbol}: {e}")
             raise StockNotFoundError(symbol)
@@ -91,8 +106,7 @@ def calculate_sma(
             )
         
         # Calculate SMA: average of last N closing prices
-        last_prices = closes[-period:]
-        sma_value = float(sum(last_prices) / len(last_prices))
+        sma_value = technical_indicators.sma_last(closes, period)
         current_price = float(closes[-1])
         
         logger.info(
@@ -169,11 +183,8 @@ def calculate_rsi(
         logger.info(f"Calculating RSI - symbol: {symbol}, period: {period}")
         
         try:
-            # Fetch historical data (need at least period + 1 data points)
-            # No timeout on macOS/Linux - yfinance is simple and usually fast
-            # On Windows, signal.alarm() is not supported anyway
-            ticker = yf.Ticker(symbol)
-            history = ticker.history(period="3mo")  # Fetch 3 months to ensure enough data
+            # Fetch daily history (need at least period + 1 data points)
+            history = market_data_gateway.get_history(symbol, period=INDICATOR_HISTORY_PERIOD)
         except Exception as e:
             logger.warning(f"Error fetching RSI data for {symbol}: {e}")
             raise StockNotFoundError(symbol)
@@ -205,31 +216,8 @@ def calculate_rsi(
                 }
             )
         
-        # Calculate price changes
-        deltas = []
-        for i in range(1, len(closes)):
-            deltas.append(closes[i] - closes[i - 1])
-        
-        # Separate gains and losses
-        gains = [d if d > 0 else 0 for d in deltas]
-        losses = [-d if d < 0 else 0 for d in deltas]
-        
-        # Calculate average gain and average loss for the first period
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
-        
-        # Calculate smoothed averages for remaining periods (Wilder's smoothing)
-        for i in range(period, len(gains)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-        
-        # Calculate RS and RSI
-        if avg_loss == 0:
-            # If there are no losses, RSI is 100 (all gains) or 0 (no gains)
-            rsi_value = 100.0 if avg_gain > 0 else 0.0
-        else:
-            rs = avg_gain / avg_loss
-            rsi_value = 100 - (100 / (1 + rs))
+        # Wilder-smoothed RSI (first average over the first period changes)
+        rsi_value = technical_indicators.rsi_last(closes, period, method="wilder")
         
         current_price = float(closes[-1])
         
@@ -312,8 +300,7 @@ def calculate_ema(
         
         # Fetch 3 months of historical data for EMA calculation
         # Need period + some buffer for initial SMA calculation
-        stock = yf.Ticker(symbol)
-        data = stock.history(period="3mo")
+        data = market_data_gateway.get_history(symbol, period=INDICATOR_HISTORY_PERIOD)
         
         # Validate data availability
         if data.empty:
@@ -334,17 +321,8 @@ def calculate_ema(
         # Get close prices
         close_prices = data["Close"].values
         
-        # Calculate smoothing constant k = 2 / (period + 1)
-        k = 2 / (period + 1)
-        
-        # Initialize EMA with SMA of first 'period' data points
-        initial_ema = sum(close_prices[:period]) / period
-        
-        # Calculate EMA using iterative formula
-        # EMA_today = (Price_today × k) + (EMA_yesterday × (1 - k))
-        ema = initial_ema
-        for i in range(period, len(close_prices)):
-            ema = (close_prices[i] * k) + (ema * (1 - k))
+        # EMA seeded with the SMA of the first 'period' closes, k = 2 / (period + 1)
+        ema = technical_indicators.ema_last(close_prices, period)
         
         # Get current price (last close price)
         current_price = float(close_prices[-1])
@@ -385,3 +363,303 @@ def calculate_ema(
             message=f"Error calculating EMA for {symbol}: {str(e)}",
             details={"symbol": symbol, "error": str(e)}
         )
+
+
+# ============================================================================
+# Multi-indicator bundles
+# ============================================================================
+
+# Supported indicators and their (min, max) period, same limits as the
+# single-indicator endpoints
+INDICATOR_PERIOD_LIMITS: Dict[str, Tuple[int, int]] = {
+    "sma": (2, 500),
+    "ema": (2, 500),
+    "rsi": (2, 100),
+    "bollinger": (2, 500),
+    "atr": (2, 100),
+}
+MAX_INDICATOR_SPECS = 20
+
+# History windows a bundle can be built from, shortest first, with the daily
+# bars each one covers at least (holidays included)
+BUNDLE_HISTORY_WINDOWS: Tuple[Tuple[str, int], ...] = (
+    (INDICATOR_HISTORY_PERIOD, 60),
+    ("6mo", 120),
+    ("1y", 245),
+    ("2y", 495),
+    ("5y", 1240),
+)
+
+# What the dashboard's combined widget shows
+COMBINED_DEFAULT_SPECS: Tuple[Tuple[str, int], ...] = (("sma", 14), ("ema", 20), ("rsi", 14))
+
+
+def parse_indicator_specs(spec: str) -> List[Tuple[str, int]]:
+    """
+    Parse "sma:14,sma:50,ema:20,rsi:14" into [(name, period), ...].
+
+    Duplicates are dropped, order is kept.
+
+    Raises:
+        ValidationError: Unknown indicator, bad/out-of-range period or too many specs
+    """
+    specs: List[Tuple[str, int]] = []
+    for item in (part.strip().lower() for part in spec.split(",")):
+        if not item:
+            continue
+        name, _, period_text = item.partition(":")
+        limits = INDICATOR_PERIOD_LIMITS.get(name)
+        if limits is None:
+            raise ValidationError(
+                message=f"Unknown indicator: {name}",
+                details={"indicator": name, "supported": sorted(INDICATOR_PERIOD_LIMITS)}
+            )
+        try:
+            period = int(period_text)
+        except ValueError:
+            raise ValidationError(
+                message=f"Invalid period for {name}: {period_text!r} (expected e.g. {name}:14)",
+                details={"indicator": name, "period": period_text}
+            )
+        minimum, maximum = limits
+        if not minimum <= period <= maximum:
+            raise ValidationError(
+                message=f"Period for {name} must be between {minimum} and {maximum}",
+                details={"indicator": name, "period": period, "minimum": minimum, "maximum": maximum}
+            )
+        if (name, period) not in specs:
+            specs.append((name, period))
+
+    if not specs:
+        raise ValidationError(message="No indicators requested", details={"indicators": spec})
+    if len(specs) > MAX_INDICATOR_SPECS:
+        raise ValidationError(
+            message=f"Too many indicators (maximum {MAX_INDICATOR_SPECS})",
+            details={"requested": len(specs), "maximum": MAX_INDICATOR_SPECS}
+        )
+    return specs
+
+
+def bundle_history_period(specs: Sequence[Tuple[str, int]]) -> str:
+    """Shortest history window with enough bars for every spec (RSI/ATR need period + 1)."""
+    needed = max(period + 1 for _, period in specs)
+    for window, bars in BUNDLE_HISTORY_WINDOWS:
+        if bars >= needed:
+            return window
+    return BUNDLE_HISTORY_WINDOWS[-1][0]
+
+
+class IndicatorBundle:
+    """
+    Daily history of one symbol as arrays plus every indicator value
+    computed from it so far.
+
+    Built once per symbol and history window from a single history fetch
+    and cached in indicator_cache; each (indicator, period) is computed on
+    first request.
+    """
+
+    def __init__(self, symbol: str, history: pd.DataFrame):
+        self.symbol = symbol
+        self.closes = history["Close"].to_numpy(dtype=np.float64)
+        self.highs = history["High"].to_numpy(dtype=np.float64) if "High" in history else self.closes
+        self.lows = history["Low"].to_numpy(dtype=np.float64) if "Low" in history else self.closes
+        last_bar = history.index[-1]
+        self.as_of = last_bar.isoformat() if hasattr(last_bar, "isoformat") else str(last_bar)
+        self._values: Dict[Tuple[str, int], Any] = {}
+
+    @property
+    def current_price(self) -> float:
+        return float(self.closes[-1])
+
+    def value(self, name: str, period: int) -> Any:
+        """Rounded latest value (dict for Bollinger), None if the history is too short."""
+        key = (name, period)
+        if key not in self._values:
+            self._values[key] = self._compute(name, period)
+        return self._values[key]
+
+    def _compute(self, name: str, period: int) -> Any:
+        if name == "bollinger":
+            bands = technical_indicators.bollinger_last(self.closes, period)
+            if bands is None:
+                return None
+            upper, middle, lower = bands
+            return {"upper": round(upper, 2), "middle": round(middle, 2), "lower": round(lower, 2)}
+        if name == "sma":
+            value = technical_indicators.sma_last(self.closes, period)
+        elif name == "ema":
+            value = technical_indicators.ema_last(self.closes, period)
+        elif name == "rsi":
+            value = technical_indicators.rsi_last(self.closes, period, method="wilder")
+        elif name == "atr":
+            value = technical_indicators.last_value(
+                technical_indicators.atr(self.highs, self.lows, self.closes, period)
+            )
+        else:
+            raise ValueError(f"Unknown indicator: {name}")
+        if value is None or math.isnan(value):
+            return None
+        return round(float(value), 2)
+
+
+def _bundle_key(symbol: str, period: str) -> str:
+    return f"bundle:{symbol}:{period}"
+
+
+def get_indicator_bundle(symbol: str, period: str = INDICATOR_HISTORY_PERIOD) -> IndicatorBundle:
+    """
+    Cached indicator bundle for a symbol over ``period`` of daily history
+    (one history fetch per bundle).
+
+    Raises:
+        StockNotFoundError: If the symbol has no history
+    """
+    symbol = symbol.upper().strip()
+
+    def _build() -> IndicatorBundle:
+        try:
+            history = market_data_gateway.get_history(symbol, period=period)
+        except Exception as e:
+            logger.warning(f"Error fetching indicator history for {symbol}: {e}")
+            raise StockNotFoundError(symbol)
+        if history.empty:
+            logger.warning(f"No data found for symbol: {symbol}")
+            raise StockNotFoundError(symbol)
+        return IndicatorBundle(symbol, history)
+
+    return indicator_cache.get_or_set(_bundle_key(symbol, period), _build)
+
+
+def calculate_indicators(symbol: str, specs: Sequence[Tuple[str, int]]) -> dict:
+    """
+    Several indicators for one symbol from its cached bundle.
+
+    Args:
+        symbol: Stock ticker symbol (e.g., 'AAPL')
+        specs: [(name, period), ...] as returned by parse_indicator_specs()
+
+    Returns:
+        Dictionary with:
+        {
+            "symbol": str,
+            "current_price": float,
+            "as_of": str (last daily bar),
+            "indicators": {"sma:14": float | None, "bollinger:20": {...} | None, ...}
+        }
+
+    Raises:
+        StockNotFoundError: If symbol is invalid or has no data
+    """
+    return _bundle_result(get_indicator_bundle(symbol, bundle_history_period(specs)), specs)
+
+
+def _bundle_result(bundle: IndicatorBundle, specs: Sequence[Tuple[str, int]]) -> dict:
+    return {
+        "symbol": bundle.symbol,
+        "current_price": round(bundle.current_price, 2),
+        "as_of": bundle.as_of,
+        "indicators": {f"{name}:{period}": bundle.value(name, period) for name, period in specs},
+    }
+
+
+def _not_found_result(symbol: str) -> dict:
+    return {"symbol": symbol, "error": "StockNotFound", "message": f"Stock '{symbol}' not found"}
+
+
+def _failed_result(symbol: str, error: Exception) -> dict:
+    logger.error(
+        f"Error calculating indicators",
+        extra={"symbol": symbol, "error": str(error), "error_type": type(error).__name__},
+        exc_info=True,
+    )
+    return _error_result(symbol)
+
+
+def _error_result(symbol: str) -> dict:
+    return {"symbol": symbol, "error": "InternalServerError", "message": "An unexpected error occurred"}
+
+
+async def stream_indicators(
+    symbols: Sequence[str],
+    specs: Sequence[Tuple[str, int]],
+    chunk_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """
+    Indicator results for many symbols, yielded as they become available.
+
+    Symbols with a cached bundle are answered first. The rest are split into
+    chunks of ``chunk_size`` with one batch history download each (at most
+    ``concurrency`` in flight); a chunk's results are yielded as soon as its
+    download finishes, and its bundles are cached for later single-symbol
+    requests. Unknown symbols yield _not_found_result() rows; symbols whose
+    download or calculation fails yield error rows, so one bad symbol or
+    chunk never ends the stream.
+    """
+    period = bundle_history_period(specs)
+    chunk_size = max(chunk_size or settings.INDICATOR_BULK_CHUNK_SIZE, 1)
+    semaphore = asyncio.Semaphore(max(concurrency or settings.INDICATOR_BULK_CONCURRENCY, 1))
+
+    missing: List[str] = []
+    for symbol in symbols:
+        bundle = indicator_cache.get(_bundle_key(symbol, period))
+        if bundle is None:
+            missing.append(symbol)
+            continue
+        try:
+            result = _bundle_result(bundle, specs)
+        except Exception as e:
+            result = _failed_result(symbol, e)
+        yield result
+
+    def _compute(chunk: List[str], histories: Dict[str, pd.DataFrame]) -> List[dict]:
+        results = []
+        for symbol in chunk:
+            history = histories.get(symbol)
+            if history is None or history.empty:
+                results.append(_not_found_result(symbol))
+                continue
+            try:
+                bundle = IndicatorBundle(symbol, history)
+                indicator_cache.set(_bundle_key(symbol, period), bundle)
+                results.append(_bundle_result(bundle, specs))
+            except Exception as e:
+                results.append(_failed_result(symbol, e))
+        return results
+
+    async def _fetch(chunk: List[str]) -> List[dict]:
+        async with semaphore:
+            try:
+                histories = await asyncio.to_thread(
+                    market_data_gateway.get_history_batch,
+                    chunk,
+                    period=period,
+                    chunk_size=len(chunk),
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error fetching batch indicator history",
+                    extra={
+                        "symbols_count": len(chunk),
+                        "error": str(e),
+                        "error_type": type(e).__name__,
+                    },
+                    exc_info=True,
+                )
+                # The symbols may well exist; report the failure, not StockNotFound
+                return [_error_result(symbol) for symbol in chunk]
+        return await asyncio.to_thread(_compute, chunk, histories)
+
+    tasks = [
+        asyncio.ensure_future(_fetch(missing[i:i + chunk_size]))
+        for i in range(0, len(missing), chunk_size)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for result in await next_done:
+                yield result
+    finally:
+        # Client went away: stop the downloads that have not started yet
+        for task in tasks:
+            task.cancel()
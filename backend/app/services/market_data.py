@@ -0,0 +1,765 @@
+"""
+Market data gateway for Stock Sentinel.
+
+Single entry point for quotes and OHLCV history. Routes, the alert scheduler
+and the WebSocket price streamer all read market data through the global
+`market_data_gateway`, so that:
+  - the same ticker is fetched once per TTL, not once per caller
+  - concurrent cache misses for the same key share one upstream request
+  - multi-symbol history is downloaded in chunked batches over a bounded
+    worker pool
+  - every result lives in one cache tier (app.core.cache)
+  - OHLCV bars are kept in a local store and only the missing tail is
+    fetched (app.services.history_store)
+  - upstream sources are pluggable providers (Finnhub, yfinance, ...)
+"""
+
+import contextlib
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+from app.config import settings
+from app.core.cache import Cache, stock_candle_cache, stock_quote_cache
+from app.services.history_store import (
+    INTRADAY_INTERVALS,
+    OHLCV_COLUMNS,
+    HistoryStore,
+    empty_ohlcv_frame,
+    history_store as default_history_store,
+)
+
+logger = logging.getLogger(__name__)
+
+# Cached in place of a value when every provider came back empty, so a dead
+# ticker is not re-fetched on every request (Cache.get() treats None as a miss).
+_NO_DATA = object()
+
+
+@dataclass(frozen=True)
+class Quote:
+    """Provider-neutral real-time quote."""
+    symbol: str
+    price: float
+    change: float = 0.0
+    change_percent: float = 0.0
+    high: float = 0.0
+    low: float = 0.0
+    open: float = 0.0
+    previous_close: float = 0.0
+    volume: int = 0
+    timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    source: str = ""
+
+
+def _run_silenced(request_fn: Callable[[], Any]) -> Any:
+    """yfinance prints download errors to stdout/stderr; keep them out of the logs."""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return request_fn()
+
+
+def _normalize_frame(frame: Any) -> pd.DataFrame:
+    """Restrict an upstream frame to OHLCV columns and drop bars without a close."""
+    if frame is None or not isinstance(frame, pd.DataFrame) or frame.empty or "Close" not in frame.columns:
+        return empty_ohlcv_frame()
+    columns = [column for column in OHLCV_COLUMNS if column in frame.columns]
+    return frame[columns].dropna(subset=["Close"])
+
+
+def _chunked(items: List[str], size: int) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _period_covering(start: pd.Timestamp) -> str:
+    """Smallest day-period ("Nd") that reaches back to ``start``."""
+    start_utc = start.tz_localize("UTC") if start.tzinfo is None else start.tz_convert("UTC")
+    days = (pd.Timestamp.now(tz="UTC") - start_utc).days + 1
+    return f"{max(days, 1)}d"
+
+
+def _quote_from_daily_frame(symbol: str, frame: pd.DataFrame, source: str) -> Optional[Quote]:
+    """Build a quote from the last two daily bars (latest bar vs previous close)."""
+    if frame.empty:
+        return None
+
+    latest = frame.iloc[-1]
+    price = float(latest["Close"])
+    if price <= 0:
+        return None
+
+    previous_close = float(frame["Close"].iloc[-2]) if len(frame) > 1 else price
+    change = price - previous_close
+    change_percent = (change / previous_close * 100) if previous_close > 0 else 0.0
+    volume = latest.get("Volume")
+
+    return Quote(
+        symbol=symbol,
+        price=price,
+        change=round(change, 2),
+        change_percent=round(change_percent, 2),
+        high=float(latest.get("High") or price),
+        low=float(latest.get("Low") or price),
+        open=float(latest.get("Open") or price),
+        previous_close=previous_close,
+        volume=int(volume) if pd.notna(volume) else 0,
+        source=source,
+    )
+
+
+# ============================================================================
+# Providers
+# ============================================================================
+
+class MarketDataProvider:
+    """
+    Base class for upstream market data sources.
+
+    Providers only talk to the upstream API. Caching, request coalescing and
+    fallback between providers are handled by MarketDataGateway. Return None
+    (or an empty frame) when the upstream has no data; do not raise.
+    """
+
+    name = "base"
+    # True when fetch_quotes() costs one upstream call regardless of symbol count
+    supports_batch_quotes = False
+    # HTTP status of the last rejected request (429, 403, ...); None once one succeeds
+    last_error_status: Optional[int] = None
+
+    def fetch_quote(self, symbol: str) -> Optional[Quote]:
+        return None
+
+    def fetch_quotes(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        quotes: Dict[str, Quote] = {}
+        for symbol in symbols:
+            quote = self.fetch_quote(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def fetch_history(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        return empty_ohlcv_frame()
+
+    def fetch_history_batch(self, symbols: Sequence[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        return {symbol: self.fetch_history(symbol, period, interval) for symbol in symbols}
+
+    def fetch_history_since(self, symbol: str, start: pd.Timestamp, interval: str) -> pd.DataFrame:
+        """Bars from ``start`` (inclusive) to now; defaults to a day-period covering it."""
+        return self.fetch_history(symbol, _period_covering(start), interval)
+
+    def fetch_history_since_batch(
+        self,
+        symbols: Sequence[str],
+        start: pd.Timestamp,
+        interval: str,
+    ) -> Dict[str, pd.DataFrame]:
+        return {symbol: self.fetch_history_since(symbol, start, interval) for symbol in symbols}
+
+
+class FinnhubProvider(MarketDataProvider):
+    """Real-time quotes from the Finnhub REST API."""
+
+    name = "finnhub"
+    QUOTE_URL = "https://finnhub.io/api/v1/quote"
+
+    def __init__(self, api_key: Optional[str] = None, timeout: Optional[float] = None):
+        self._api_key = api_key
+        self.timeout = timeout or settings.MARKET_DATA_QUOTE_TIMEOUT_SECONDS
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return self._api_key or settings.FINNHUB_API_KEY
+
+    def fetch_quote(self, symbol: str) -> Optional[Quote]:
+        if not self.api_key:
+            logger.debug("FINNHUB_API_KEY not configured, skipping Finnhub quote")
+            return None
+
+        try:
+            resp = requests.get(
+                self.QUOTE_URL,
+                params={"symbol": symbol, "token": self.api_key},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            logger.warning(f"Finnhub quote request failed for {symbol}: {str(e)[:100]}")
+            return None
+
+        if resp.status_code == 429:
+            logger.warning(f"Finnhub rate limit reached while fetching {symbol}")
+            self.last_error_status = 429
+            return None
+        if resp.status_code != 200:
+            logger.warning(f"Finnhub HTTP {resp.status_code} for {symbol}")
+            self.last_error_status = resp.status_code
+            return None
+        self.last_error_status = None
+
+        try:
+            data = resp.json()
+        except ValueError as e:
+            logger.warning(f"Finnhub JSON parse error for {symbol}: {e}")
+            return None
+
+        # Finnhub quote: c, d, dp, h, l, o, pc (current, change, percent change, high, low, open, previous close)
+        price = float(data.get("c") or 0)
+        if price <= 0:
+            return None
+
+        return Quote(
+            symbol=symbol,
+            price=price,
+            change=float(data.get("d") or 0),
+            change_percent=float(data.get("dp") or 0),
+            high=float(data.get("h") or 0),
+            low=float(data.get("l") or 0),
+            open=float(data.get("o") or 0),
+            previous_close=float(data.get("pc") or 0),
+            volume=int(data.get("v") or 0),
+            source=self.name,
+        )
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Quotes (from daily bars) and OHLCV history from Yahoo Finance."""
+
+    name = "yfinance"
+    supports_batch_quotes = True
+
+    def __init__(self, quote_timeout: Optional[float] = None, history_timeout: Optional[float] = None):
+        self.quote_timeout = quote_timeout or settings.MARKET_DATA_QUOTE_TIMEOUT_SECONDS
+        self.history_timeout = history_timeout or settings.MARKET_DATA_HISTORY_TIMEOUT_SECONDS
+
+    def fetch_quote(self, symbol: str) -> Optional[Quote]:
+        return self.fetch_quotes([symbol]).get(symbol)
+
+    def fetch_quotes(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        # 5 calendar days guarantees a previous close across weekends/holidays
+        frames = self._download(symbols, period="5d", interval="1d", auto_adjust=False, timeout=self.quote_timeout)
+        quotes: Dict[str, Quote] = {}
+        for symbol, frame in frames.items():
+            quote = _quote_from_daily_frame(symbol, frame, self.name)
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def fetch_history(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        try:
+            ticker = yf.Ticker(symbol)
+            frame = _run_silenced(
+                lambda: ticker.history(period=period, interval=interval, timeout=self.history_timeout)
+            )
+        except Exception as e:
+            logger.warning(f"yfinance history error for {symbol}: {str(e)[:100]}")
+            return empty_ohlcv_frame()
+        return _normalize_frame(frame)
+
+    def fetch_history_batch(self, symbols: Sequence[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        if len(symbols) == 1:
+            return {symbols[0]: self.fetch_history(symbols[0], period, interval)}
+        return self._download(symbols, period=period, interval=interval, auto_adjust=True, timeout=self.history_timeout)
+
+    def fetch_history_since(self, symbol: str, start: pd.Timestamp, interval: str) -> pd.DataFrame:
+        try:
+            ticker = yf.Ticker(symbol)
+            frame = _run_silenced(
+                lambda: ticker.history(start=start, interval=interval, timeout=self.history_timeout)
+            )
+        except Exception as e:
+            logger.warning(f"yfinance history error for {symbol}: {str(e)[:100]}")
+            return empty_ohlcv_frame()
+        return _normalize_frame(frame)
+
+    def fetch_history_since_batch(
+        self,
+        symbols: Sequence[str],
+        start: pd.Timestamp,
+        interval: str,
+    ) -> Dict[str, pd.DataFrame]:
+        if len(symbols) == 1:
+            return {symbols[0]: self.fetch_history_since(symbols[0], start, interval)}
+        return self._download(symbols, start=start, interval=interval, auto_adjust=True, timeout=self.history_timeout)
+
+    def _download(
+        self,
+        symbols: Sequence[str],
+        interval: str,
+        auto_adjust: bool,
+        timeout: float,
+        period: Optional[str] = None,
+        start: Optional[pd.Timestamp] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """One yf.download() call for many symbols, split into per-symbol frames."""
+        if not symbols:
+            return {}
+
+        try:
+            data = _run_silenced(
+                lambda: yf.download(
+                    tickers=" ".join(symbols),
+                    period=period,
+                    start=start,
+                    interval=interval,
+                    auto_adjust=auto_adjust,
+                    progress=False,
+                    threads=False,
+                    group_by="ticker",
+                    timeout=timeout,
+                )
+            )
+        except Exception as e:
+            logger.warning(f"yfinance download failed for {len(symbols)} symbols: {str(e)[:100]}")
+            return {}
+
+        if data is None or not hasattr(data, "empty") or data.empty:
+            return {}
+
+        frames: Dict[str, pd.DataFrame] = {}
+        has_multi_index = isinstance(data.columns, pd.MultiIndex)
+        tickers_in_frame = set(data.columns.get_level_values(0)) if has_multi_index else set()
+
+        for symbol in symbols:
+            if has_multi_index:
+                if symbol not in tickers_in_frame:
+                    continue
+                frame = data[symbol]
+            else:
+                frame = data
+            frame = _normalize_frame(frame)
+            if not frame.empty:
+                frames[symbol] = frame
+
+        return frames
+
+
+# ============================================================================
+# Gateway
+# ============================================================================
+
+class MarketDataGateway:
+    """
+    Read-through cache in front of pluggable market data providers.
+
+    Usage:
+        quote = market_data_gateway.get_quote("AAPL")
+        frame = market_data_gateway.get_history("AAPL", period="3mo", interval="1d")
+
+    Quote providers are tried in order until one returns data; history comes
+    from a single history provider. Returned DataFrames are shared with the
+    cache and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        quote_providers: Optional[Sequence[MarketDataProvider]] = None,
+        history_provider: Optional[MarketDataProvider] = None,
+        quote_cache: Optional[Cache] = None,
+        history_cache: Optional[Cache] = None,
+        history_store: Optional[HistoryStore] = None,
+    ):
+        yfinance_provider = YFinanceProvider()
+        self.quote_providers: List[MarketDataProvider] = (
+            list(quote_providers) if quote_providers is not None else [FinnhubProvider(), yfinance_provider]
+        )
+        self.history_provider: MarketDataProvider = history_provider or yfinance_provider
+        self._quote_cache = quote_cache if quote_cache is not None else stock_quote_cache
+        self._history_cache = history_cache if history_cache is not None else stock_candle_cache
+        self.history_store = history_store if history_store is not None else default_history_store
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "quote_requests": 0,
+            "history_requests": 0,
+            "cache_hits": 0,
+            "upstream_calls": 0,
+            "history_batches": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Provider management
+    # ------------------------------------------------------------------
+
+    def register_quote_provider(self, provider: MarketDataProvider, first: bool = False) -> None:
+        """Add a quote provider to the fallback chain."""
+        if first:
+            self.quote_providers.insert(0, provider)
+        else:
+            self.quote_providers.append(provider)
+
+    def set_history_provider(self, provider: MarketDataProvider) -> None:
+        """Replace the OHLCV history provider."""
+        self.history_provider = provider
+
+    # ------------------------------------------------------------------
+    # Quotes
+    # ------------------------------------------------------------------
+
+    def get_quote(self, symbol: str) -> Optional[Quote]:
+        """Latest quote for a symbol, or None if no provider has data."""
+        symbol = symbol.upper().strip()
+        if not symbol:
+            return None
+        self._count("quote_requests")
+        key = f"quote:{symbol}"
+
+        def _load() -> Any:
+            fresh = self._quote_cache.get(key)
+            if fresh is not None:
+                return fresh
+            quote = self._fetch_quote_upstream(symbol)
+            return self._store(self._quote_cache, key, quote, settings.MARKET_DATA_QUOTE_TTL_SECONDS)
+
+        value = self._read_through(self._quote_cache, key, _load)
+        return None if value is _NO_DATA else value
+
+    def quote_provider_errors(self) -> Dict[str, int]:
+        """HTTP status of every quote provider whose last request was rejected."""
+        return {
+            provider.name: provider.last_error_status
+            for provider in self.quote_providers
+            if provider.last_error_status is not None
+        }
+
+    def get_price(self, symbol: str) -> Optional[float]:
+        """Latest price for a symbol, or None."""
+        quote = self.get_quote(symbol)
+        return quote.price if quote is not None else None
+
+    def get_quotes(self, symbols: Sequence[str], allow_stale: bool = True) -> Dict[str, Quote]:
+        """
+        Quotes for many symbols with one upstream call for all cache misses.
+
+        Only batch-capable providers are used here; symbols no provider could
+        resolve are missing from the result. Stale quotes are returned as-is
+        and refreshed together in one background batch. With
+        ``allow_stale=False`` they are refetched with the misses instead, so
+        no quote is older than MARKET_DATA_QUOTE_TTL_SECONDS.
+        """
+        normalized = list(dict.fromkeys(s.upper().strip() for s in symbols if s and s.strip()))
+        self._count("quote_requests", len(normalized))
+        quotes: Dict[str, Quote] = {}
+        missing: List[str] = []
+        stale: List[str] = []
+
+        for symbol in normalized:
+            result = self._cached(self._quote_cache, f"quote:{symbol}")
+            if result is None:
+                missing.append(symbol)
+                continue
+            value, is_stale = result
+            if is_stale and not allow_stale:
+                missing.append(symbol)
+                continue
+            if is_stale:
+                stale.append(symbol)
+            if value is not _NO_DATA:
+                quotes[symbol] = value
+
+        if stale:
+            self._quote_cache.refresh_in_background(
+                "quotes:" + ",".join(sorted(stale)),
+                lambda: self._fetch_quotes_upstream(stale),
+            )
+
+        if missing:
+            key = "quotes:" + ",".join(sorted(missing))
+            quotes.update(self._quote_cache.coalesce(key, lambda: self._fetch_quotes_upstream(missing)))
+
+        return quotes
+
+    def resolve_quotes(self, symbols: Sequence[str], max_workers: Optional[int] = None) -> Dict[str, Quote]:
+        """
+        Quotes for many symbols through the full provider chain, concurrently.
+
+        Unlike get_quotes() (batch-capable providers only) every symbol gets
+        the same answer get_quote() would give. Cached quotes are answered
+        inline; each cache miss runs its provider chain on a worker, at most
+        ``max_workers`` at once, so N cold symbols cost about one upstream
+        round trip instead of N. Symbols without data are missing from the result.
+        """
+        normalized = list(dict.fromkeys(s.upper().strip() for s in symbols if s and s.strip()))
+        quotes: Dict[str, Quote] = {}
+        missing: List[str] = []
+
+        for symbol in normalized:
+            if self._quote_cache.get_stale(f"quote:{symbol}") is None:
+                missing.append(symbol)
+                continue
+            quote = self._quote_or_none(symbol)
+            if quote is not None:
+                quotes[symbol] = quote
+
+        workers = min(max(max_workers or settings.MARKET_DATA_QUOTE_WORKERS, 1), len(missing))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="quote-batch") as executor:
+                resolved = list(executor.map(self._quote_or_none, missing))
+        else:
+            resolved = [self._quote_or_none(symbol) for symbol in missing]
+
+        for symbol, quote in zip(missing, resolved):
+            if quote is not None:
+                quotes[symbol] = quote
+        return quotes
+
+    def _quote_or_none(self, symbol: str) -> Optional[Quote]:
+        try:
+            return self.get_quote(symbol)
+        except Exception as e:
+            logger.warning(f"Error fetching quote for {symbol}: {str(e)[:100]}")
+            return None
+
+    # ------------------------------------------------------------------
+    # OHLCV history
+    # ------------------------------------------------------------------
+
+    def get_history(
+        self,
+        symbol: str,
+        period: str = "1mo",
+        interval: str = "1d",
+        ttl_seconds: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """OHLCV bars for a symbol (empty frame if unavailable)."""
+        symbol = symbol.upper().strip()
+        if not symbol:
+            return empty_ohlcv_frame()
+        self._count("history_requests")
+        key = f"history:{symbol}:{period}:{interval}"
+        ttl = ttl_seconds or self.history_ttl(interval)
+
+        def _load() -> Any:
+            fresh = self._history_cache.get(key)
+            if fresh is not None:
+                return fresh
+            self._count("upstream_calls")
+            frame = self.history_store.read(symbol, period, interval, self.history_provider)
+            return self._store(
+                self._history_cache,
+                key,
+                frame if not frame.empty else None,
+                ttl,
+                self.history_stale_ttl(interval, ttl),
+            )
+
+        value = self._read_through(self._history_cache, key, _load)
+        return empty_ohlcv_frame() if value is _NO_DATA else value
+
+    def get_history_batch(
+        self,
+        symbols: Sequence[str],
+        period: str = "1mo",
+        interval: str = "1d",
+        chunk_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        OHLCV bars for many symbols.
+
+        Cache misses are split into chunks of ``chunk_size`` symbols, one batch
+        download per chunk, with at most ``max_workers`` chunks in flight.
+        """
+        chunk_size = max(chunk_size or settings.MARKET_DATA_BATCH_CHUNK_SIZE, 1)
+        max_workers = max(max_workers or settings.MARKET_DATA_BATCH_WORKERS, 1)
+        normalized = list(dict.fromkeys(s.upper().strip() for s in symbols if s and s.strip()))
+        self._count("history_requests", len(normalized))
+        frames: Dict[str, pd.DataFrame] = {}
+        missing: List[str] = []
+        stale: List[str] = []
+
+        for symbol in normalized:
+            result = self._cached(self._history_cache, f"history:{symbol}:{period}:{interval}")
+            if result is None:
+                missing.append(symbol)
+                continue
+            value, is_stale = result
+            if is_stale:
+                stale.append(symbol)
+            frames[symbol] = empty_ohlcv_frame() if value is _NO_DATA else value
+
+        for chunk in _chunked(sorted(stale), chunk_size):
+            self._history_cache.refresh_in_background(
+                f"history_batch:{period}:{interval}:" + ",".join(chunk),
+                lambda chunk=chunk: self._fetch_history_batch_upstream(chunk, period, interval),
+            )
+
+        chunks = _chunked(sorted(missing), chunk_size)
+        if len(chunks) == 1:
+            frames.update(self._fetch_history_chunk(chunks[0], period, interval))
+        elif chunks:
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(chunks)),
+                thread_name_prefix="history-batch",
+            ) as executor:
+                for fetched in executor.map(lambda chunk: self._fetch_history_chunk(chunk, period, interval), chunks):
+                    frames.update(fetched)
+
+        return frames
+
+    @staticmethod
+    def history_ttl(interval: str) -> int:
+        """Soft cache TTL for bars of the given interval."""
+        if interval in INTRADAY_INTERVALS:
+            return settings.MARKET_DATA_INTRADAY_TTL_SECONDS
+        return settings.MARKET_DATA_DAILY_TTL_SECONDS
+
+    @staticmethod
+    def history_stale_ttl(interval: str, ttl_seconds: int) -> int:
+        """Stale window (hard TTL - soft TTL) for bars of the given interval."""
+        if interval in INTRADAY_INTERVALS:
+            hard_ttl = settings.CACHE_CANDLES_INTRADAY_HARD_TTL_SECONDS
+        else:
+            hard_ttl = settings.CACHE_CANDLES_DAILY_HARD_TTL_SECONDS
+        return max(hard_ttl - ttl_seconds, 0)
+
+    def counter(self, name: str) -> int:
+        """Current value of one gateway counter (see stats())."""
+        with self._stats_lock:
+            return self._stats[name]
+
+    def stats(self) -> dict:
+        """Gateway counters plus the underlying cache statistics."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["quote_cache"] = self._quote_cache.stats()
+        stats["history_cache"] = self._history_cache.stats()
+        stats["history_store"] = self.history_store.stats()
+        stats["quote_provider_errors"] = self.quote_provider_errors()
+        return stats
+
+    # ------------------------------------------------------------------
+    # Upstream fetches (run by exactly one caller per key)
+    # ------------------------------------------------------------------
+
+    def _fetch_quote_upstream(self, symbol: str) -> Optional[Quote]:
+        start_time = time.monotonic()
+        for provider in self.quote_providers:
+            self._count("upstream_calls")
+            try:
+                quote = provider.fetch_quote(symbol)
+            except Exception as e:
+                logger.warning(f"{provider.name} quote provider failed for {symbol}: {str(e)[:100]}")
+                continue
+            if quote is not None:
+                elapsed = time.monotonic() - start_time
+                logger.debug(f"Quote for {symbol} from {provider.name}: ${quote.price} ({elapsed * 1000:.0f}ms)")
+                return quote
+
+        logger.warning(f"No quote provider returned data for {symbol}")
+        return None
+
+    def _fetch_quotes_upstream(self, symbols: List[str]) -> Dict[str, Quote]:
+        quotes: Dict[str, Quote] = {}
+        remaining = list(symbols)
+
+        for provider in self.quote_providers:
+            if not remaining or not provider.supports_batch_quotes:
+                continue
+            self._count("upstream_calls")
+            try:
+                fetched = provider.fetch_quotes(remaining)
+            except Exception as e:
+                logger.warning(f"{provider.name} batch quote fetch failed: {str(e)[:100]}")
+                continue
+            quotes.update(fetched)
+            remaining = [symbol for symbol in remaining if symbol not in fetched]
+
+        for symbol, quote in quotes.items():
+            self._store(self._quote_cache, f"quote:{symbol}", quote, settings.MARKET_DATA_QUOTE_TTL_SECONDS)
+
+        return quotes
+
+    def _fetch_history_chunk(self, symbols: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+        """One coalesced batch download for a chunk of cache misses."""
+        key = f"history_batch:{period}:{interval}:" + ",".join(symbols)
+        return self._history_cache.coalesce(key, lambda: self._fetch_history_batch_upstream(symbols, period, interval))
+
+    def _fetch_history_batch_upstream(
+        self,
+        symbols: List[str],
+        period: str,
+        interval: str,
+    ) -> Dict[str, pd.DataFrame]:
+        self._count("upstream_calls")
+        self._count("history_batches")
+        try:
+            fetched = self.history_store.read_batch(symbols, period, interval, self.history_provider)
+        except Exception as e:
+            logger.warning(f"History batch fetch failed for {len(symbols)} symbols: {str(e)[:100]}")
+            fetched = {}
+
+        ttl = self.history_ttl(interval)
+        frames: Dict[str, pd.DataFrame] = {}
+        for symbol in symbols:
+            frame = fetched.get(symbol)
+            if frame is None or frame.empty:
+                self._store(self._history_cache, f"history:{symbol}:{period}:{interval}", None, ttl)
+                frames[symbol] = empty_ohlcv_frame()
+            else:
+                self._store(
+                    self._history_cache,
+                    f"history:{symbol}:{period}:{interval}",
+                    frame,
+                    ttl,
+                    self.history_stale_ttl(interval, ttl),
+                )
+                frames[symbol] = frame
+        return frames
+
+    # ------------------------------------------------------------------
+    # Cache / coalescing helpers
+    # ------------------------------------------------------------------
+
+    def _cached(self, cache: Cache, key: str) -> Optional[Tuple[Any, bool]]:
+        result = cache.get_stale(key)
+        if result is not None:
+            self._count("cache_hits")
+        return result
+
+    def _read_through(self, cache: Cache, key: str, load: Callable[[], Any]) -> Any:
+        """
+        Stale-while-revalidate read: fresh values return at once, stale ones
+        return at once and refresh in the background, misses load (coalesced).
+        """
+        result = self._cached(cache, key)
+        if result is not None:
+            value, is_stale = result
+            if is_stale:
+                cache.refresh_in_background(key, load)
+            return value
+        return cache.coalesce(key, load)
+
+    @staticmethod
+    def _store(
+        cache: Cache,
+        key: str,
+        value: Any,
+        ttl_seconds: int,
+        stale_ttl_seconds: Optional[int] = None,
+    ) -> Any:
+        """Cache value (or the no-data marker) and return what was stored."""
+        if value is None:
+            cache.set(key, _NO_DATA, settings.MARKET_DATA_NEGATIVE_TTL_SECONDS, stale_ttl_seconds=0)
+            return _NO_DATA
+        cache.set(key, value, ttl_seconds, stale_ttl_seconds)
+        return value
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+
+# Global market data gateway instance
+market_data_gateway = MarketDataGateway()
+
+
+def get_market_data_gateway() -> MarketDataGateway:
+    """Get the global market data gateway instance."""
+    return market_data_gateway
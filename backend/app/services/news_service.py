@@ -8,21 +8,20 @@ Provides comprehensive news fetching and caching:
 - Intelligent caching to avoid repeated API calls
 
 Features:
-- 5-minute cache TTL
+- Stale-while-revalidate cache (soft/hard TTL from settings)
+- Concurrent cache misses share one upstream request (single-flight)
 - Error handling and fallback
 - Structured news format
 - Async support
 """
 
 import logging
-import time
-from dataclasses import dataclass
 from datetime import datetime, timedelta, date
 from typing import Dict, List, Optional, Any
-import threading
 import requests
 
 from app.config import settings
+from app.core.cache import news_cache
 from app.core.exceptions import ValidationError
 
 logger = logging.getLogger(__name__)
@@ -30,54 +29,29 @@ logger = logging.getLogger(__name__)
 # ============================================
 # Cache Configuration
 # ============================================
-NEWS_CACHE_TTL_SECONDS = 60  # 60 seconds cache
+NEWS_CACHE_TTL_SECONDS = settings.CACHE_NEWS_SOFT_TTL_SECONDS  # Fresh for 60s, then stale-while-revalidate
 GLOBAL_NEWS_CACHE_KEY = "global_news"
 
 
 # ============================================
-# Cache Data Structure
+# In-Memory Cache (shared bounded SWR cache, see app.core.cache)
 # ============================================
-@dataclass(frozen=True)
-class _CacheEntry:
-    """Thread-safe cache entry with expiration."""
-    expires_at_monotonic: float
-    value: Any
-
-
-# ============================================
-# In-Memory Cache (Thread-Safe)
-# ============================================
-_cache_lock = threading.Lock()
-_cache: Dict[str, _CacheEntry] = {}
-
-
 def _cache_get(key: str) -> Optional[Any]:
     """Get cached value if not expired."""
-    now = time.monotonic()
-    with _cache_lock:
-        entry = _cache.get(key)
-        if not entry:
-            return None
-        if entry.expires_at_monotonic <= now:
-            _cache.pop(key, None)
-            return None
-        return entry.value
+    return news_cache.get(key)
 
 
 def _cache_set(key: str, value: Any) -> None:
     """Set cache entry with TTL."""
-    expires = time.monotonic() + NEWS_CACHE_TTL_SECONDS
-    with _cache_lock:
-        _cache[key] = _CacheEntry(expires_at_monotonic=expires, value=value)
+    news_cache.set(key, value, NEWS_CACHE_TTL_SECONDS)
 
 
 def _cache_clear(key: Optional[str] = None) -> None:
     """Clear specific or all cache entries."""
-    with _cache_lock:
-        if key:
-            _cache.pop(key, None)
-        else:
-            _cache.clear()
+    if key:
+        news_cache.delete(key)
+    else:
+        news_cache.clear()
 
 
 # ============================================
@@ -276,23 +250,17 @@ def get_stock_news(symbol: str, use_cache: bool = True, limit: int = 20) -> List
     
     cache_key = f"stock_news:{symbol}"
     
-    # Check cache
-    if use_cache:
-        cached = _cache_get(cache_key)
-        if cached is not None:
-            logger.info(f"Returning cached news for {symbol}")
-            return cached[:limit]
-    
-    # Fetch fresh news
-    articles = _fetch_finnhub_company_news(symbol, limit=limit)
+    def _load() -> List[Dict[str, Any]]:
+        articles = _fetch_finnhub_company_news(symbol, limit=limit)
+        return [article.to_dict() for article in articles]
     
-    # Convert to dict
-    result = [article.to_dict() for article in articles]
+    if not use_cache:
+        result = _load()
+        _cache_set(cache_key, result)
+        return result
     
-    # Cache result
-    _cache_set(cache_key, result)
-    
-    return result
+    # Fresh or stale cache returns immediately; misses share one request
+    return news_cache.get_or_set(cache_key, _load)[:limit]
 
 
 def get_global_news(use_cache: bool = True, limit: int = 30) -> List[Dict[str, Any]]:
@@ -308,23 +276,28 @@ def get_global_news(use_cache: bool = True, limit: int = 30) -> List[Dict[str, A
     """
     cache_key = GLOBAL_NEWS_CACHE_KEY
     
-    # Check cache
-    if use_cache:
-        cached = _cache_get(cache_key)
-        if cached is not None:
-            logger.info("Returning cached global news")
-            return cached[:limit]
-    
-    # Fetch fresh news
-    articles = _fetch_global_market_news(limit=limit)
+    def _load() -> List[Dict[str, Any]]:
+        articles = _fetch_global_market_news(limit=limit)
+        return [article.to_dict() for article in articles]
     
-    # Convert to dict
-    result = [article.to_dict() for article in articles]
+    if not use_cache:
+        result = _load()
+        _cache_set(cache_key, result)
+        return result
     
-    # Cache result
-    _cache_set(cache_key, result)
+    # Fresh or stale cache returns immediately; misses share one request
+    return news_cache.get_or_set(cache_key, _load)[:limit]
+
+
+def get_cached_global_news(limit: int = 30) -> Optional[List[Dict[str, Any]]]:
+    """
+    Global news only if already cached (fresh or stale), never blocking on Finnhub.
     
-    return result
+    Stale results trigger a background refresh. Returns None on a cold cache.
+    """
+    if news_cache.get_stale(GLOBAL_NEWS_CACHE_KEY) is None:
+        return None
+    return get_global_news(limit=limit)
 
 
 # ============================================
@@ -0,0 +1,362 @@
+"""
+Notification outbox dispatcher for Stock Sentinel.
+
+Alert triggers never talk to SMTP, Twilio or WebSocket clients directly.
+record_alert_trigger() writes one `notification_outbox` row per channel in
+the same transaction as the AlertHistory entry; the dispatcher below drains
+the table in the background, so alert evaluation latency does not depend on
+delivery latency.
+
+Features:
+  - Batched claims (SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL), safe
+    with several dispatchers/processes
+  - Per-channel concurrency limits (email, WhatsApp, WebSocket)
+  - Idempotent delivery: one row per (history entry, channel); a row is
+    only finished by the dispatcher holding its lock
+  - Retries with exponential backoff, then FAILED after OUTBOX_MAX_ATTEMPTS
+  - Expired locks (crashed dispatcher) are picked up again
+  - Sent rows are purged after OUTBOX_RETENTION_HOURS
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.executor import run_db
+from app.models.notification_outbox import NotificationOutbox, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+# Channels
+EMAIL = "email"
+WHATSAPP = "whatsapp"
+WEBSOCKET = "websocket"
+
+# Sender: coroutine taking the row payload, True when delivered
+Sender = Callable[[Dict[str, Any]], Awaitable[bool]]
+
+# Retry backoff caps at this many seconds
+_MAX_BACKOFF_SECONDS = 300
+# Purge sent rows at most this often
+_PURGE_INTERVAL_SECONDS = 300
+
+
+def enqueue_notifications(
+    db: Session,
+    alert_history_id: int,
+    alert_id: int,
+    payload: Dict[str, Any],
+    channels: Iterable[str],
+) -> None:
+    """
+    Add one outbox row per channel to the current transaction (no commit).
+
+    Call before committing the AlertHistory entry so the trigger and its
+    notifications are stored atomically.
+    """
+    for channel in channels:
+        db.add(
+            NotificationOutbox(
+                alert_history_id=alert_history_id,
+                alert_id=alert_id,
+                channel=channel,
+                payload=payload,
+                status=OutboxStatus.PENDING,
+                available_at=datetime.utcnow(),
+            )
+        )
+
+
+def _backoff_seconds(attempts: int) -> int:
+    return min(2 ** max(attempts - 1, 0) * 5, _MAX_BACKOFF_SECONDS)
+
+
+def _default_senders() -> Dict[str, Sender]:
+    """Email / WhatsApp / WebSocket senders built on app.services.alert_service."""
+    from app.services.alert_service import AlertNotification, send_email_notification, send_whatsapp_for_alert
+    from app.ws.backplane import ALERTS_CHANNEL, backplane
+
+    async def _email(payload: Dict[str, Any]) -> bool:
+        return await asyncio.to_thread(send_email_notification, AlertNotification(**payload))
+
+    async def _whatsapp(payload: Dict[str, Any]) -> bool:
+        return await asyncio.to_thread(send_whatsapp_for_alert, AlertNotification(**payload))
+
+    async def _websocket(payload: Dict[str, Any]) -> bool:
+        # Every API process relays it to its own /ws/alerts clients
+        await backplane.publish(ALERTS_CHANNEL, AlertNotification(**payload).broadcast_payload())
+        return True
+
+    return {EMAIL: _email, WHATSAPP: _whatsapp, WEBSOCKET: _websocket}
+
+
+class OutboxDispatcher:
+    """
+    Background task draining the notification outbox.
+
+    Usage:
+        await notification_dispatcher.start()   # application startup
+        notification_dispatcher.wake()          # new rows committed (any thread)
+        await notification_dispatcher.stop()    # shutdown
+    """
+
+    def __init__(
+        self,
+        senders: Optional[Mapping[str, Sender]] = None,
+        dispatcher_id: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        lock_seconds: Optional[int] = None,
+        channel_concurrency: Optional[Mapping[str, int]] = None,
+    ):
+        self._senders: Optional[Dict[str, Sender]] = dict(senders) if senders is not None else None
+        self.dispatcher_id = dispatcher_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.poll_seconds = poll_seconds or settings.OUTBOX_POLL_SECONDS
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self.lock_seconds = lock_seconds or settings.OUTBOX_LOCK_SECONDS
+        self._channel_concurrency = dict(channel_concurrency or {
+            EMAIL: settings.OUTBOX_EMAIL_CONCURRENCY,
+            WHATSAPP: settings.OUTBOX_WHATSAPP_CONCURRENCY,
+            WEBSOCKET: settings.OUTBOX_WEBSOCKET_CONCURRENCY,
+        })
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+        self._stats = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0, "purged": 0}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    @property
+    def senders(self) -> Dict[str, Sender]:
+        if self._senders is None:
+            self._senders = _default_senders()
+        return self._senders
+
+    def register_sender(self, channel: str, sender: Sender, concurrency: Optional[int] = None) -> None:
+        """Add or replace the sender of a channel."""
+        self.senders[channel] = sender
+        if concurrency is not None:
+            self._channel_concurrency[channel] = concurrency
+            self._semaphores.pop(channel, None)
+
+    async def start(self) -> None:
+        """Start draining on the running loop (idempotent)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="notification-outbox")
+        logger.info("✅ Notification outbox dispatcher started", extra={"dispatcher_id": self.dispatcher_id})
+
+    async def stop(self) -> None:
+        """Stop the drain loop; claimed rows are retried after their lock expires."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("✅ Notification outbox dispatcher stopped")
+
+    def wake(self) -> None:
+        """Drain now instead of at the next poll; safe to call from any thread."""
+        if self._loop is None or self._wakeup is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["running"] = self._task is not None and not self._task.done()
+        return stats
+
+    # ------------------------------------------------------------------
+    # Draining
+    # ------------------------------------------------------------------
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                drained = await self.drain_once()
+                if time.monotonic() - self._last_purge > _PURGE_INTERVAL_SECONDS:
+                    self._last_purge = time.monotonic()
+                    self._stats["purged"] += await run_db(self._purge)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    f"Notification outbox drain failed",
+                    extra={"error": str(e), "error_type": type(e).__name__},
+                    exc_info=True,
+                )
+                drained = 0
+
+            if drained >= self.batch_size:
+                continue  # Backlog: claim the next batch right away
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Claim one batch, deliver it concurrently and record the outcome."""
+        claimed = await run_db(self._claim)
+        if not claimed:
+            return 0
+        self._stats["claimed"] += len(claimed)
+
+        results = await asyncio.gather(*(self._deliver(row) for row in claimed))
+        await run_db(lambda db: self._finish(db, list(zip(claimed, results))))
+        return len(claimed)
+
+    def _semaphore(self, channel: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(channel)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(self._channel_concurrency.get(channel, 10), 1))
+            self._semaphores[channel] = semaphore
+        return semaphore
+
+    async def _deliver(self, row: Tuple[int, str, Dict[str, Any], int, int]) -> Optional[str]:
+        """Send one row; returns None on success, else the error text."""
+        _, channel, payload, _, _ = row
+        sender = self.senders.get(channel)
+        if sender is None:
+            return f"No sender registered for channel {channel!r}"
+        async with self._semaphore(channel):
+            try:
+                return None if await sender(payload) else f"{channel} sender reported failure"
+            except Exception as e:
+                return f"{type(e).__name__}: {str(e)[:500]}"
+
+    def _claim(self, db: Session) -> List[Tuple[int, str, Dict[str, Any], int, int]]:
+        now = datetime.utcnow()
+        due = or_(
+            and_(NotificationOutbox.status == OutboxStatus.PENDING, NotificationOutbox.available_at <= now),
+            and_(NotificationOutbox.status == OutboxStatus.PROCESSING, NotificationOutbox.locked_until < now),
+        )
+        ids = [
+            row_id
+            for (row_id,) in db.query(NotificationOutbox.id)
+            .filter(due)
+            .order_by(NotificationOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ]
+        if not ids:
+            db.commit()
+            return []
+
+        # Re-check `due` so a row claimed concurrently (no row locks on SQLite) is skipped
+        db.query(NotificationOutbox).filter(NotificationOutbox.id.in_(ids), due).update(
+            {
+                NotificationOutbox.status: OutboxStatus.PROCESSING,
+                NotificationOutbox.locked_by: self.dispatcher_id,
+                NotificationOutbox.locked_until: now + timedelta(seconds=self.lock_seconds),
+                NotificationOutbox.attempts: NotificationOutbox.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+        return [
+            tuple(row)
+            for row in db.query(
+                NotificationOutbox.id,
+                NotificationOutbox.channel,
+                NotificationOutbox.payload,
+                NotificationOutbox.attempts,
+                NotificationOutbox.alert_history_id,
+            ).filter(
+                NotificationOutbox.id.in_(ids),
+                NotificationOutbox.locked_by == self.dispatcher_id,
+                NotificationOutbox.status == OutboxStatus.PROCESSING,
+            )
+        ]
+
+    def _finish(self, db: Session, outcomes: List[Tuple[Tuple[int, str, Dict[str, Any], int, int], Optional[str]]]) -> None:
+        from app.models.alert import AlertHistory
+
+        now = datetime.utcnow()
+        owned = and_(
+            NotificationOutbox.locked_by == self.dispatcher_id,
+            NotificationOutbox.status == OutboxStatus.PROCESSING,
+        )
+        sent_ids = [row[0] for row, error in outcomes if error is None]
+        if sent_ids:
+            db.query(NotificationOutbox).filter(NotificationOutbox.id.in_(sent_ids), owned).update(
+                {
+                    NotificationOutbox.status: OutboxStatus.SENT,
+                    NotificationOutbox.sent_at: now,
+                    NotificationOutbox.locked_by: None,
+                    NotificationOutbox.locked_until: None,
+                    NotificationOutbox.last_error: None,
+                },
+                synchronize_session=False,
+            )
+            self._stats["sent"] += len(sent_ids)
+
+        email_history_ids = [row[4] for row, error in outcomes if error is None and row[1] == EMAIL]
+        if email_history_ids:
+            db.query(AlertHistory).filter(AlertHistory.id.in_(email_history_ids)).update(
+                {AlertHistory.email_sent: True, AlertHistory.email_sent_at: now},
+                synchronize_session=False,
+            )
+
+        for (row_id, channel, _, attempts, _), error in outcomes:
+            if error is None:
+                continue
+            give_up = attempts >= self.max_attempts
+            db.query(NotificationOutbox).filter(NotificationOutbox.id == row_id, owned).update(
+                {
+                    NotificationOutbox.status: OutboxStatus.FAILED if give_up else OutboxStatus.PENDING,
+                    NotificationOutbox.available_at: now + timedelta(seconds=_backoff_seconds(attempts)),
+                    NotificationOutbox.locked_by: None,
+                    NotificationOutbox.locked_until: None,
+                    NotificationOutbox.last_error: error,
+                },
+                synchronize_session=False,
+            )
+            self._stats["failed" if give_up else "retried"] += 1
+            logger.warning(
+                f"Notification delivery failed" + (", giving up" if give_up else ", will retry"),
+                extra={"outbox_id": row_id, "channel": channel, "attempts": attempts, "error": error},
+            )
+
+        db.commit()
+
+    def _purge(self, db: Session) -> int:
+        cutoff = datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        purged = db.query(NotificationOutbox).filter(
+            NotificationOutbox.status == OutboxStatus.SENT,
+            NotificationOutbox.sent_at < cutoff,
+        ).delete(synchronize_session=False)
+        db.commit()
+        return purged
+
+
+# Global dispatcher (started in the application lifespan)
+notification_dispatcher = OutboxDispatcher()
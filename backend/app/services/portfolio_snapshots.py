@@ -0,0 +1,228 @@
+"""
+Materialized portfolio valuations for Stock Sentinel.
+
+Valuing a portfolio takes a quote per holding. Instead of doing that on
+every request, valuations are written to `portfolio_snapshots` and read
+back.
+
+Features:
+  - snapshot_all_portfolios() (scheduler job) values every portfolio with
+    one batched quote lookup for all tickers and writes a row per user
+  - Position changes (portfolio routes, trades) call mark_stale() in their
+    own transaction; it bumps users.portfolio_version, so the next read
+    revalues only that user
+  - Snapshots are stamped with the time their valuation started and the
+    version read before the positions, so a valuation that raced a
+    position change is never served
+  - latest_snapshot() returns the newest row unless its version is behind
+    or it is older than PORTFOLIO_SNAPSHOT_MAX_AGE_SECONDS
+  - value_history() feeds the growth chart from the stored rows
+  - Rows older than PORTFOLIO_SNAPSHOT_COMPACT_AFTER_HOURS are compacted to
+    the last one per user and day; rows past the retention period are dropped
+
+Valuation rules (quotes, fallbacks, allocation buckets) live with the
+portfolio routes (app.api.routes.portfolio); this module stores and
+queries their results.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.session import SessionLocal
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Snapshot sources
+SCHEDULED = "scheduled"
+REQUEST = "request"
+
+# Compact old rows at most this often
+_COMPACT_INTERVAL_SECONDS = 3600
+_last_compaction = 0.0
+
+
+# ============================================================================
+# Writes
+# ============================================================================
+
+def add_snapshot(
+    db: Session,
+    user_id: int,
+    valuation: Mapping[str, Any],
+    source: str,
+    taken_at: datetime,
+    positions_version: int,
+) -> PortfolioSnapshot:
+    """
+    Stage a snapshot of a valuation; the caller commits.
+
+    ``valuation`` is a dumped PortfolioDashboardResponse:
+    {"holdings": [...], "summary": {...}, "allocation": {"allocations": [...]}}.
+    ``taken_at`` is when the valuation started and ``positions_version`` the
+    user's version read before the positions (see positions_versions()).
+    """
+    summary = valuation["summary"]
+    snapshot = PortfolioSnapshot(
+        user_id=user_id,
+        taken_at=taken_at,
+        positions_version=positions_version,
+        total_invested=float(summary["total_invested"]),
+        current_value=float(summary["current_value"]),
+        day_pl=float(summary["day_pl"]),
+        allocation=list(valuation["allocation"]["allocations"]),
+        holdings=list(valuation["holdings"]),
+        source=source,
+    )
+    db.add(snapshot)
+    return snapshot
+
+
+def mark_stale(db: Session, user_id: int) -> None:
+    """
+    Outdate the user's snapshots by bumping users.portfolio_version. Call it
+    in the transaction that changes positions so the bump commits (or rolls
+    back) with the change.
+    """
+    db.query(User).filter(User.id == user_id).update(
+        # A portfolio change is not a profile update: keep updated_at as is
+        {User.portfolio_version: User.portfolio_version + 1, User.updated_at: User.updated_at},
+        synchronize_session=False,
+    )
+
+
+def compact_snapshots(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Drop snapshots past the retention period and keep only the last one per
+    user and day among those older than PORTFOLIO_SNAPSHOT_COMPACT_AFTER_HOURS.
+    Returns the number of rows removed; the caller commits.
+    """
+    now = now or datetime.utcnow()
+    removed = db.query(PortfolioSnapshot).filter(
+        PortfolioSnapshot.taken_at < now - timedelta(days=settings.PORTFOLIO_SNAPSHOT_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+
+    cutoff = now - timedelta(hours=settings.PORTFOLIO_SNAPSHOT_COMPACT_AFTER_HOURS)
+    # Ids grow with taken_at, so the largest id of a day is its last snapshot
+    last_of_day = (
+        select(func.max(PortfolioSnapshot.id))
+        .where(PortfolioSnapshot.taken_at < cutoff)
+        .group_by(PortfolioSnapshot.user_id, func.date(PortfolioSnapshot.taken_at))
+    )
+    removed += db.query(PortfolioSnapshot).filter(
+        PortfolioSnapshot.taken_at < cutoff,
+        PortfolioSnapshot.id.not_in(last_of_day),
+    ).delete(synchronize_session=False)
+    return removed
+
+
+# ============================================================================
+# Reads
+# ============================================================================
+
+def positions_versions(db: Session, user_ids: Optional[List[int]] = None) -> Dict[int, int]:
+    """
+    users.portfolio_version by user id (all users when ``user_ids`` is None).
+    Read it before the positions: a change committed in between then shows
+    up as a newer version and the snapshot is never served.
+    """
+    query = db.query(User.id, User.portfolio_version)
+    if user_ids is not None:
+        query = query.filter(User.id.in_(user_ids))
+    return {user_id: int(version) for user_id, version in query.all()}
+
+
+def latest_snapshot(db: Session, user_id: int, max_age_seconds: Optional[int] = None) -> Optional[PortfolioSnapshot]:
+    """
+    Newest snapshot of the user, None when there is none, positions changed
+    after its valuation started or it is too old.
+    """
+    max_age = max_age_seconds if max_age_seconds is not None else settings.PORTFOLIO_SNAPSHOT_MAX_AGE_SECONDS
+    row = (
+        db.query(PortfolioSnapshot, User.portfolio_version)
+        .join(User, User.id == PortfolioSnapshot.user_id)
+        .filter(PortfolioSnapshot.user_id == user_id)
+        .order_by(PortfolioSnapshot.taken_at.desc(), PortfolioSnapshot.id.desc())
+        .first()
+    )
+    if row is None:
+        return None
+    snapshot, version = row
+    if snapshot.positions_version != version:
+        return None
+    if datetime.utcnow() - snapshot.taken_at > timedelta(seconds=max_age):
+        return None
+    return snapshot
+
+
+def value_history(db: Session, user_id: int, since: datetime) -> Optional[List[Tuple[datetime, float]]]:
+    """
+    (taken_at, current_value) of the user's snapshots since ``since``,
+    oldest first. None unless the snapshots reach back to ``since``, so
+    callers can fall back to price history for newer portfolios.
+    """
+    covered = (
+        db.query(PortfolioSnapshot.id)
+        .filter(PortfolioSnapshot.user_id == user_id, PortfolioSnapshot.taken_at <= since)
+        .first()
+    )
+    if covered is None:
+        return None
+    rows = (
+        db.query(PortfolioSnapshot.taken_at, PortfolioSnapshot.current_value)
+        .filter(PortfolioSnapshot.user_id == user_id, PortfolioSnapshot.taken_at >= since)
+        .order_by(PortfolioSnapshot.taken_at, PortfolioSnapshot.id)
+        .all()
+    )
+    return [(taken_at, float(current_value)) for taken_at, current_value in rows]
+
+
+# ============================================================================
+# Background job
+# ============================================================================
+
+def snapshot_all_portfolios() -> int:
+    """
+    Scheduler job: value every portfolio (one quote batch for all tickers)
+    and store a snapshot per user. Returns the number of portfolios written.
+    """
+    # Imported here: the portfolio routes import this module
+    from app.api.routes.portfolio import _value_all_portfolios
+
+    global _last_compaction
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # Time and versions before the positions are read (see positions_versions)
+        taken_at = datetime.utcnow()
+        versions = positions_versions(db)
+        valuations = _value_all_portfolios(db)
+        for user_id, valuation in valuations.items():
+            add_snapshot(db, user_id, valuation.model_dump(), SCHEDULED, taken_at, versions.get(user_id, 0))
+        db.commit()
+
+        if time.monotonic() - _last_compaction > _COMPACT_INTERVAL_SECONDS:
+            _last_compaction = time.monotonic()
+            removed = compact_snapshots(db)
+            db.commit()
+            if removed:
+                logger.info(f"Compacted {removed} portfolio snapshots")
+
+        logger.info(
+            f"Portfolio snapshots written for {len(valuations)} users",
+            extra={"duration_ms": round((time.perf_counter() - started) * 1000, 1)},
+        )
+        return len(valuations)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error writing portfolio snapshots: {type(e).__name__}: {e}", exc_info=True)
+        return 0
+    finally:
+        db.close()
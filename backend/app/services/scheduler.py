@@ -2,23 +2,39 @@
 Background scheduler for Stock Sentinel.
 
 Handles periodic tasks like alert checking using APScheduler.
+
+With ALERT_PIPELINE_ASYNC (default) the alert job is a coroutine running on
+the application event loop (AsyncIOScheduler); otherwise it runs in a
+BackgroundScheduler thread. With ALERT_SCHEDULER_ENABLED=false no alert job
+is started; sharded workers (app.services.alert_worker) check alerts instead.
+
+With PORTFOLIO_SNAPSHOTS_ENABLED the portfolio valuation snapshot job
+(app.services.portfolio_snapshots) runs every
+PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS; it is blocking and runs on a worker
+thread in either mode.
 """
 
 import logging
 from typing import Optional
 
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import BaseScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from app.config import settings
+from app.db.executor import shutdown_db_executor
+from app.services.alert_pipeline import check_all_alerts_async
 from app.services.alert_service import check_all_alerts
+from app.services.portfolio_snapshots import snapshot_all_portfolios
 
 logger = logging.getLogger(__name__)
 
 # Global scheduler instance
-_scheduler: Optional[BackgroundScheduler] = None
+_scheduler: Optional[BaseScheduler] = None
 
 
-def get_scheduler() -> Optional[BackgroundScheduler]:
+def get_scheduler() -> Optional[BaseScheduler]:
     """Get the global scheduler instance."""
     return _scheduler
 
@@ -27,7 +43,8 @@ def start_scheduler() -> None:
     """
     Start the background scheduler for periodic alert checking.
     
-    Starts a BackgroundScheduler that runs alert checking every 30 seconds.
+    Runs alert checking every 30 seconds. In async mode this must be called
+    from the running event loop (the FastAPI lifespan), which the job shares.
     Safe to call multiple times - subsequent calls are idempotent.
     
     Raises:
@@ -40,21 +57,51 @@ def start_scheduler() -> None:
             logger.warning("Scheduler already running, skipping restart")
             return
         
-        _scheduler = BackgroundScheduler(daemon=True)
+        if not settings.ALERT_SCHEDULER_ENABLED:
+            logger.info(
+                "Alert scheduler disabled (ALERT_SCHEDULER_ENABLED=false); "
+                "alerts are checked by `python -m app.services.alert_worker`"
+            )
+            if not settings.PORTFOLIO_SNAPSHOTS_ENABLED:
+                return
         
-        # Add job: Check all alerts every 30 seconds
-        _scheduler.add_job(
-            func=check_all_alerts,
-            trigger=IntervalTrigger(seconds=30),
-            id="check_alerts_job",
-            name="Check all active alerts",
-            replace_existing=True,
-            max_instances=1,  # Prevent concurrent executions
-            misfire_grace_time=10,  # Allow 10s grace period for missed triggers
-        )
+        if settings.ALERT_PIPELINE_ASYNC:
+            _scheduler = AsyncIOScheduler()
+            alert_job = check_all_alerts_async
+        else:
+            _scheduler = BackgroundScheduler(daemon=True)
+            alert_job = check_all_alerts
+        
+        if settings.ALERT_SCHEDULER_ENABLED:
+            # Add job: Check all alerts every 30 seconds
+            _scheduler.add_job(
+                func=alert_job,
+                trigger=IntervalTrigger(seconds=30),
+                id="check_alerts_job",
+                name="Check all active alerts",
+                replace_existing=True,
+                max_instances=1,  # Prevent concurrent executions
+                misfire_grace_time=10,  # Allow 10s grace period for missed triggers
+            )
+        
+        if settings.PORTFOLIO_SNAPSHOTS_ENABLED:
+            # Sync function: the asyncio scheduler runs it in the loop's executor
+            _scheduler.add_job(
+                func=snapshot_all_portfolios,
+                trigger=IntervalTrigger(seconds=settings.PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS),
+                id="portfolio_snapshots_job",
+                name="Snapshot portfolio valuations",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
         
         _scheduler.start()
-        logger.info("✅ Background scheduler started (alert checks every 30 seconds)")
+        logger.info(
+            f"✅ Background scheduler started "
+            f"({'asyncio' if settings.ALERT_PIPELINE_ASYNC else 'thread'} pipeline): "
+            f"{', '.join(job.name for job in _scheduler.get_jobs())}"
+        )
         
     except Exception as e:
         logger.error(f"❌ Failed to start scheduler: {type(e).__name__}: {e}", exc_info=True)
@@ -75,6 +122,7 @@ def stop_scheduler() -> None:
             logger.info("✅ Background scheduler stopped")
         else:
             logger.debug("Scheduler not running, nothing to stop")
+        shutdown_db_executor()
     except Exception as e:
         logger.error(f"❌ Error stopping scheduler: {type(e).__name__}: {e}", exc_info=True)
 
@@ -0,0 +1,283 @@
+"""
+Vectorized technical indicator library for Stock Sentinel.
+
+Every indicator is computed over whole NumPy arrays; callers pass closes
+(and highs/lows/volumes where needed) and get back either the full series
+or only the latest value. Series are aligned with the input: positions
+before the indicator's warm-up window are NaN.
+
+Features:
+  - SMA, EMA, RSI (Wilder or simple), MACD, Bollinger Bands, ATR, VWAP
+  - Full series (sma(), ema(), ...) and latest values (sma_last(), ...);
+    latest values only touch the part of the history that still matters
+  - Moving sums via cumulative sums, rolling deviations via strided windows
+  - Recursive smoothing (EMA, Wilder RSI/ATR) through pandas' compiled ewm
+    for series, and in closed form (one dot product) for latest values
+  - No I/O: histories come from app.services.market_data, validation and
+    error reporting stay with the callers
+
+Definitions (shared by the REST endpoints, the alert engine and the
+stock details page):
+  - EMA is seeded with the SMA of the first ``period`` values,
+    k = 2 / (period + 1)
+  - RSI with Wilder smoothing seeds the average gain/loss with the mean of
+    the first ``period`` changes; "simple" averages the last ``period``
+    changes. No losses gives 100 (or 0 when there were no gains either)
+  - Bollinger Bands use the population standard deviation
+  - ATR is Wilder-smoothed true range; VWAP is cumulative over the input
+"""
+
+import logging
+from typing import NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+ArrayLike = Union[Sequence[float], np.ndarray, pd.Series]
+
+RSI_METHODS = ("wilder", "simple")
+
+
+class MACDSeries(NamedTuple):
+    macd: np.ndarray
+    signal: np.ndarray
+    histogram: np.ndarray
+
+
+class BollingerSeries(NamedTuple):
+    upper: np.ndarray
+    middle: np.ndarray
+    lower: np.ndarray
+
+
+def _array(values: ArrayLike) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64).reshape(-1)
+
+
+def _check_period(period: int) -> int:
+    period = int(period)
+    if period < 1:
+        raise ValueError(f"Indicator period must be at least 1, got {period}")
+    return period
+
+
+def last_value(series: np.ndarray) -> Optional[float]:
+    """Last element of a series as a float, None when empty or NaN."""
+    if len(series) == 0 or np.isnan(series[-1]):
+        return None
+    return float(series[-1])
+
+
+# ============================================================================
+# Smoothing helpers
+# ============================================================================
+
+def _smoothed_series(seed: float, tail: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Series of the recursion s = alpha * x + (1 - alpha) * s seeded with
+    ``seed``; the first element is the seed itself.
+    """
+    values = np.concatenate(([seed], tail))
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _negligible_terms(decay: float) -> int:
+    """Number of recursion steps after which decay^n falls below 1e-17."""
+    if decay <= 0.0:
+        return 1
+    return int(np.ceil(np.log(1e-17) / np.log(decay))) + 1
+
+
+def _smoothed_last(seed: float, tail: np.ndarray, alpha: float) -> float:
+    """
+    Final value of the recursion s = alpha * x + (1 - alpha) * s seeded with ``seed``.
+
+    Unrolled to seed * d^m + sum(alpha * d^(m-1-j) * x_j) with d = 1 - alpha.
+    Terms older than _negligible_terms(d) are below float precision and are
+    dropped, so the cost is bounded by the smoothing length, not the history.
+    """
+    decay = 1.0 - alpha
+    m = len(tail)
+    if m == 0:
+        return seed
+    keep = _negligible_terms(decay)
+    if m > keep:
+        # The state before the kept window only contributes ~d^keep of itself;
+        # the value just before the window stands in for it
+        seed = float(tail[m - keep - 1])
+        tail = tail[m - keep:]
+        m = keep
+    weights = alpha * decay ** np.arange(m - 1, -1, -1, dtype=np.float64)
+    return float(seed * decay ** m + weights @ tail)
+
+
+def _rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    out[period - 1:] = (sums[period:] - sums[:-period]) / period
+    return out
+
+
+def _rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    no_loss = avg_loss == 0
+    return np.where(no_loss, np.where(avg_gain > 0, 100.0, 0.0), rsi)
+
+
+# ============================================================================
+# Series
+# ============================================================================
+
+def sma(values: ArrayLike, period: int) -> np.ndarray:
+    """Simple moving average; NaN for the first period - 1 positions."""
+    return _rolling_mean(_array(values), _check_period(period))
+
+
+def ema(values: ArrayLike, period: int) -> np.ndarray:
+    """Exponential moving average seeded with the SMA of the first ``period`` values."""
+    values = _array(values)
+    period = _check_period(period)
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    out[period - 1:] = _smoothed_series(float(values[:period].mean()), values[period:], 2.0 / (period + 1))
+    return out
+
+
+def rsi(closes: ArrayLike, period: int = 14, method: str = "wilder") -> np.ndarray:
+    """Relative Strength Index (0-100); the first ``period`` positions are NaN."""
+    if method not in RSI_METHODS:
+        raise ValueError(f"Unknown RSI method: {method}")
+    closes = _array(closes)
+    period = _check_period(period)
+    out = np.full(len(closes), np.nan)
+    if len(closes) < period + 1:
+        return out
+    deltas = np.diff(closes)
+    gains = np.clip(deltas, 0.0, None)
+    losses = np.clip(-deltas, 0.0, None)
+    if method == "simple":
+        avg_gain = _rolling_mean(gains, period)[period - 1:]
+        avg_loss = _rolling_mean(losses, period)[period - 1:]
+    else:
+        alpha = 1.0 / period
+        avg_gain = _smoothed_series(float(gains[:period].mean()), gains[period:], alpha)
+        avg_loss = _smoothed_series(float(losses[:period].mean()), losses[period:], alpha)
+    out[period:] = _rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+
+def macd(closes: ArrayLike, fast: int = 12, slow: int = 26, signal: int = 9) -> MACDSeries:
+    """
+    MACD line (EMA fast - EMA slow), its signal line (EMA of the MACD line
+    from the first defined value) and the histogram.
+    """
+    closes = _array(closes)
+    line = ema(closes, fast) - ema(closes, slow)
+    signal_line = np.full(len(closes), np.nan)
+    defined = np.flatnonzero(~np.isnan(line))
+    if len(defined):
+        start = defined[0]
+        signal_line[start:] = ema(line[start:], signal)
+    return MACDSeries(macd=line, signal=signal_line, histogram=line - signal_line)
+
+
+def bollinger(closes: ArrayLike, period: int = 20, num_std: float = 2.0) -> BollingerSeries:
+    """Bollinger Bands: SMA +/- ``num_std`` population standard deviations."""
+    closes = _array(closes)
+    period = _check_period(period)
+    middle = _rolling_mean(closes, period)
+    std = np.full(len(closes), np.nan)
+    if len(closes) >= period:
+        std[period - 1:] = sliding_window_view(closes, period).std(axis=1)
+    return BollingerSeries(upper=middle + num_std * std, middle=middle, lower=middle - num_std * std)
+
+
+def true_range(highs: ArrayLike, lows: ArrayLike, closes: ArrayLike) -> np.ndarray:
+    """max(high - low, |high - prev close|, |low - prev close|); high - low for the first bar."""
+    highs, lows, closes = _array(highs), _array(lows), _array(closes)
+    ranges = highs - lows
+    if len(closes) > 1:
+        previous = closes[:-1]
+        ranges[1:] = np.maximum.reduce(
+            [ranges[1:], np.abs(highs[1:] - previous), np.abs(lows[1:] - previous)]
+        )
+    return ranges
+
+
+def atr(highs: ArrayLike, lows: ArrayLike, closes: ArrayLike, period: int = 14) -> np.ndarray:
+    """Average True Range with Wilder smoothing, seeded with the mean of the first ``period`` ranges."""
+    period = _check_period(period)
+    ranges = true_range(highs, lows, closes)
+    out = np.full(len(ranges), np.nan)
+    if len(ranges) < period:
+        return out
+    out[period - 1:] = _smoothed_series(float(ranges[:period].mean()), ranges[period:], 1.0 / period)
+    return out
+
+
+def vwap(highs: ArrayLike, lows: ArrayLike, closes: ArrayLike, volumes: ArrayLike) -> np.ndarray:
+    """Cumulative volume-weighted average of the typical price (H + L + C) / 3."""
+    typical = (_array(highs) + _array(lows) + _array(closes)) / 3.0
+    volumes = _array(volumes)
+    cumulative_volume = np.cumsum(volumes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cumulative_volume > 0, np.cumsum(typical * volumes) / cumulative_volume, np.nan)
+
+
+# ============================================================================
+# Latest values (NaN when the window is not available)
+# ============================================================================
+
+def sma_last(closes: ArrayLike, period: int) -> float:
+    """Average of the last ``period`` closes."""
+    closes = _array(closes)
+    if period < 1 or len(closes) < period:
+        return np.nan
+    return float(closes[-period:].mean())
+
+
+def ema_last(closes: ArrayLike, period: int) -> float:
+    """Latest EMA (SMA-seeded), in closed form."""
+    closes = _array(closes)
+    if period < 1 or len(closes) < period:
+        return np.nan
+    return _smoothed_last(float(closes[:period].mean()), closes[period:], 2.0 / (period + 1))
+
+
+def bollinger_last(closes: ArrayLike, period: int = 20, num_std: float = 2.0) -> Optional[tuple]:
+    """Latest (upper, middle, lower) Bollinger Bands, None without a full window."""
+    closes = _array(closes)
+    if period < 1 or len(closes) < period:
+        return None
+    window = closes[-period:]
+    middle = float(window.mean())
+    std = float(window.std())
+    return (middle + num_std * std, middle, middle - num_std * std)
+
+
+def rsi_last(closes: ArrayLike, period: int = 14, method: str = "wilder") -> float:
+    """Latest RSI; Wilder smoothing in closed form or the simple average of the last changes."""
+    if method not in RSI_METHODS:
+        raise ValueError(f"Unknown RSI method: {method}")
+    closes = _array(closes)
+    if period < 1 or len(closes) < period + 1:
+        return np.nan
+    if method == "simple":
+        closes = closes[-(period + 1):]
+    else:
+        # Older changes no longer affect the smoothed averages
+        closes = closes[-(period + 1 + _negligible_terms(1.0 - 1.0 / period)):]
+    deltas = np.diff(closes)
+    gains = np.clip(deltas, 0.0, None)
+    losses = np.clip(-deltas, 0.0, None)
+    alpha = 1.0 / period
+    avg_gain = _smoothed_last(float(gains[:period].mean()), gains[period:], alpha)
+    avg_loss = _smoothed_last(float(losses[:period].mean()), losses[period:], alpha)
+    return float(_rsi_from_averages(np.float64(avg_gain), np.float64(avg_loss)))
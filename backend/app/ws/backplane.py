@@ -0,0 +1,344 @@
+"""
+Cross-process pub/sub backplane for WebSocket fan-out.
+
+With several uvicorn workers every process has its own ConnectionManager
+and AlertManager. The backplane connects them:
+
+  - Prices: exactly one process (the ingestion leader) streams each symbol
+    and publishes the ticks; every process fans them out to its own clients
+  - Interest: each process announces the symbols its clients watch, so the
+    leader streams the union of all of them
+  - Alerts: an alert published by any process reaches the alert clients of
+    every process
+
+Implementations (WS_BACKPLANE setting):
+  - "memory": InMemoryBackplane, single process. Message dicts are handed
+    to the handlers as-is, without serialization
+  - "postgres": PostgresBackplane, LISTEN/NOTIFY on the application database
+    plus a session advisory lock for leader election. No extra service.
+    Messages are sent as JSON arrays, as many per NOTIFY as fit its size
+    limit, and a whole publish_many() is a single round trip
+
+Handlers are registered with subscribe() before start() (at import time,
+next to the global instances); start() opens the connections and begins
+listening on every registered channel.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PRICES_CHANNEL = "ws_prices"
+INTEREST_CHANNEL = "ws_interest"
+ALERTS_CHANNEL = "ws_alerts"
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7999
+
+BackplaneHandler = Callable[[dict], Awaitable[None]]
+
+
+def _encode(message: dict) -> str:
+    payload = json.dumps(message, default=str, separators=(",", ":"))
+    # Leave room for the brackets of the array it is packed into
+    if len(payload.encode("utf-8")) > MAX_PAYLOAD_BYTES - 2:
+        raise ValueError(f"Backplane message too large ({len(payload)} bytes)")
+    return payload
+
+
+def _pack(payloads: Sequence[str]) -> List[str]:
+    """Join encoded messages into JSON arrays of at most MAX_PAYLOAD_BYTES each."""
+    packed: List[str] = []
+    batch: List[str] = []
+    size = 2
+    for payload in payloads:
+        length = len(payload.encode("utf-8"))
+        if batch and size + 1 + length > MAX_PAYLOAD_BYTES:
+            packed.append(f"[{','.join(batch)}]")
+            batch, size = [], 2
+        size += length + (1 if batch else 0)
+        batch.append(payload)
+    if batch:
+        packed.append(f"[{','.join(batch)}]")
+    return packed
+
+
+def _decode(payload: str) -> Optional[List[dict]]:
+    """Messages of one NOTIFY payload (an array, or a single message object)."""
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return None
+    if isinstance(data, dict):
+        return [data]
+    if isinstance(data, list) and all(isinstance(message, dict) for message in data):
+        return data
+    return None
+
+
+class Backplane(ABC):
+    """Pub/sub between application processes plus leader election."""
+
+    name = "backplane"
+
+    def __init__(self):
+        self._handlers: Dict[str, List[BackplaneHandler]] = {}
+        self.published = 0
+        self.received = 0
+        self.handler_errors = 0
+
+    def subscribe(self, channel: str, handler: BackplaneHandler) -> None:
+        """Register ``handler(message)`` for a channel."""
+        handlers = self._handlers.setdefault(channel, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    def unsubscribe(self, channel: str, handler: BackplaneHandler) -> None:
+        handlers = self._handlers.get(channel, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    async def _dispatch(self, channel: str, message: dict) -> None:
+        """Run every handler of the channel on a message (shared, read-only)."""
+        handlers = list(self._handlers.get(channel, ()))
+        if not handlers:
+            return
+        self.received += 1
+        for result in await asyncio.gather(*(handler(message) for handler in handlers), return_exceptions=True):
+            if isinstance(result, Exception):
+                self.handler_errors += 1
+                logger.warning(f"Backplane handler failed on {channel}: {result}")
+
+    async def publish(self, channel: str, message: dict) -> None:
+        """Deliver a message to the subscribers of every process."""
+        await self.publish_many(channel, [message])
+
+    @abstractmethod
+    async def publish_many(self, channel: str, messages: Sequence[dict]) -> None:
+        """Publish several messages in one round trip."""
+
+    @abstractmethod
+    async def try_acquire_leadership(self, role: str) -> bool:
+        """
+        Try to become (or confirm being) the single holder of ``role``.
+        Called periodically; a leader that dies loses the role.
+        """
+
+    async def start(self) -> None:
+        """Connect and start listening (no-op by default)."""
+
+    async def stop(self) -> None:
+        """Disconnect and give up leadership (no-op by default)."""
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "channels": sorted(self._handlers),
+            "published": self.published,
+            "received": self.received,
+            "handler_errors": self.handler_errors,
+        }
+
+
+# ============================================================================
+# In-memory (single process)
+# ============================================================================
+
+class InMemoryBackplane(Backplane):
+    """
+    Single-process backplane: publish() hands the message objects to local
+    handlers directly, with no serialization. This process is always the
+    leader.
+    """
+
+    name = "memory"
+
+    async def publish_many(self, channel: str, messages: Sequence[dict]) -> None:
+        for message in messages:
+            self.published += 1
+            await self._dispatch(channel, message)
+
+    async def try_acquire_leadership(self, role: str) -> bool:
+        return True
+
+
+# ============================================================================
+# PostgreSQL LISTEN/NOTIFY
+# ============================================================================
+
+class PostgresBackplane(Backplane):
+    """
+    Backplane on the application database (psycopg2).
+
+    One connection LISTENs from a background thread and hands notifications
+    to the event loop; a second one sends NOTIFY and holds the session
+    advisory locks used for leader election (released automatically when
+    the process or its connection dies).
+    """
+
+    name = "postgres"
+
+    def __init__(self, poll_seconds: float = 1.0):
+        super().__init__()
+        self.poll_seconds = poll_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listen_conn = None
+        self._command_conn = None
+        self._command_lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._leader_roles: set = set()
+
+    @staticmethod
+    def _connect():
+        """Dedicated autocommit psycopg2 connection detached from the pool."""
+        from app.db.session import engine
+
+        proxied = engine.raw_connection()
+        proxied.detach()
+        connection = proxied.dbapi_connection
+        connection.set_isolation_level(0)
+        return connection
+
+    async def start(self) -> None:
+        if self._listener is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        await asyncio.to_thread(self._open_listener)
+        self._listener = threading.Thread(target=self._listen_loop, name="ws-backplane", daemon=True)
+        self._listener.start()
+        logger.info("✅ WebSocket backplane started", extra={"backend": self.name, "channels": sorted(self._handlers)})
+
+    def _open_listener(self) -> None:
+        self._listen_conn = self._connect()
+        cursor = self._listen_conn.cursor()
+        for channel in self._handlers:
+            cursor.execute(f'LISTEN "{channel}"')
+        cursor.close()
+
+    def _listen_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self._listen_conn is None:
+                    self._open_listener()
+                if select.select([self._listen_conn], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                self._listen_conn.poll()
+                while self._listen_conn.notifies:
+                    notify = self._listen_conn.notifies.pop(0)
+                    messages = _decode(notify.payload)
+                    if messages is None:
+                        logger.warning(f"Dropping malformed backplane message on {notify.channel}")
+                        continue
+                    asyncio.run_coroutine_threadsafe(self._dispatch_in_order(notify.channel, messages), self._loop)
+            except Exception as e:
+                if self._stopping.is_set():
+                    break
+                logger.warning(f"Backplane listener connection lost, reconnecting: {e}")
+                self._close_quietly(self._listen_conn)
+                self._listen_conn = None
+                self._stopping.wait(self.poll_seconds)
+
+    async def _dispatch_in_order(self, channel: str, messages: List[dict]) -> None:
+        for message in messages:
+            await self._dispatch(channel, message)
+
+    def _command(self, work: Callable[[Any], Any]) -> Any:
+        """Run ``work(cursor)`` on the command connection (reconnects once)."""
+        with self._command_lock:
+            for attempt in (1, 2):
+                try:
+                    if self._command_conn is None:
+                        self._command_conn = self._connect()
+                        # A new session holds no advisory locks
+                        self._leader_roles.clear()
+                    cursor = self._command_conn.cursor()
+                    try:
+                        return work(cursor)
+                    finally:
+                        cursor.close()
+                except Exception:
+                    self._close_quietly(self._command_conn)
+                    self._command_conn = None
+                    self._leader_roles.clear()
+                    if attempt == 2:
+                        raise
+
+    async def publish_many(self, channel: str, messages: Sequence[dict]) -> None:
+        payloads = _pack([_encode(message) for message in messages])
+        if not payloads:
+            return
+
+        def _notify(cursor) -> None:
+            # One statement for every packed payload (unnest keeps array order)
+            cursor.execute("SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload", (channel, payloads))
+
+        await asyncio.to_thread(self._command, _notify)
+        self.published += len(messages)
+
+    async def try_acquire_leadership(self, role: str) -> bool:
+        key = zlib.crc32(role.encode("utf-8"))
+
+        def _try_lock(cursor) -> bool:
+            if role in self._leader_roles:
+                # Cheap liveness check of the session holding the lock
+                cursor.execute("SELECT 1")
+                return True
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (key,))
+            acquired = bool(cursor.fetchone()[0])
+            if acquired:
+                self._leader_roles.add(role)
+            return acquired
+
+        try:
+            return await asyncio.to_thread(self._command, _try_lock)
+        except Exception as e:
+            logger.warning(f"Backplane leader election failed: {e}")
+            return False
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._listener is not None:
+            await asyncio.to_thread(self._listener.join, self.poll_seconds * 2)
+            self._listener = None
+        # Closing the sessions also releases their advisory locks
+        self._close_quietly(self._listen_conn)
+        self._close_quietly(self._command_conn)
+        self._listen_conn = self._command_conn = None
+        self._leader_roles.clear()
+
+    @staticmethod
+    def _close_quietly(connection) -> None:
+        if connection is None:
+            return
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["leader_roles"] = sorted(self._leader_roles)
+        stats["listening"] = self._listener is not None and self._listener.is_alive()
+        return stats
+
+
+def create_backplane() -> Backplane:
+    """Backplane selected by WS_BACKPLANE ("memory" or "postgres")."""
+    if settings.WS_BACKPLANE == "postgres":
+        return PostgresBackplane()
+    return InMemoryBackplane()
+
+
+# Global backplane instance (connected in the application lifespan)
+backplane = create_backplane()
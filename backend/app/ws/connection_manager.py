@@ -2,14 +2,32 @@
 WebSocket connection manager for handling multiple client connections
 and broadcasting price updates and alerts to subscribed clients.
 With error recovery and graceful degradation.
+
+Broadcasts serialize each message once (per wire format) and hand the
+same frame to every client's bounded send queue (app.ws.fanout); per-client
+writer tasks send concurrently, so one slow client never delays the rest.
 """
 
 import asyncio
-import json
-from typing import Set, Dict
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from fastapi import WebSocket
 import logging
 
+from app.config import settings
+from app.ws.backplane import ALERTS_CHANNEL, backplane
+from app.ws.fanout import (
+    DEFAULT_WIRE,
+    DISCONNECT,
+    FULL,
+    ClientChannel,
+    FanoutStats,
+    PriceFrames,
+    WireFormat,
+    encode_message,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,19 +35,31 @@ class AlertManager:
     """
     Manages WebSocket connections for real-time alert notifications.
     Broadcasts alerts to all connected users when they trigger.
+    Alerts are never dropped: a client whose queue fills up is disconnected.
     """
     
     def __init__(self):
-        # Set of all WebSocket connections for alerts
-        self.alert_subscribers: Set[WebSocket] = set()
+        # WebSocket -> send channel for all alert subscribers
+        self._channels: Dict[WebSocket, ClientChannel] = {}
         self._lock = asyncio.Lock()
+        self.fanout = FanoutStats()
+    
+    @property
+    def alert_subscribers(self) -> Set[WebSocket]:
+        return set(self._channels)
     
     async def subscribe(self, websocket: WebSocket):
         """Add a client to alert subscribers."""
         try:
             async with self._lock:
-                self.alert_subscribers.add(websocket)
-            logger.debug(f"Client subscribed to alerts. Total subscribers: {len(self.alert_subscribers)}")
+                if websocket not in self._channels:
+                    self._channels[websocket] = ClientChannel(
+                        websocket,
+                        self.fanout.delivery,
+                        policy=DISCONNECT,
+                        on_close=self._on_channel_closed,
+                    )
+            logger.debug(f"Client subscribed to alerts. Total subscribers: {len(self._channels)}")
         except Exception as e:
             logger.error(f"Error subscribing to alerts: {e}")
             raise
@@ -38,11 +68,23 @@ class AlertManager:
         """Remove a client from alert subscribers."""
         try:
             async with self._lock:
-                self.alert_subscribers.discard(websocket)
-            logger.debug(f"Client unsubscribed from alerts. Total subscribers: {len(self.alert_subscribers)}")
+                channel = self._channels.pop(websocket, None)
+            if channel is not None:
+                await channel.close()
+            logger.debug(f"Client unsubscribed from alerts. Total subscribers: {len(self._channels)}")
         except Exception as e:
             logger.warning(f"Error unsubscribing from alerts: {e}")
     
+    async def _on_channel_closed(self, channel: ClientChannel):
+        async with self._lock:
+            if self._channels.get(channel.websocket) is channel:
+                del self._channels[channel.websocket]
+
+    async def send(self, websocket: WebSocket, data: dict) -> bool:
+        """Queue a message for one subscriber (in order with its alerts)."""
+        channel = self._channels.get(websocket)
+        return channel is not None and channel.offer(encode_message(data))
+
     async def broadcast_alert(self, alert_data: dict):
         """
         Broadcast an alert to all connected clients.
@@ -59,27 +101,21 @@ class AlertManager:
                 - timestamp: When alert triggered
         """
         try:
-            async with self._lock:
-                disconnected_clients = []
-                
-                for websocket in list(self.alert_subscribers):
-                    try:
-                        await websocket.send_json(alert_data)
-                        logger.debug(f"Alert sent: {alert_data.get('symbol')}")
-                    except Exception as e:
-                        logger.debug(f"Error sending alert to client: {e}")
-                        disconnected_clients.append(websocket)
-                
-                # Remove disconnected clients
-                for websocket in disconnected_clients:
-                    self.alert_subscribers.discard(websocket)
-                    
+            started = time.perf_counter()
+            text = encode_message(alert_data)
+            channels = list(self._channels.values())
+            queued = sum(1 for channel in channels if channel.offer(text, started))
+            self.fanout.record_broadcast(started, queued)
+            logger.debug(f"Alert queued for {queued} clients: {alert_data.get('symbol')}")
         except Exception as e:
             logger.error(f"Error in broadcast_alert: {e}")
     
     def get_subscriber_count(self) -> int:
         """Get number of alert subscribers."""
-        return len(self.alert_subscribers)
+        return len(self._channels)
+
+    def stats(self) -> dict:
+        return self.fanout.snapshot(self._channels.values())
 
 
 class ConnectionManager:
@@ -87,24 +123,67 @@ class ConnectionManager:
     Manages WebSocket connections and broadcasts price updates.
     Supports pub-sub pattern - multiple clients subscribing to price updates for a symbol.
     Implements error handling and graceful disconnection.
+
+    Two kinds of clients share one symbol -> clients index:
+      - single-symbol clients (/ws/stocks/{symbol}) get one frame per update
+      - multiplexed clients (/ws/stream) subscribe to many symbols on one
+        socket; their updates are coalesced into one "prices" frame per
+        client per tick (latest update per symbol wins)
+
+    Each client negotiates a WireFormat (full or delta messages, JSON or
+    MessagePack). Slow clients are conflated: once WS_CONFLATE_PENDING
+    frames are queued, further updates are held back per symbol and the
+    latest snapshot of each is sent when the client catches up.
     """
 
     def __init__(self):
         # Structure: { symbol: set(websockets) }
         self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # Reverse index: { websocket: set(symbols) }
+        self._subscriptions: Dict[WebSocket, Set[str]] = {}
+        # Send channel and wire format per connected client
+        self._channels: Dict[WebSocket, ClientChannel] = {}
+        self._wire: Dict[WebSocket, WireFormat] = {}
+        # Delta clients: symbols whose updates reached the queue in sequence
+        self._synced: Dict[WebSocket, Set[str]] = {}
+        # Conflated clients: symbols held back until the client catches up
+        self._dirty: Dict[WebSocket, Set[str]] = {}
+        # Multiplexed clients and their coalesced updates:
+        # { websocket: { symbol: (frames, force_snapshot) } }
+        self._multiplexed: Set[WebSocket] = set()
+        self._pending: Dict[WebSocket, Dict[str, Tuple[PriceFrames, bool]]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
         # Cache latest price for each symbol: { symbol: { "price": float, "timestamp": str } }
         self.price_cache: Dict[str, dict] = {}
         self._lock = asyncio.Lock()
+        self.fanout = FanoutStats()
+        self.conflated = 0
 
-    async def connect(self, websocket: WebSocket, symbol: str):
-        """Accept a new WebSocket connection for a symbol."""
+    def _open_channel(self, websocket: WebSocket, wire: Optional[WireFormat]) -> None:
+        if websocket not in self._channels:
+            self._channels[websocket] = ClientChannel(
+                websocket,
+                self.fanout.delivery,
+                on_close=self._on_channel_closed,
+                on_drain=self._on_channel_drained,
+            )
+            self._subscriptions.setdefault(websocket, set())
+            self._wire[websocket] = wire or DEFAULT_WIRE
+            if wire is not None:
+                # Always JSON text, so clients can see a MessagePack fallback
+                self._channels[websocket].offer(
+                    encode_message({"type": "hello", "mode": wire.mode, "encoding": wire.encoding})
+                )
+
+    async def connect(self, websocket: WebSocket, symbol: str, wire: Optional[WireFormat] = None):
+        """
+        Accept a new WebSocket connection for a symbol.
+        ``wire`` is the negotiated format (None = legacy full JSON, no hello).
+        """
         try:
             await websocket.accept()
-            
-            if symbol not in self.active_connections:
-                self.active_connections[symbol] = set()
-            
-            self.active_connections[symbol].add(websocket)
+            self._open_channel(websocket, wire)
+            self._add_subscription(websocket, symbol)
             logger.info(f"Client connected to {symbol}. Active: {len(self.active_connections[symbol])}")
             
             # Send cached price immediately if available
@@ -114,63 +193,247 @@ class ConnectionManager:
             logger.error(f"Error accepting WebSocket connection: {e}")
             raise
 
+    async def connect_multiplexed(self, websocket: WebSocket, wire: Optional[WireFormat] = None):
+        """Accept a multiplexed connection (no symbols until it subscribes)."""
+        try:
+            await websocket.accept()
+            self._open_channel(websocket, wire)
+            self._multiplexed.add(websocket)
+            logger.info(f"Multiplexed client connected. Clients: {len(self._multiplexed)}")
+        except Exception as e:
+            logger.error(f"Error accepting WebSocket connection: {e}")
+            raise
+
+    def _add_subscription(self, websocket: WebSocket, symbol: str) -> bool:
+        clients = self.active_connections.setdefault(symbol, set())
+        if websocket in clients:
+            return False
+        clients.add(websocket)
+        self._subscriptions.setdefault(websocket, set()).add(symbol)
+        return True
+
+    def _remove_subscription(self, websocket: WebSocket, symbol: str) -> bool:
+        clients = self.active_connections.get(symbol)
+        if not clients or websocket not in clients:
+            return False
+        clients.discard(websocket)
+        # Clean up empty entries
+        if not clients:
+            del self.active_connections[symbol]
+        self._subscriptions.get(websocket, set()).discard(symbol)
+        self._synced.get(websocket, set()).discard(symbol)
+        self._dirty.get(websocket, set()).discard(symbol)
+        pending = self._pending.get(websocket)
+        if pending:
+            pending.pop(symbol, None)
+        return True
+
+    async def subscribe(self, websocket: WebSocket, symbols: Iterable[str]) -> List[str]:
+        """
+        Subscribe a multiplexed client to symbols.
+
+        Returns the newly added symbols; cached prices for them are sent
+        right away in one coalesced frame.
+        """
+        added = [symbol for symbol in symbols if self._add_subscription(websocket, symbol)]
+        for symbol in added:
+            if symbol in self.price_cache:
+                self._queue_update(websocket, symbol, PriceFrames(symbol, self.price_cache[symbol]))
+        return added
+
+    async def unsubscribe(self, websocket: WebSocket, symbols: Iterable[str]) -> List[str]:
+        """Unsubscribe a multiplexed client; returns the symbols removed."""
+        return [symbol for symbol in symbols if self._remove_subscription(websocket, symbol)]
+
+    def get_subscriptions(self, websocket: WebSocket) -> Set[str]:
+        """Symbols a client is subscribed to."""
+        return set(self._subscriptions.get(websocket, ()))
+
     async def disconnect(self, websocket: WebSocket, symbol: str):
         """Remove a WebSocket connection."""
         try:
-            if symbol in self.active_connections:
-                self.active_connections[symbol].discard(websocket)
-                logger.info(f"Client disconnected from {symbol}. Active: {len(self.active_connections[symbol])}")
-                
-                # Clean up empty entries
-                if not self.active_connections[symbol]:
-                    del self.active_connections[symbol]
+            if self._remove_subscription(websocket, symbol):
+                logger.info(f"Client disconnected from {symbol}. Active: {self.get_connection_count(symbol)}")
+            
+            if not self._subscriptions.get(websocket) and websocket not in self._multiplexed:
+                await self._close_client(websocket)
         except Exception as e:
             logger.warning(f"Error during disconnect for {symbol}: {e}")
 
+    async def disconnect_all(self, websocket: WebSocket) -> List[str]:
+        """Drop a client from every symbol; returns the symbols it left."""
+        symbols = list(self._subscriptions.get(websocket, ()))
+        for symbol in symbols:
+            self._remove_subscription(websocket, symbol)
+        self._multiplexed.discard(websocket)
+        await self._close_client(websocket)
+        return symbols
+
+    def _forget_client(self, websocket: WebSocket) -> None:
+        for symbol in list(self._subscriptions.get(websocket, ())):
+            self._remove_subscription(websocket, symbol)
+        for state in (self._subscriptions, self._pending, self._wire, self._synced, self._dirty):
+            state.pop(websocket, None)
+        self._multiplexed.discard(websocket)
+
+    async def _close_client(self, websocket: WebSocket) -> None:
+        self._forget_client(websocket)
+        channel = self._channels.pop(websocket, None)
+        if channel is not None:
+            await channel.close()
+
+    async def _on_channel_closed(self, channel: ClientChannel):
+        """Writer gave up on a client (send failure or slow consumer)."""
+        websocket = channel.websocket
+        if self._channels.get(websocket) is channel:
+            del self._channels[websocket]
+        self._forget_client(websocket)
+
+    async def send(self, websocket: WebSocket, data: dict) -> bool:
+        """Queue a message for one client (in order with its updates)."""
+        channel = self._channels.get(websocket)
+        return channel is not None and channel.offer(self._wire.get(websocket, DEFAULT_WIRE).encode(data))
+
     async def send_cached_price(self, websocket: WebSocket, symbol: str):
         """Send cached price to a single client."""
-        if symbol in self.price_cache:
+        channel = self._channels.get(websocket)
+        if symbol in self.price_cache and channel is not None:
             try:
-                await websocket.send_json({
-                    "symbol": symbol,
-                    **self.price_cache[symbol]
-                })
+                self._needs_snapshot(websocket, symbol)
+                channel.offer(PriceFrames(symbol, self.price_cache[symbol]).frame(self._wire[websocket]))
             except Exception as e:
                 logger.warning(f"Error sending cached price to client: {e}")
 
+    # ------------------------------------------------------------------
+    # Delta state and conflation
+    # ------------------------------------------------------------------
+
+    def _needs_snapshot(self, websocket: WebSocket, symbol: str) -> bool:
+        """True unless a delta client already holds the symbol's last update."""
+        if self._wire.get(websocket, DEFAULT_WIRE).mode == FULL:
+            return True
+        synced = self._synced.setdefault(websocket, set())
+        if symbol in synced:
+            return False
+        synced.add(symbol)
+        return True
+
+    @staticmethod
+    def _backed_up(channel: ClientChannel) -> bool:
+        return channel.pending >= settings.WS_CONFLATE_PENDING
+
+    def _hold_back(self, websocket: WebSocket, symbol: str) -> None:
+        self._dirty.setdefault(websocket, set()).add(symbol)
+        # The client misses updates, so its next frame must be a snapshot
+        self._synced.get(websocket, set()).discard(symbol)
+        self.conflated += 1
+
+    def _on_channel_drained(self, channel: ClientChannel) -> None:
+        """Send the latest snapshot of every symbol held back for a client."""
+        websocket = channel.websocket
+        dirty = self._dirty.pop(websocket, None)
+        if not dirty:
+            return
+        wire = self._wire.get(websocket, DEFAULT_WIRE)
+        frames = []
+        for symbol in sorted(dirty):
+            if symbol in self.price_cache and symbol in self._subscriptions.get(websocket, ()):
+                self._needs_snapshot(websocket, symbol)
+                frames.append(PriceFrames(symbol, self.price_cache[symbol]).frame(wire))
+        if not frames:
+            return
+        if websocket in self._multiplexed:
+            channel.offer(wire.join_updates(frames))
+        else:
+            for frame in frames:
+                channel.offer(frame)
+
+    # ------------------------------------------------------------------
+    # Broadcast
+    # ------------------------------------------------------------------
+
     async def broadcast(self, symbol: str, price_data: dict):
         """
         Broadcast price update to all clients connected to a symbol.
-        Updates cache and sends to all active connections.
-        Handles disconnected clients gracefully.
+        Updates cache, encodes each wire variant (full/delta, JSON/MessagePack)
+        at most once and queues it on every single-symbol client's channel;
+        multiplexed clients get it in their next coalesced frame. Never
+        waits for a client's socket.
         """
         try:
-            async with self._lock:
-                # Update cache
+            # Control messages (e.g. stream_error) go to everyone as-is
+            control = "type" in price_data
+            if control:
+                frames = PriceFrames(symbol, price_data)
+            else:
+                frames = PriceFrames(symbol, price_data, self.price_cache.get(symbol))
+                # Update cache (single assignment, no await in between)
                 self.price_cache[symbol] = price_data
             
-            if symbol not in self.active_connections:
+            clients = self.active_connections.get(symbol)
+            if not clients:
                 return
             
-            # Send to all connected clients
-            disconnected_clients = []
-            for websocket in list(self.active_connections[symbol]):
-                try:
-                    await websocket.send_json({
-                        "symbol": symbol,
-                        **price_data
-                    })
-                except Exception as e:
-                    logger.debug(f"Error broadcasting to client: {e}")
-                    disconnected_clients.append(websocket)
-            
-            # Remove disconnected clients
-            for websocket in disconnected_clients:
-                await self.disconnect(websocket, symbol)
+            started = time.perf_counter()
+            queued = 0
+            for websocket in list(clients):
+                channel = self._channels.get(websocket)
+                if channel is None:
+                    continue
+                if websocket in self._multiplexed:
+                    self._queue_update(websocket, symbol, frames)
+                    continue
+                if not control and self._backed_up(channel):
+                    self._hold_back(websocket, symbol)
+                    continue
+                wire = self._wire.get(websocket, DEFAULT_WIRE)
+                snapshot = self._needs_snapshot(websocket, symbol)
+                if frames.is_noop(wire, snapshot):
+                    continue
+                if channel.offer(frames.frame(wire, snapshot), started):
+                    queued += 1
+            self.fanout.record_broadcast(started, queued)
         
         except Exception as e:
             logger.error(f"Error in broadcast for {symbol}: {e}")
 
+    def _queue_update(self, websocket: WebSocket, symbol: str, frames: PriceFrames) -> None:
+        pending = self._pending.setdefault(websocket, {})
+        # Replacing an unsent update: a delta would lose its changes
+        pending[symbol] = (frames, symbol in pending)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                settings.WS_COALESCE_MS / 1000, self._flush_pending
+            )
+
+    def _flush_pending(self) -> None:
+        """Send each multiplexed client one frame with its pending updates."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        started = time.perf_counter()
+        queued = 0
+        for websocket, updates in pending.items():
+            channel = self._channels.get(websocket)
+            if channel is None or not updates:
+                continue
+            if self._backed_up(channel):
+                for symbol in updates:
+                    self._hold_back(websocket, symbol)
+                continue
+            wire = self._wire.get(websocket, DEFAULT_WIRE)
+            frames = []
+            for symbol, (update, force_snapshot) in updates.items():
+                snapshot = self._needs_snapshot(websocket, symbol) or force_snapshot
+                if not update.is_noop(wire, snapshot):
+                    frames.append(update.frame(wire, snapshot))
+            if not frames:
+                continue
+            # Symbol frames are already encoded; only the envelope is joined
+            if channel.offer(wire.join_updates(frames), started):
+                queued += 1
+        if queued:
+            self.fanout.record_broadcast(started, queued)
+
     async def broadcast_to_all(self, data: dict):
         """Broadcast a message to all connected clients across all symbols."""
         for symbol in list(self.active_connections.keys()):
@@ -187,9 +450,25 @@ class ConnectionManager:
         """Get all symbols with active connections."""
         return list(self.active_connections.keys())
 
+    def stats(self) -> dict:
+        """Fan-out counters and broadcast/delivery latency percentiles."""
+        stats = self.fanout.snapshot(self._channels.values())
+        stats["multiplexed_clients"] = len(self._multiplexed)
+        stats["subscriptions"] = sum(len(symbols) for symbols in self._subscriptions.values())
+        stats["conflated_updates"] = self.conflated
+        stats["wire_formats"] = {
+            f"{wire.mode}/{wire.encoding}": count
+            for wire, count in Counter(self._wire.values()).items()
+        }
+        return stats
+
 
 # Global connection manager instance
 manager = ConnectionManager()
 
 # Global alert manager instance
 alert_manager = AlertManager()
+
+# Alerts published on the backplane by any process reach the alert clients
+# of every process
+backplane.subscribe(ALERTS_CHANNEL, alert_manager.broadcast_alert)
@@ -0,0 +1,359 @@
+"""
+WebSocket fan-out primitives: encode once, send concurrently.
+
+Features:
+  - encode_message() serializes a payload once (orjson when installed,
+    stdlib json otherwise); the same text frame goes to every subscriber
+  - ClientChannel gives each client a bounded send queue drained by its own
+    writer task, so a slow client never delays the others
+  - Slow-consumer policy when a queue is full: "drop_oldest" (keep the
+    freshest prices), "drop_newest" or "disconnect"
+  - Clients that stay full for too long or whose sends time out are closed
+  - LatencyRecorder keeps recent fan-out latencies and reports percentiles
+  - Wire formats negotiated per client: full or delta (changed fields only)
+    messages, JSON text or MessagePack binary frames (JSON when msgpack is
+    not installed; the hello frame reports the encoding in use);
+    PriceFrames encodes each variant of an update at most once
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from fastapi import WebSocket
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, DROP_NEWEST, DISCONNECT)
+
+# Close code sent to clients dropped as slow consumers ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+# Wire modes and encodings (negotiated at connect time)
+FULL = "full"
+DELTA = "delta"
+WIRE_MODES = (FULL, DELTA)
+JSON = "json"
+MSGPACK = "msgpack"
+WIRE_ENCODINGS = (JSON, MSGPACK)
+
+Frame = Union[str, bytes]
+
+
+def encode_message(data: Any) -> str:
+    """Serialize a message once for all recipients (WebSocket text frame)."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, default=str, separators=(",", ":"))
+
+
+def _msgpack_array_header(length: int) -> bytes:
+    if length < 16:
+        return bytes([0x90 | length])
+    if length < 0x10000:
+        return b"\xdc" + length.to_bytes(2, "big")
+    return b"\xdd" + length.to_bytes(4, "big")
+
+
+@dataclass(frozen=True)
+class WireFormat:
+    """How one client wants price messages: mode (full/delta) and encoding."""
+    mode: str = FULL
+    encoding: str = JSON
+
+    @classmethod
+    def negotiate(cls, mode: Optional[str] = None, encoding: Optional[str] = None) -> "WireFormat":
+        """
+        Validate a client's request; MessagePack falls back to JSON when the
+        msgpack package is not installed. Raises ValueError for unknown values.
+        """
+        mode = (mode or FULL).lower()
+        encoding = (encoding or JSON).lower()
+        if mode not in WIRE_MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        if encoding not in WIRE_ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding}")
+        if encoding == MSGPACK and msgpack is None:
+            logger.warning("msgpack is not installed, falling back to JSON for a client that asked for msgpack")
+            encoding = JSON
+        return cls(mode=mode, encoding=encoding)
+
+    def encode(self, data: Any) -> Frame:
+        if self.encoding == MSGPACK:
+            return msgpack.packb(data, default=str)
+        return encode_message(data)
+
+    def join_updates(self, frames: Sequence[Frame]) -> Frame:
+        """{"type": "prices", "updates": [...]} from already encoded updates."""
+        if self.encoding == MSGPACK:
+            return (
+                b"\x82"
+                + msgpack.packb("type") + msgpack.packb("prices")
+                + msgpack.packb("updates") + _msgpack_array_header(len(frames))
+                + b"".join(frames)
+            )
+        return '{"type":"prices","updates":[' + ",".join(frames) + "]}"
+
+
+DEFAULT_WIRE = WireFormat()
+
+_MISSING = object()
+
+
+class PriceFrames:
+    """
+    Encoded variants of one price update, each built at most once.
+
+    A snapshot carries every field; a delta only the fields that changed
+    since the previous update of the symbol, marked with "delta": true.
+    """
+
+    def __init__(self, symbol: str, data: dict, previous: Optional[dict] = None):
+        self.symbol = symbol
+        self.data = data
+        if previous is None:
+            self.changed: Optional[dict] = None
+        else:
+            self.changed = {
+                key: value for key, value in data.items() if previous.get(key, _MISSING) != value
+            }
+        self._encoded: Dict[Tuple[str, bool], Frame] = {}
+
+    def is_noop(self, wire: WireFormat, snapshot: bool) -> bool:
+        """True when a delta client would receive an empty delta."""
+        return not snapshot and wire.mode == DELTA and self.changed == {}
+
+    def frame(self, wire: WireFormat, snapshot: bool = True) -> Frame:
+        snapshot = snapshot or wire.mode == FULL or self.changed is None
+        key = (wire.encoding, snapshot)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            if snapshot:
+                message = {"symbol": self.symbol, **self.data}
+            else:
+                message = {"symbol": self.symbol, "delta": True, **self.changed}
+            encoded = self._encoded[key] = wire.encode(message)
+        return encoded
+
+
+# ============================================================================
+# Latency percentiles
+# ============================================================================
+
+class LatencyRecorder:
+    """Sliding window of latency samples (milliseconds) with percentiles."""
+
+    def __init__(self, window: int = 2048):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, milliseconds: float) -> None:
+        self._samples.append(milliseconds)
+        self.count += 1
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        if not self._samples:
+            return {"p50": None, "p95": None, "p99": None, "max": None}
+        ordered = sorted(self._samples)
+        last = len(ordered) - 1
+
+        def _at(fraction: float) -> float:
+            return round(ordered[min(int(fraction * last + 0.5), last)], 3)
+
+        return {"p50": _at(0.50), "p95": _at(0.95), "p99": _at(0.99), "max": round(ordered[-1], 3)}
+
+
+# ============================================================================
+# Per-client send queue
+# ============================================================================
+
+class ClientChannel:
+    """
+    Bounded send queue and writer task of one WebSocket client.
+
+    offer() never blocks; the writer task sends queued frames in order and
+    records enqueue-to-sent latency. ``on_close`` is called once when the
+    channel shuts down on its own (send failure or slow consumer).
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        latency: LatencyRecorder,
+        policy: Optional[str] = None,
+        max_queue: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+        max_dropped: Optional[int] = None,
+        on_close: Optional[Callable[["ClientChannel"], Awaitable[None]]] = None,
+        on_drain: Optional[Callable[["ClientChannel"], None]] = None,
+    ):
+        policy = policy or settings.WS_SLOW_CONSUMER_POLICY
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow-consumer policy: {policy}")
+        self.websocket = websocket
+        self.policy = policy
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
+        self.max_dropped = max_dropped or settings.WS_MAX_DROPPED_MESSAGES
+        self.max_queue = max(max_queue or settings.WS_SEND_QUEUE_SIZE, 1)
+        # Plain deque plus a wake-up future: cheaper than asyncio.Queue on the
+        # broadcast hot path, the writer is only woken when it is idle
+        self._buffer: Deque[Tuple[Frame, float]] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self._latency = latency
+        self._on_close = on_close
+        self._on_drain = on_drain
+        self._closed = False
+        self._consecutive_drops = 0
+        self.sent = 0
+        self.dropped = 0
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def offer(self, text: Frame, queued_at: Optional[float] = None) -> bool:
+        """
+        Queue a frame; applies the slow-consumer policy when full.
+        Broadcasters pass one ``queued_at`` (perf_counter) for all clients.
+        """
+        if self._closed:
+            return False
+        item = (text, queued_at if queued_at is not None else time.perf_counter())
+        if len(self._buffer) >= self.max_queue:
+            self.dropped += 1
+            self._consecutive_drops += 1
+            if self.policy == DISCONNECT or self._consecutive_drops >= self.max_dropped:
+                self._shutdown(reason="slow consumer")
+                return False
+            if self.policy == DROP_NEWEST:
+                return False
+            self._buffer.popleft()
+
+        self._buffer.append(item)
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+        return True
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                if not self._buffer:
+                    self._waiter = asyncio.get_running_loop().create_future()
+                    await self._waiter
+                    continue
+                text, queued_at = self._buffer.popleft()
+                try:
+                    async with asyncio.timeout(self.send_timeout):
+                        if isinstance(text, bytes):
+                            await self.websocket.send_bytes(text)
+                        else:
+                            await self.websocket.send_text(text)
+                except TimeoutError:
+                    self._shutdown(reason="send timeout")
+                    return
+                except Exception as e:
+                    logger.debug(f"Error sending to client: {e}")
+                    self._shutdown(reason=None)
+                    return
+                self.sent += 1
+                self._consecutive_drops = 0
+                self._latency.record((time.perf_counter() - queued_at) * 1000)
+                if not self._buffer and self._on_drain is not None:
+                    # Caught up: let the owner send what it held back
+                    self._on_drain(self)
+        except asyncio.CancelledError:
+            pass
+
+    def _shutdown(self, reason: Optional[str]) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if reason:
+            logger.warning(
+                f"Dropping WebSocket client: {reason}",
+                extra={"dropped": self.dropped, "pending": len(self._buffer)},
+            )
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        asyncio.create_task(self._finish(reason))
+
+    async def _finish(self, reason: Optional[str]) -> None:
+        if reason:
+            try:
+                await asyncio.wait_for(
+                    self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason=reason),
+                    timeout=self.send_timeout,
+                )
+            except Exception:
+                pass
+        if self._on_close is not None:
+            try:
+                await self._on_close(self)
+            except Exception as e:
+                logger.warning(f"Error cleaning up closed WebSocket client: {e}")
+
+    async def close(self) -> None:
+        """Stop the writer without calling on_close (normal disconnect)."""
+        self._closed = True
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+
+
+class FanoutStats:
+    """Counters and latency windows shared by the channels of a manager."""
+
+    def __init__(self):
+        self.delivery = LatencyRecorder()
+        self.broadcast = LatencyRecorder()
+        self.broadcasts = 0
+        self.frames_queued = 0
+
+    def record_broadcast(self, started: float, recipients: int) -> None:
+        self.broadcasts += 1
+        self.frames_queued += recipients
+        self.broadcast.record((time.perf_counter() - started) * 1000)
+
+    def snapshot(self, channels) -> dict:
+        channels = list(channels)
+        return {
+            "clients": len(channels),
+            "broadcasts": self.broadcasts,
+            "frames_queued": self.frames_queued,
+            "frames_sent": sum(channel.sent for channel in channels),
+            "frames_dropped": sum(channel.dropped for channel in channels),
+            "pending": sum(channel.pending for channel in channels),
+            "encoder": "orjson" if orjson is not None else "json",
+            "broadcast_ms": self.broadcast.percentiles(),
+            "delivery_ms": self.delivery.percentiles(),
+        }
@@ -1,19 +1,204 @@
 """
 Technical indicator calculations for real-time price streaming.
-Implements SMA, EMA, and RSI calculations.
+Implements SMA, EMA, RSI and Bollinger Bands calculations.
+
+Indicators are kept as incremental state per symbol and period, so adding a
+price updates every indicator in O(1) with no copies of the price history:
+  - RollingSMA: running sum over a fixed window
+  - RollingEMA: recursive EMA seeded with the SMA of its first window
+  - RollingRSI: running gain/loss sums (simple) or Wilder smoothing
+  - RollingBollinger: sliding-window mean and variance (Welford update)
+
+The indicators sent with every streamed price (SMA 20, EMA 12, RSI 14) are
+held as NumPy arrays with one slot per symbol and updated for a whole batch
+of symbols at once; prices themselves live in a columnar ring buffer
+(app.ws.price_store). Other periods use the rolling objects above, warmed
+up from the retained history the first time they are requested.
+
+Definitions match the array functions of app.services.technical_indicators
+(RSI "simple" here by default); those compute whole series at once and are
+what the REST endpoints and the alert engine use.
 """
 
-from typing import List, Optional
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 from collections import deque
+import math
 import logging
 
+import numpy as np
+
+from app.ws.price_store import PriceRingStore
+
 logger = logging.getLogger(__name__)
 
+# Recompute running sums from the window every N updates (float drift)
+_RESYNC_EVERY = 1000
+
+
+class RollingSMA:
+    """Simple moving average over the last ``period`` prices."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self._window: deque = deque(maxlen=period)
+        self._sum = 0.0
+        self._updates = 0
+
+    def update(self, price: float) -> None:
+        if len(self._window) == self.period:
+            self._sum -= self._window[0]
+        self._window.append(price)
+        self._sum += price
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            self._sum = math.fsum(self._window)
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self._window) < self.period:
+            return None
+        return self._sum / self.period
+
+
+class RollingEMA:
+    """Exponential moving average seeded with the SMA of the first ``period`` prices."""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.multiplier = 2.0 / (period + 1)
+        self._seed = RollingSMA(period)
+        self._ema: Optional[float] = None
+
+    def update(self, price: float) -> None:
+        if self._ema is None:
+            self._seed.update(price)
+            self._ema = self._seed.value
+            return
+        self._ema = (price * self.multiplier) + (self._ema * (1 - self.multiplier))
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._ema
+
+
+class RollingRSI:
+    """
+    Relative Strength Index over ``period`` price changes.
+
+    method="simple" averages the last ``period`` gains and losses (the
+    definition used by the stream so far); method="wilder" applies Wilder's
+    smoothing after the first window.
+    """
+
+    def __init__(self, period: int, method: str = "simple"):
+        if method not in ("simple", "wilder"):
+            raise ValueError(f"Unknown RSI method: {method}")
+        self.period = period
+        self.method = method
+        self._last_price: Optional[float] = None
+        self._changes: deque = deque(maxlen=period)
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self._avg_gain: Optional[float] = None
+        self._avg_loss: Optional[float] = None
+        self._updates = 0
+
+    def update(self, price: float) -> None:
+        if self._last_price is None:
+            self._last_price = price
+            return
+        change = price - self._last_price
+        self._last_price = price
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+
+        if self.method == "wilder" and self._avg_gain is not None:
+            self._avg_gain = (self._avg_gain * (self.period - 1) + gain) / self.period
+            self._avg_loss = (self._avg_loss * (self.period - 1) + loss) / self.period
+            return
+
+        if len(self._changes) == self.period:
+            old_gain, old_loss = self._changes[0]
+            self._gain_sum -= old_gain
+            self._loss_sum -= old_loss
+        self._changes.append((gain, loss))
+        self._gain_sum += gain
+        self._loss_sum += loss
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            self._gain_sum = math.fsum(g for g, _ in self._changes)
+            self._loss_sum = math.fsum(l for _, l in self._changes)
+
+        if len(self._changes) == self.period:
+            self._avg_gain = self._gain_sum / self.period
+            self._avg_loss = self._loss_sum / self.period
+
+    @property
+    def value(self) -> Optional[float]:
+        if self._avg_gain is None:
+            return None
+        if self._avg_loss <= 0:
+            # If no losses, RSI is 100
+            return 100.0
+        rs = self._avg_gain / self._avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+class RollingBollinger:
+    """Bollinger Bands (SMA +/- k standard deviations) over a sliding window."""
+
+    def __init__(self, period: int = 20, num_std: float = 2.0):
+        self.period = period
+        self.num_std = num_std
+        self._window: deque = deque(maxlen=period)
+        self._mean = 0.0
+        self._m2 = 0.0  # Sum of squared deviations from the mean
+        self._updates = 0
+
+    def update(self, price: float) -> None:
+        count = len(self._window)
+        if count < self.period:
+            # Welford: growing window
+            delta = price - self._mean
+            self._mean += delta / (count + 1)
+            self._m2 += delta * (price - self._mean)
+        else:
+            # Welford: replace the oldest value
+            old = self._window[0]
+            old_mean = self._mean
+            self._mean += (price - old) / self.period
+            self._m2 += (price - old) * (price - self._mean + old - old_mean)
+        self._window.append(price)
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            self._mean = math.fsum(self._window) / len(self._window)
+            self._m2 = math.fsum((p - self._mean) ** 2 for p in self._window)
+
+    @property
+    def value(self) -> Optional[Tuple[float, float, float]]:
+        """(upper, middle, lower) or None if not enough data."""
+        if len(self._window) < self.period:
+            return None
+        std = math.sqrt(max(self._m2, 0.0) / self.period)
+        return (self._mean + self.num_std * std, self._mean, self._mean - self.num_std * std)
+
+
+# Periods of the indicators sent with every streamed price (calculate_all);
+# these are updated vectorized for a whole batch of symbols
+SMA_PERIOD = 20
+EMA_PERIOD = 12
+RSI_PERIOD = 14
+
 
 class IndicatorCalculator:
     """
-    Calculates technical indicators (SMA, EMA, RSI) from price history.
-    Maintains a rolling window of prices for efficient computation.
+    Calculates technical indicators (SMA, EMA, RSI, Bollinger) from price history.
+
+    Prices live in a columnar ring-buffer store (app.ws.price_store). The
+    streamed indicators (SMA 20, EMA 12, RSI 14) are kept as per-row NumPy
+    state and updated for a whole batch of symbols in a few vectorized
+    operations; other periods and Bollinger Bands use per-symbol rolling
+    objects created on demand.
     """
 
     def __init__(self, max_history: int = 100):
@@ -22,140 +207,291 @@ class IndicatorCalculator:
             max_history: Maximum number of price points to keep in history
         """
         self.max_history = max_history
-        # Per symbol: {symbol: deque([prices])}
-        self.price_history: dict = {}
+        # The ring must reach back far enough for the streamed indicators
+        self.store = PriceRingStore(capacity=max(max_history, SMA_PERIOD, RSI_PERIOD + 1))
+        # Per-row state of the streamed indicators (grown with the store)
+        self._sma_sum = np.zeros(0)
+        self._ema_seed = np.zeros(0)
+        self._ema = np.zeros(0)
+        self._gain_sum = np.zeros(0)
+        self._loss_sum = np.zeros(0)
+        self._updates = np.zeros(0, dtype=np.int64)
+        self._ema_multiplier = 2.0 / (EMA_PERIOD + 1)
+        # Per symbol: {symbol: {(kind, period, ...): rolling state}}
+        self._state: Dict[str, dict] = {}
+
+    def _ensure_state_rows(self) -> None:
+        rows = len(self.store._head)
+        missing = rows - len(self._sma_sum)
+        if missing <= 0:
+            return
+        self._sma_sum = np.concatenate([self._sma_sum, np.zeros(missing)])
+        self._ema_seed = np.concatenate([self._ema_seed, np.zeros(missing)])
+        self._ema = np.concatenate([self._ema, np.full(missing, np.nan)])
+        self._gain_sum = np.concatenate([self._gain_sum, np.zeros(missing)])
+        self._loss_sum = np.concatenate([self._loss_sum, np.zeros(missing)])
+        self._updates = np.concatenate([self._updates, np.zeros(missing, dtype=np.int64)])
+
+    def _indicator(self, symbol: str, key: tuple, factory):
+        """Get (or create and warm up from history) one indicator's state."""
+        states = self._state.setdefault(symbol, {})
+        state = states.get(key)
+        if state is None:
+            state = states[key] = factory()
+            for price in self.get_price_history(symbol):
+                state.update(price)
+        return state
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def _update_rows(self, rows: np.ndarray, prices: np.ndarray, fields: Dict[str, np.ndarray]) -> None:
+        """Vectorized update of unique rows with one new price each."""
+        store = self.store
+        count = store.counts(rows)
+        fresh = count == 0
+        if fresh.any():
+            # Reused or new rows start from empty state
+            fresh_rows = rows[fresh]
+            for state in (self._sma_sum, self._ema_seed, self._gain_sum, self._loss_sum):
+                state[fresh_rows] = 0.0
+            self._ema[fresh_rows] = np.nan
+            self._updates[fresh_rows] = 0
+
+        # SMA: add the new price, drop the one leaving the window
+        leaving = store.lagged(rows, SMA_PERIOD - 1)
+        self._sma_sum[rows] += prices - np.where(count >= SMA_PERIOD, leaving, 0.0)
+
+        # EMA: seeded with the SMA of the first EMA_PERIOD prices, then recursive
+        seed_leaving = store.lagged(rows, EMA_PERIOD - 1)
+        self._ema_seed[rows] += prices - np.where(count >= EMA_PERIOD, seed_leaving, 0.0)
+        ema = self._ema[rows]
+        seeded = np.isnan(ema) & (count + 1 >= EMA_PERIOD)
+        ema = np.where(
+            seeded,
+            self._ema_seed[rows] / EMA_PERIOD,
+            prices * self._ema_multiplier + ema * (1 - self._ema_multiplier),
+        )
+        self._ema[rows] = ema
+
+        # RSI: running sums of the last RSI_PERIOD gains and losses
+        change = np.where(count >= 1, prices - store.lagged(rows, 0), 0.0)
+        old_change = np.where(
+            count >= RSI_PERIOD + 1,
+            store.lagged(rows, RSI_PERIOD - 1) - store.lagged(rows, RSI_PERIOD),
+            0.0,
+        )
+        self._gain_sum[rows] += np.maximum(change, 0.0) - np.maximum(old_change, 0.0)
+        self._loss_sum[rows] += np.maximum(-change, 0.0) - np.maximum(-old_change, 0.0)
+
+        store.append_batch(rows, {"price": prices, **fields})
+
+        self._updates[rows] += 1
+        resync = rows[self._updates[rows] % _RESYNC_EVERY == 0]
+        if resync.size:
+            # Re-sum from the window to bound float drift
+            self._sma_sum[resync] = np.nansum(store.window(resync, SMA_PERIOD), axis=1)
+            changes = np.diff(store.window(resync, RSI_PERIOD + 1), axis=1)
+            self._gain_sum[resync] = np.nansum(np.maximum(changes, 0.0), axis=1)
+            self._loss_sum[resync] = np.nansum(np.maximum(-changes, 0.0), axis=1)
+
+    def update_batch(
+        self,
+        symbols: Sequence[str],
+        prices: Sequence[float],
+        highs: Optional[Sequence[float]] = None,
+        lows: Optional[Sequence[float]] = None,
+        volumes: Optional[Sequence[float]] = None,
+        timestamps: Optional[Sequence[float]] = None,
+    ) -> Dict[str, dict]:
+        """
+        Add one tick for many symbols and return calculate_all() for each.
+
+        Streamed indicators are updated in one vectorized pass per round
+        (a symbol repeated in the batch goes into the next round).
+
+        Returns:
+            {symbol: {"sma": ..., "ema": ..., "rsi": ...}}
+        """
+        if not symbols:
+            return {}
+        rows = self.store.rows_for(symbols)
+        self._ensure_state_rows()
+        prices = np.asarray(prices, dtype=float)
+        columns = {
+            field: np.asarray(values, dtype=float)
+            for field, values in (("high", highs), ("low", lows), ("volume", volumes), ("timestamp", timestamps))
+            if values is not None
+        }
+
+        # Rounds of unique rows, in batch order
+        rounds: List[List[int]] = []
+        seen: Dict[int, int] = {}
+        for index, row in enumerate(rows.tolist()):
+            occurrence = seen.get(row, 0)
+            seen[row] = occurrence + 1
+            if occurrence == len(rounds):
+                rounds.append([])
+            rounds[occurrence].append(index)
+        for positions in rounds:
+            positions = np.asarray(positions)
+            self._update_rows(rows[positions], prices[positions], {f: v[positions] for f, v in columns.items()})
+
+        # Per-symbol rolling indicators (custom periods, Bollinger)
+        if self._state:
+            for symbol, price in zip(symbols, prices.tolist()):
+                for state in self._state.get(symbol, {}).values():
+                    state.update(price)
+
+        unique_symbols = list(dict.fromkeys(symbols))
+        return dict(zip(unique_symbols, self._streamed_values(self.store.rows_for(unique_symbols))))
+
+    def update_many(self, prices: Union[Mapping[str, float], Iterable[Tuple[str, float]]]) -> Dict[str, dict]:
+        """
+        Add a batch of prices (e.g. one feed tick for many symbols) and
+        return calculate_all() for every symbol in it.
+
+        Args:
+            prices: {symbol: price} or (symbol, price) pairs, applied in order
+
+        Returns:
+            {symbol: {"sma": ..., "ema": ..., "rsi": ...}}
+        """
+        items = list(prices.items() if isinstance(prices, Mapping) else prices)
+        return self.update_batch([symbol for symbol, _ in items], [price for _, price in items])
 
     def add_price(self, symbol: str, price: float) -> None:
         """
         Add a price point to history for a symbol.
-        
+
         Args:
             symbol: Stock symbol
             price: Price value
         """
-        if symbol not in self.price_history:
-            self.price_history[symbol] = deque(maxlen=self.max_history)
-        
-        self.price_history[symbol].append(price)
+        self.update_batch([symbol], [price])
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _streamed_values(self, rows: np.ndarray) -> List[dict]:
+        count = self.store.counts(rows)
+        sma = np.where(count >= SMA_PERIOD, self._sma_sum[rows] / SMA_PERIOD, np.nan)
+        ema = self._ema[rows]
+        avg_gain = self._gain_sum[rows] / RSI_PERIOD
+        avg_loss = self._loss_sum[rows] / RSI_PERIOD
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(avg_loss <= 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+        rsi = np.where(count >= RSI_PERIOD + 1, rsi, np.nan)
+
+        def _clean(values: np.ndarray) -> List[Optional[float]]:
+            return [None if math.isnan(v) else v for v in np.round(values, 2).tolist()]
+
+        return [
+            {"sma": s, "ema": e, "rsi": r}
+            for s, e, r in zip(_clean(sma), _clean(ema), _clean(rsi))
+        ]
+
+    def _streamed(self, symbol: str, name: str) -> Optional[float]:
+        row = self.store.row_of(symbol)
+        if row is None:
+            return None
+        return self._streamed_values(np.asarray([row]))[0][name]
 
     def get_price_history(self, symbol: str) -> List[float]:
         """Get price history for a symbol."""
-        if symbol not in self.price_history:
-            return []
-        return list(self.price_history[symbol])
+        return self.store.history(symbol, limit=self.max_history).tolist()
 
     def calculate_sma(self, symbol: str, period: int = 20) -> Optional[float]:
         """
         Calculate Simple Moving Average (SMA).
-        
+
         Args:
             symbol: Stock symbol
             period: Number of periods for SMA (default 20)
-        
+
         Returns:
             SMA value or None if not enough data
         """
-        prices = self.get_price_history(symbol)
-        
-        if len(prices) < period:
-            return None
-        
-        sma = sum(prices[-period:]) / period
-        return round(sma, 2)
+        if period == SMA_PERIOD:
+            return self._streamed(symbol, "sma")
+        sma = self._indicator(symbol, ("sma", period), lambda: RollingSMA(period)).value
+        return None if sma is None else round(sma, 2)
 
     def calculate_ema(self, symbol: str, period: int = 12) -> Optional[float]:
         """
         Calculate Exponential Moving Average (EMA).
-        
+
         Args:
             symbol: Stock symbol
             period: Number of periods for EMA (default 12)
-        
+
         Returns:
             EMA value or None if not enough data
         """
-        prices = self.get_price_history(symbol)
-        
-        if len(prices) < period:
-            return None
-        
-        # EMA multiplier
-        multiplier = 2.0 / (period + 1)
-        
-        # Start with SMA as first EMA value
-        ema = sum(prices[:period]) / period
-        
-        # Calculate EMA for remaining prices
-        for price in prices[period:]:
-            ema = (price * multiplier) + (ema * (1 - multiplier))
-        
-        return round(ema, 2)
-
-    def calculate_rsi(self, symbol: str, period: int = 14) -> Optional[float]:
+        if period == EMA_PERIOD:
+            return self._streamed(symbol, "ema")
+        ema = self._indicator(symbol, ("ema", period), lambda: RollingEMA(period)).value
+        return None if ema is None else round(ema, 2)
+
+    def calculate_rsi(self, symbol: str, period: int = 14, method: str = "simple") -> Optional[float]:
         """
         Calculate Relative Strength Index (RSI).
-        
+
         RSI = 100 - (100 / (1 + RS))
         where RS = Average Gain / Average Loss
-        
+
         Args:
             symbol: Stock symbol
             period: Number of periods for RSI (default 14)
-        
+            method: "simple" (average of the last period changes) or "wilder"
+
         Returns:
             RSI value (0-100) or None if not enough data
         """
-        prices = self.get_price_history(symbol)
-        
-        if len(prices) < period + 1:
+        if period == RSI_PERIOD and method == "simple":
+            return self._streamed(symbol, "rsi")
+        rsi = self._indicator(symbol, ("rsi", period, method), lambda: RollingRSI(period, method)).value
+        return None if rsi is None else round(rsi, 2)
+
+    def calculate_bollinger(self, symbol: str, period: int = 20, num_std: float = 2.0) -> Optional[dict]:
+        """
+        Calculate Bollinger Bands.
+
+        Returns:
+            dict with upper, middle, lower or None if not enough data
+        """
+        bands = self._indicator(
+            symbol, ("bollinger", period, num_std), lambda: RollingBollinger(period, num_std)
+        ).value
+        if bands is None:
             return None
-        
-        # Calculate gains and losses
-        gains = []
-        losses = []
-        
-        for i in range(1, len(prices)):
-            change = prices[i] - prices[i - 1]
-            if change > 0:
-                gains.append(change)
-                losses.append(0)
-            else:
-                gains.append(0)
-                losses.append(abs(change))
-        
-        # Average gains and losses over the period
-        avg_gain = sum(gains[-period:]) / period
-        avg_loss = sum(losses[-period:]) / period
-        
-        if avg_loss == 0:
-            # If no losses, RSI is 100
-            return 100.0
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        
-        return round(rsi, 2)
+        upper, middle, lower = bands
+        return {"upper": round(upper, 2), "middle": round(middle, 2), "lower": round(lower, 2)}
 
     def calculate_all(self, symbol: str) -> dict:
         """
         Calculate all indicators for a symbol.
-        
+
         Args:
             symbol: Stock symbol
-        
+
         Returns:
             dict with sma, ema, rsi values (or None if not enough data)
         """
-        return {
-            "sma": self.calculate_sma(symbol),
-            "ema": self.calculate_ema(symbol),
-            "rsi": self.calculate_rsi(symbol),
-        }
+        row = self.store.row_of(symbol)
+        if row is None:
+            return {"sma": None, "ema": None, "rsi": None}
+        return self._streamed_values(np.asarray([row]))[0]
 
     def clear_history(self, symbol: str) -> None:
         """Clear price history for a symbol."""
-        if symbol in self.price_history:
-            del self.price_history[symbol]
+        self.store.remove(symbol)
+        self._state.pop(symbol, None)
+
+    def stats(self) -> dict:
+        return {"store": self.store.stats(), "custom_indicators": sum(len(s) for s in self._state.values())}
 
 
 # Global indicator calculator instance
@@ -0,0 +1,76 @@
+"""
+In-process price bus.
+
+The price ingestion layer (app.ws.price_streamer) publishes one message per
+tick; every handler subscribed to the tick's symbol receives it. WebSocket
+fan-out (ConnectionManager.broadcast) is just another subscriber, so the
+cost of a tick is one publish plus one send per interested client.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Handler(symbol, message)
+PriceHandler = Callable[[str, dict], Awaitable[None]]
+
+
+class PriceBus:
+    """Per-symbol publish/subscribe for price messages."""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[PriceHandler]] = {}
+        self._published = 0
+        self._delivered = 0
+        self._handler_errors = 0
+
+    def subscribe(self, symbol: str, handler: PriceHandler) -> None:
+        """Deliver messages for ``symbol`` to ``handler`` (idempotent)."""
+        handlers = self._handlers.setdefault(symbol, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    def unsubscribe(self, symbol: str, handler: PriceHandler) -> None:
+        handlers = self._handlers.get(symbol)
+        if not handlers:
+            return
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            del self._handlers[symbol]
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one subscriber."""
+        return list(self._handlers.keys())
+
+    def has_subscribers(self, symbol: str) -> bool:
+        return bool(self._handlers.get(symbol))
+
+    async def publish(self, symbol: str, message: dict) -> None:
+        """Deliver one message to every handler of ``symbol`` concurrently."""
+        handlers = list(self._handlers.get(symbol, ()))
+        self._published += 1
+        if not handlers:
+            return
+        results = await asyncio.gather(*(handler(symbol, message) for handler in handlers), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                self._handler_errors += 1
+                logger.warning(f"Price bus handler failed for {symbol}: {result}")
+            else:
+                self._delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self._handlers),
+            "handlers": sum(len(handlers) for handlers in self._handlers.values()),
+            "published": self._published,
+            "delivered": self._delivered,
+            "handler_errors": self._handler_errors,
+        }
+
+
+# Global price bus instance
+price_bus = PriceBus()
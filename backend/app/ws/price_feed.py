@@ -0,0 +1,192 @@
+"""
+Price feed adapters for the WebSocket price streamer.
+
+A feed produces batches of ticks for the currently subscribed symbols and
+hands them to the streamer, which publishes them on the price bus. Feeds:
+  - BatchPollingFeed: polls the market data gateway for all subscribed
+    symbols in chunked batch quote calls once per interval
+  - ReplayFeed: replays recorded ticks (list or JSONL file); a local,
+    network-free stand-in for tests and demos
+
+A push feed (e.g. a vendor WebSocket) plugs in by implementing PriceFeed.run
+and calling ``publish`` whenever ticks arrive.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Collection, Dict, Iterable, List, Optional, Sequence
+
+from app.config import settings
+from app.services.market_data import Quote, market_data_gateway
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PriceTick:
+    """One price update for a symbol."""
+    symbol: str
+    price: float
+    high: float
+    low: float
+    volume: int
+    timestamp: str
+
+    @classmethod
+    def from_quote(cls, quote: Quote) -> "PriceTick":
+        return cls(
+            symbol=quote.symbol,
+            price=round(float(quote.price), 2),
+            high=round(float(quote.high or quote.price), 2),
+            low=round(float(quote.low or quote.price), 2),
+            volume=int(quote.volume or 0),
+            timestamp=datetime.utcnow().isoformat() + "Z",
+        )
+
+    def to_message(self) -> dict:
+        """Price fields sent to WebSocket clients (symbol is added on send)."""
+        return {
+            "price": self.price,
+            "high": self.high,
+            "low": self.low,
+            "volume": self.volume,
+            "timestamp": self.timestamp,
+        }
+
+
+# publish(ticks, missing): ticks received, and polled symbols without data
+TickPublisher = Callable[[List[PriceTick], Sequence[str]], Awaitable[None]]
+SymbolSource = Callable[[], Collection[str]]
+
+
+class PriceFeed(ABC):
+    """Source of price ticks for the subscribed symbols."""
+
+    name: str = "feed"
+
+    @abstractmethod
+    async def run(self, symbols: SymbolSource, publish: TickPublisher) -> None:
+        """Produce ticks until cancelled; ``symbols()`` is read on every cycle."""
+
+
+class BatchPollingFeed(PriceFeed):
+    """Polls gateway quotes for all subscribed symbols in chunked batches."""
+
+    name = "poll"
+
+    def __init__(
+        self,
+        interval: float = 2.0,
+        chunk_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        timeout: float = 5.0,
+    ):
+        self.interval = interval
+        self.chunk_size = max(chunk_size or settings.MARKET_DATA_BATCH_CHUNK_SIZE, 1)
+        self.concurrency = max(concurrency or settings.MARKET_DATA_BATCH_WORKERS, 1)
+        self.timeout = timeout
+
+    async def poll(self, symbols: Sequence[str]) -> Dict[str, Quote]:
+        """Quotes for ``symbols``: one batch call per chunk, chunks run concurrently."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chunks = [list(symbols[i:i + self.chunk_size]) for i in range(0, len(symbols), self.chunk_size)]
+
+        async def _fetch(chunk: List[str]) -> Dict[str, Quote]:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        asyncio.to_thread(market_data_gateway.get_quotes, chunk),
+                        timeout=self.timeout,
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Timeout polling quotes for {len(chunk)} symbols")
+                except Exception as e:
+                    logger.warning(f"Error polling quotes for {len(chunk)} symbols: {e}")
+                return {}
+
+        quotes: Dict[str, Quote] = {}
+        for fetched in await asyncio.gather(*(_fetch(chunk) for chunk in chunks)):
+            quotes.update(fetched)
+        return quotes
+
+    async def run(self, symbols: SymbolSource, publish: TickPublisher) -> None:
+        while True:
+            started = time.monotonic()
+            requested = sorted(symbols())
+            if requested:
+                quotes = await self.poll(requested)
+                ticks = [PriceTick.from_quote(quotes[symbol]) for symbol in requested if symbol in quotes]
+                missing = [symbol for symbol in requested if symbol not in quotes]
+                await publish(ticks, missing)
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+
+class ReplayFeed(PriceFeed):
+    """
+    Replays recorded ticks in order, one batch per interval.
+
+    Ticks of symbols nobody subscribes to are skipped. With ``loop`` the
+    recording restarts when it ends; otherwise the feed idles.
+    """
+
+    name = "replay"
+
+    def __init__(self, batches: Iterable[Sequence[PriceTick]], interval: float = 0.0, loop: bool = False):
+        self.batches: List[List[PriceTick]] = [list(batch) for batch in batches]
+        self.interval = interval
+        self.loop = loop
+
+    @classmethod
+    def from_ticks(cls, ticks: Iterable[PriceTick], **kwargs) -> "ReplayFeed":
+        """One tick per batch."""
+        return cls([[tick] for tick in ticks], **kwargs)
+
+    @classmethod
+    def from_jsonl(cls, path: str, **kwargs) -> "ReplayFeed":
+        """
+        Load a recording: one JSON object per line with PriceTick fields, or
+        {"ticks": [...]} for a batch.
+        """
+        batches: List[List[PriceTick]] = []
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                items = record["ticks"] if isinstance(record, dict) and "ticks" in record else [record]
+                batches.append([PriceTick(**item) for item in items])
+        return cls(batches, **kwargs)
+
+    def to_jsonl(self, path: str) -> None:
+        """Write the recording in the format read by from_jsonl()."""
+        with open(path, "w", encoding="utf-8") as handle:
+            for batch in self.batches:
+                handle.write(json.dumps({"ticks": [asdict(tick) for tick in batch]}) + "\n")
+
+    async def run(self, symbols: SymbolSource, publish: TickPublisher) -> None:
+        while True:
+            for batch in self.batches:
+                wanted = set(symbols())
+                ticks = [tick for tick in batch if tick.symbol in wanted]
+                if ticks:
+                    await publish(ticks, ())
+                await asyncio.sleep(self.interval)
+            if not self.loop:
+                break
+        # Recording exhausted: stay alive until cancelled
+        await asyncio.Event().wait()
+
+
+def create_price_feed(interval: float) -> PriceFeed:
+    """Feed selected by PRICE_FEED ("poll" or "replay")."""
+    if settings.PRICE_FEED == "replay":
+        if not settings.PRICE_FEED_REPLAY_FILE:
+            raise ValueError("PRICE_FEED=replay requires PRICE_FEED_REPLAY_FILE")
+        return ReplayFeed.from_jsonl(settings.PRICE_FEED_REPLAY_FILE, interval=interval, loop=True)
+    return BatchPollingFeed(interval=interval)
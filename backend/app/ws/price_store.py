@@ -0,0 +1,194 @@
+"""
+Columnar ring-buffer store for streamed price history.
+
+One preallocated NumPy 2D array per field (price, high, low, volume,
+timestamp) with one row per symbol and ``capacity`` columns used as a ring
+buffer. A symbol -> row index maps names to rows. Compared with a deque of
+Python floats per symbol this is 8 bytes per value with no per-point
+objects, and a whole batch of symbols is appended with a few vectorized
+writes.
+
+Features:
+  - append_batch(): one call for a tick of many symbols
+  - history(): chronological copy of the last N values of one field
+  - lagged(): vectorized "value k ticks ago" for many rows at once (used by
+    the incremental indicators)
+  - Rows are allocated on demand and grow by doubling; removed symbols free
+    their row for reuse
+"""
+
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ("price", "high", "low", "volume", "timestamp")
+
+
+class PriceRingStore:
+    """Fixed-capacity price history per symbol, stored column-wise."""
+
+    def __init__(self, capacity: int = 100, initial_rows: int = 64, fields: Sequence[str] = PRICE_FIELDS):
+        """
+        Args:
+            capacity: Points kept per symbol (oldest are overwritten)
+            initial_rows: Rows preallocated before the first growth
+            fields: Column names; "price" is required
+        """
+        if "price" not in fields:
+            raise ValueError("PriceRingStore needs a 'price' field")
+        self.capacity = max(int(capacity), 1)
+        self.fields = tuple(fields)
+        rows = max(int(initial_rows), 1)
+        self._data: Dict[str, np.ndarray] = {
+            field: np.full((rows, self.capacity), np.nan) for field in self.fields
+        }
+        # Next write position and number of stored points per row
+        self._head = np.zeros(rows, dtype=np.int64)
+        self._count = np.zeros(rows, dtype=np.int64)
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = list(range(rows - 1, -1, -1))
+
+    # ------------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------------
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def symbols(self) -> List[str]:
+        return list(self._rows)
+
+    def row_of(self, symbol: str) -> Optional[int]:
+        return self._rows.get(symbol)
+
+    def _grow(self) -> None:
+        old_rows = len(self._head)
+        new_rows = old_rows * 2
+        for field, column in self._data.items():
+            grown = np.full((new_rows, self.capacity), np.nan)
+            grown[:old_rows] = column
+            self._data[field] = grown
+        self._head = np.concatenate([self._head, np.zeros(old_rows, dtype=np.int64)])
+        self._count = np.concatenate([self._count, np.zeros(old_rows, dtype=np.int64)])
+        self._free.extend(range(new_rows - 1, old_rows - 1, -1))
+
+    def rows_for(self, symbols: Iterable[str]) -> np.ndarray:
+        """Row index of each symbol, allocating rows for new symbols."""
+        rows = []
+        for symbol in symbols:
+            row = self._rows.get(symbol)
+            if row is None:
+                if not self._free:
+                    self._grow()
+                row = self._rows[symbol] = self._free.pop()
+            rows.append(row)
+        return np.asarray(rows, dtype=np.int64)
+
+    def remove(self, symbol: str) -> None:
+        """Forget a symbol and free its row."""
+        row = self._rows.pop(symbol, None)
+        if row is None:
+            return
+        self._head[row] = 0
+        self._count[row] = 0
+        for column in self._data.values():
+            column[row] = np.nan
+        self._free.append(row)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append_batch(self, rows: np.ndarray, values: Dict[str, Sequence[float]]) -> None:
+        """
+        Append one point to each row. ``rows`` must be unique; missing fields
+        are stored as NaN, a missing timestamp as the current time.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return
+        heads = self._head[rows]
+        for field in self.fields:
+            column_values = values.get(field)
+            if column_values is None:
+                column_values = time.time() if field == "timestamp" else np.nan
+            self._data[field][rows, heads] = column_values
+        self._head[rows] = (heads + 1) % self.capacity
+        self._count[rows] = np.minimum(self._count[rows] + 1, self.capacity)
+
+    def append(self, symbol: str, price: float, **values: float) -> None:
+        """Append one point for one symbol."""
+        self.append_batch(self.rows_for([symbol]), {"price": [price], **{k: [v] for k, v in values.items()}})
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def counts(self, rows: np.ndarray) -> np.ndarray:
+        return self._count[rows]
+
+    def lagged(self, rows: np.ndarray, lag: int, field: str = "price") -> np.ndarray:
+        """
+        Value written ``lag`` appends ago for each row (lag=0 is the latest).
+        Rows with fewer than lag+1 points (or lag >= capacity) give NaN.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if lag >= self.capacity:
+            return np.full(rows.size, np.nan)
+        positions = (self._head[rows] - 1 - lag) % self.capacity
+        values = self._data[field][rows, positions]
+        return np.where(self._count[rows] > lag, values, np.nan)
+
+    def window(self, rows: np.ndarray, length: int, field: str = "price") -> np.ndarray:
+        """
+        Last ``length`` values of each row, oldest first, shape (rows, length).
+        Missing points are NaN.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        length = min(length, self.capacity)
+        offsets = np.arange(length - 1, -1, -1)
+        positions = (self._head[rows][:, None] - 1 - offsets[None, :]) % self.capacity
+        values = self._data[field][rows[:, None], positions]
+        present = offsets[None, :] < self._count[rows][:, None]
+        return np.where(present, values, np.nan)
+
+    def history(self, symbol: str, field: str = "price", limit: Optional[int] = None) -> np.ndarray:
+        """Chronological copy of the last ``limit`` (default all) values of a symbol."""
+        row = self._rows.get(symbol)
+        if row is None:
+            return np.empty(0)
+        count = int(self._count[row])
+        if limit is not None:
+            count = min(count, limit)
+        if count == 0:
+            return np.empty(0)
+        positions = (self._head[row] - count + np.arange(count)) % self.capacity
+        return self._data[field][row, positions].copy()
+
+    def latest(self, symbol: str) -> Optional[Dict[str, float]]:
+        """Most recent point of a symbol as {field: value}."""
+        row = self._rows.get(symbol)
+        if row is None or self._count[row] == 0:
+            return None
+        position = (self._head[row] - 1) % self.capacity
+        return {field: float(column[row, position]) for field, column in self._data.items()}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._data.values()) + self._head.nbytes + self._count.nbytes
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self._rows),
+            "rows_allocated": len(self._head),
+            "capacity": self.capacity,
+            "fields": list(self.fields),
+            "bytes": self.nbytes,
+        }
@@ -1,42 +1,103 @@
 """
-Price streamer - fetches current stock prices and broadcasts to WebSocket clients.
-Handles caching and error handling gracefully.
-Calculates real-time technical indicators (SMA, EMA, RSI).
-With rate limiting and timeouts to prevent server overload.
+Price streamer - ingests stock prices and broadcasts them to WebSocket clients.
+
+One ingestion task serves every subscribed symbol: a price feed
+(app.ws.price_feed) delivers ticks in batches, the streamer adds real-time
+technical indicators (SMA, EMA, RSI) and publishes each tick on the
+in-process price bus (app.ws.price_bus), which fans it out to the
+subscribed callbacks such as ConnectionManager.broadcast. Cost scales with
+ticks, not with symbols times polls.
+
+Across processes (app.ws.backplane) only the elected leader runs the
+ingestion task, for the union of the symbols every process announces;
+ticks travel over the backplane and each process fans them out to its own
+clients through its local price bus.
 """
 
 import asyncio
-import yfinance as yf
+import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import logging
+from app.config import settings
+from app.services.market_data import market_data_gateway
+from app.ws.backplane import INTEREST_CHANNEL, PRICES_CHANNEL, Backplane, backplane as default_backplane
 from app.ws.indicators import indicator_calc
+from app.ws.price_bus import PriceBus, PriceHandler, price_bus
+from app.ws.price_feed import PriceFeed, PriceTick, create_price_feed
 import time
 
 logger = logging.getLogger(__name__)
 
+# Consecutive polls without data before a symbol's streams are stopped
+MAX_CONSECUTIVE_ERRORS = 5
+
+# Leader role on the backplane; its holder runs the ingestion task
+INGESTION_ROLE = "price-ingestion"
+# Symbols per interest announcement (keeps NOTIFY payloads small)
+_INTEREST_CHUNK = 500
+# Announcements older than this many intervals are ignored
+_INTEREST_TTL_PERIODS = 3
+
 
 class PriceStreamer:
     """
-    Fetches and streams stock prices with rate limiting.
-    Uses caching to avoid excessive API calls.
-    Implements backoff strategy on errors.
+    Streams stock prices for all subscribed symbols from one price feed.
+    Symbols are polled together in batches (or pushed by the feed).
+    Symbols that keep returning no data are reported and dropped.
     """
 
-    def __init__(self, update_interval: int = 2):
+    def __init__(
+        self,
+        update_interval: int = 2,
+        feed: Optional[PriceFeed] = None,
+        bus: Optional[PriceBus] = None,
+        backplane: Optional[Backplane] = None,
+    ):
         """
         Args:
-            update_interval: Seconds between price updates (default 2 seconds, minimum 1)
+            update_interval: Seconds between price updates (default 2 seconds, minimum 2)
+            feed: Price feed (default: PRICE_FEED setting, batched polling)
+            bus: Local price bus the callbacks are subscribed on (default: global price_bus)
+            backplane: Cross-process backplane (default: global backplane)
         """
         # Enforce minimum interval to prevent hammering APIs
         self.update_interval = max(2, update_interval)
-        self._price_cache: dict = {}
-        self._background_tasks = {}
+        self._feed = feed
+        self.bus = bus or price_bus
+        # Stream name -> (symbol, callback)
+        self._streams: Dict[str, Tuple[str, PriceHandler]] = {}
+        self._consecutive_errors: Dict[str, int] = {}
+        self._ingest_task: Optional[asyncio.Task] = None
         self._last_fetch_time: dict = {}  # Track last fetch time per symbol
+        self._ticks = 0
+        self._batches = 0
+        # Cluster state: leadership and the symbols other processes watch
+        self.backplane = backplane or default_backplane
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.interest_seconds = settings.WS_BACKPLANE_INTEREST_SECONDS
+        self.is_leader = False
+        self._remote_interest: Dict[str, Tuple[float, Dict[int, List[str]]]] = {}
+        self._coordinator_task: Optional[asyncio.Task] = None
+        self.backplane.subscribe(PRICES_CHANNEL, self._on_price_message)
+        self.backplane.subscribe(INTEREST_CHANNEL, self._on_interest_message)
+
+    @property
+    def feed(self) -> PriceFeed:
+        if self._feed is None:
+            self._feed = create_price_feed(self.update_interval)
+        return self._feed
+
+    async def set_feed(self, feed: PriceFeed) -> None:
+        """Replace the price feed (restarts ingestion if running)."""
+        self._feed = feed
+        if self._ingest_task is not None:
+            await self._stop_ingestion()
+            self._ensure_ingestion()
 
     async def get_latest_price(self, symbol: str) -> Optional[dict]:
         """
-        Fetch latest price for a symbol using yfinance with timeout and error handling.
+        Fetch latest price for a single symbol via the market data gateway with timeout and error handling.
         
         Returns:
             dict with price, timestamp, or None if failed
@@ -50,30 +111,16 @@ class PriceStreamer:
             
             self._last_fetch_time[symbol] = now
             
-            # Add timeout to yfinance call
-            ticker = yf.Ticker(symbol)
-            
-            # Use asyncio timeout instead of signal
-            hist = await asyncio.wait_for(
-                asyncio.to_thread(ticker.history, "1d"),
+            quote = await asyncio.wait_for(
+                asyncio.to_thread(market_data_gateway.get_quote, symbol),
                 timeout=5
             )
             
-            if hist.empty:
+            if quote is None:
                 logger.warning(f"No data available for {symbol}")
                 return None
             
-            # Get latest price
-            latest = hist.iloc[-1]
-            current_time = datetime.utcnow().isoformat() + "Z"
-            
-            return {
-                "price": round(float(latest["Close"]), 2),
-                "high": round(float(latest["High"]), 2),
-                "low": round(float(latest["Low"]), 2),
-                "volume": int(latest["Volume"]),
-                "timestamp": current_time,
-            }
+            return PriceTick.from_quote(quote).to_message()
         
         except asyncio.TimeoutError:
             logger.warning(f"Timeout fetching price for {symbol}")
@@ -82,108 +129,268 @@ class PriceStreamer:
             logger.warning(f"Error fetching price for {symbol}: {e}")
             return None
 
-    async def stream_price(self, symbol: str, callback):
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def subscribed_symbols(self) -> List[str]:
+        """Symbols with at least one active stream in this process."""
+        return list({symbol for symbol, _ in self._streams.values()})
+
+    def cluster_symbols(self) -> List[str]:
+        """Symbols watched by any process (what the leader ingests)."""
+        symbols = set(self.subscribed_symbols())
+        stale_before = time.monotonic() - self.interest_seconds * _INTEREST_TTL_PERIODS
+        for worker_id, (seen_at, chunks) in list(self._remote_interest.items()):
+            if seen_at < stale_before:
+                del self._remote_interest[worker_id]
+                continue
+            for chunk in chunks.values():
+                symbols.update(chunk)
+        return list(symbols)
+
+    async def publish_ticks(self, ticks: List[PriceTick], missing: Sequence[str] = ()) -> None:
         """
-        Stream prices for a symbol at regular intervals with error handling.
-        Calls callback with price data and indicators each update.
-        
-        Args:
-            symbol: Stock symbol
-            callback: Async function to call with price data
+        Add indicators to each tick and publish the batch on the backplane.
+        Called by the feed once per batch (leader only).
         """
-        consecutive_errors = 0
-        max_consecutive_errors = 5
+        self._batches += 1
+        messages = []
+        try:
+            # Add prices to indicator history (O(1) per symbol and indicator)
+            indicators = indicator_calc.update_batch(
+                [tick.symbol for tick in ticks],
+                [tick.price for tick in ticks],
+                highs=[tick.high for tick in ticks],
+                lows=[tick.low for tick in ticks],
+                volumes=[tick.volume for tick in ticks],
+            )
+        except Exception as e:
+            logger.error(f"Unexpected error updating indicators: {e}")
+            indicators = {}
+        for tick in ticks:
+            self._consecutive_errors.pop(tick.symbol, None)
+            
+            # Merge indicators into price data
+            price_data = tick.to_message()
+            price_data.update(indicators.get(tick.symbol) or {"sma": None, "ema": None, "rsi": None})
+            messages.append({"symbol": tick.symbol, "data": price_data})
+        
+        if messages:
+            try:
+                await self.backplane.publish_many(PRICES_CHANNEL, messages)
+                self._ticks += len(messages)
+            except Exception as e:
+                logger.error(f"Failed to publish {len(messages)} price updates: {e}")
+        
+        for symbol in missing:
+            await self._record_miss(symbol)
+
+    async def _record_miss(self, symbol: str) -> None:
+        consecutive_errors = self._consecutive_errors.get(symbol, 0) + 1
+        self._consecutive_errors[symbol] = consecutive_errors
+        if consecutive_errors <= 1:
+            logger.debug(f"No price data for {symbol}")
+        if consecutive_errors < MAX_CONSECUTIVE_ERRORS:
+            return
+        
+        logger.error(f"Stopping stream for {symbol} after {consecutive_errors} consecutive errors")
+        self._consecutive_errors.pop(symbol, None)
+        
+        # CRITICAL: Notify clients of stream failure (every process drops its streams)
+        try:
+            error_notification = {
+                "type": "stream_error",
+                "symbol": symbol,
+                "message": f"Failed to fetch prices for {symbol} after {consecutive_errors} attempts",
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "consecutive_errors": consecutive_errors,
+            }
+            await self.backplane.publish(PRICES_CHANNEL, {"symbol": symbol, "data": error_notification})
+        except Exception as e:
+            logger.error(f"Failed to notify client of stream error for {symbol}: {e}")
+
+    async def _on_price_message(self, message: dict) -> None:
+        """Backplane -> local price bus (runs in every process)."""
+        symbol, price_data = message["symbol"], message["data"]
+        await self.bus.publish(symbol, price_data)
         
+        if price_data.get("type") == "stream_error":
+            for _, chunks in self._remote_interest.values():
+                for chunk in chunks.values():
+                    if symbol in chunk:
+                        chunk.remove(symbol)
+            for name in [name for name, (stream_symbol, _) in self._streams.items() if stream_symbol == symbol]:
+                await self.stop_streaming(name)
+
+    # ------------------------------------------------------------------
+    # Cluster coordination
+    # ------------------------------------------------------------------
+
+    async def _announce_interest(self) -> None:
+        """Tell the leader which symbols this process watches."""
+        symbols = sorted(self.subscribed_symbols())
+        chunks = [symbols[i:i + _INTEREST_CHUNK] for i in range(0, len(symbols), _INTEREST_CHUNK)] or [[]]
+        try:
+            await self.backplane.publish_many(
+                INTEREST_CHANNEL,
+                [
+                    {"worker": self.worker_id, "chunk": index, "chunks": len(chunks), "symbols": chunk}
+                    for index, chunk in enumerate(chunks)
+                ],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to announce WebSocket symbols: {e}")
+
+    async def _on_interest_message(self, message: dict) -> None:
+        worker_id = message.get("worker")
+        if worker_id == self.worker_id:
+            return
+        _, chunks = self._remote_interest.get(worker_id, (0.0, {}))
+        chunks = {index: symbols for index, symbols in chunks.items() if index < message["chunks"]}
+        chunks[message["chunk"]] = list(message["symbols"])
+        self._remote_interest[worker_id] = (time.monotonic(), chunks)
+        if self.is_leader:
+            self._sync_ingestion()
+
+    def _sync_ingestion(self) -> None:
+        """Ingest while this process leads and anyone watches a symbol."""
+        if self.is_leader and self.cluster_symbols():
+            self._ensure_ingestion()
+        elif self._ingest_task is not None:
+            asyncio.create_task(self._stop_ingestion())
+
+    async def _coordinate(self) -> None:
+        """Leader election and interest announcements, once per interval."""
         while True:
             try:
-                price_data = await self.get_latest_price(symbol)
-                
-                if price_data:
-                    # Reset error counter on success
-                    consecutive_errors = 0
-                    
-                    # Add price to indicator history
-                    indicator_calc.add_price(symbol, price_data["price"])
-                    
-                    # Calculate indicators
-                    indicators = indicator_calc.calculate_all(symbol)
-                    
-                    # Merge indicators into price data
-                    price_data.update(indicators)
-                    
-                    await callback(symbol, price_data)
-                else:
-                    consecutive_errors += 1
-                    if consecutive_errors <= 1:
-                        logger.debug(f"No price data for {symbol}")
-                
-                # Implement backoff on consecutive errors
-                if consecutive_errors > 3:
-                    # Exponential backoff: sleep longer with more errors
-                    sleep_time = self.update_interval * (2 ** min(consecutive_errors - 3, 3))
-                    logger.warning(f"Backoff for {symbol}: sleeping {sleep_time}s after {consecutive_errors} errors")
-                    await asyncio.sleep(sleep_time)
-                else:
-                    # Normal interval
-                    await asyncio.sleep(self.update_interval)
-                
-                # Stop streaming if too many consecutive errors
-                if consecutive_errors >= max_consecutive_errors:
-                    logger.error(f"Stopping stream for {symbol} after {consecutive_errors} consecutive errors")
-                    
-                    # CRITICAL: Notify clients of stream failure
-                    try:
-                        error_notification = {
-                            "type": "stream_error",
-                            "symbol": symbol,
-                            "message": f"Failed to fetch prices for {symbol} after {consecutive_errors} attempts",
-                            "timestamp": datetime.utcnow().isoformat() + "Z",
-                            "consecutive_errors": consecutive_errors,
-                        }
-                        await callback(symbol, error_notification)
-                    except Exception as e:
-                        logger.error(f"Failed to notify client of stream error for {symbol}: {e}")
-                    
-                    break
-            
+                was_leader = self.is_leader
+                self.is_leader = await self.backplane.try_acquire_leadership(INGESTION_ROLE)
+                if self.is_leader != was_leader:
+                    logger.info(
+                        f"Price ingestion leadership {'acquired' if self.is_leader else 'lost'}",
+                        extra={"worker_id": self.worker_id, "backplane": self.backplane.name},
+                    )
+                await self._announce_interest()
+                self._sync_ingestion()
             except asyncio.CancelledError:
-                logger.info(f"Price stream cancelled for {symbol}")
-                break
+                raise
             except Exception as e:
-                consecutive_errors += 1
-                logger.error(f"Unexpected error in price stream for {symbol}: {e}")
+                logger.error(f"Price streamer coordination failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interest_seconds)
+
+    def _ensure_coordinator(self) -> None:
+        if self._coordinator_task is None or self._coordinator_task.done():
+            self._coordinator_task = asyncio.create_task(self._coordinate(), name="price-coordinator")
+
+    async def start(self) -> None:
+        """Join the cluster (application startup)."""
+        self._ensure_coordinator()
+
+    async def stop(self) -> None:
+        """Leave the cluster and stop ingestion (application shutdown)."""
+        task, self._coordinator_task = self._coordinator_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.is_leader = False
+        await self._stop_ingestion()
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    async def _ingest(self) -> None:
+        """Run the feed; restart it with a delay if it crashes."""
+        while True:
+            try:
+                await self.feed.run(self.cluster_symbols, self.publish_ticks)
+                return
+            except asyncio.CancelledError:
+                logger.info("Price ingestion cancelled")
+                raise
+            except Exception as e:
+                logger.error(f"Price feed {self.feed.name} failed, restarting: {e}", exc_info=True)
                 await asyncio.sleep(self.update_interval)
 
+    def _ensure_ingestion(self) -> None:
+        if self._ingest_task is None or self._ingest_task.done():
+            self._ingest_task = asyncio.create_task(self._ingest(), name="price-ingestion")
+            logger.info(f"Started price ingestion ({self.feed.name} feed)")
+
+    async def _stop_ingestion(self) -> None:
+        task, self._ingest_task = self._ingest_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        logger.info("Stopped price ingestion")
+
+    # ------------------------------------------------------------------
+    # Streams
+    # ------------------------------------------------------------------
+
     async def start_streaming(self, symbol: str, callback, task_name: Optional[str] = None):
         """
-        Start background price streaming for a symbol.
+        Start streaming prices for a symbol to ``callback(symbol, price_data)``.
         
         Args:
             symbol: Stock symbol
             callback: Async callback function
-            task_name: Optional name for tracking the task
+            task_name: Optional name for tracking the stream
         """
         name = task_name or f"stream_{symbol}"
         
-        if name not in self._background_tasks:
-            task = asyncio.create_task(self.stream_price(symbol, callback))
-            self._background_tasks[name] = task
+        if name not in self._streams:
+            is_new_symbol = symbol not in self.subscribed_symbols()
+            self._streams[name] = (symbol, callback)
+            self.bus.subscribe(symbol, callback)
+            self._ensure_coordinator()
+            if is_new_symbol:
+                await self._announce_interest()
+            self._sync_ingestion()
             logger.info(f"Started streaming {symbol}")
 
     async def stop_streaming(self, task_name: str):
-        """Stop a background streaming task."""
-        if task_name in self._background_tasks:
-            self._background_tasks[task_name].cancel()
-            try:
-                await self._background_tasks[task_name]
-            except asyncio.CancelledError:
-                pass
-            del self._background_tasks[task_name]
-            logger.info(f"Stopped streaming {task_name}")
+        """Stop a stream; ingestion stops once no process watches any symbol."""
+        stream = self._streams.pop(task_name, None)
+        if stream is None:
+            return
+        symbol, callback = stream
+        if not any(other == (symbol, callback) for other in self._streams.values()):
+            self.bus.unsubscribe(symbol, callback)
+        logger.info(f"Stopped streaming {task_name}")
+        if symbol not in self.subscribed_symbols():
+            await self._announce_interest()
+            if self.is_leader and not self.cluster_symbols():
+                await self._stop_ingestion()
 
     def get_active_streams(self) -> list:
-        """Get list of active streaming tasks."""
-        return list(self._background_tasks.keys())
+        """Get list of active stream names."""
+        return list(self._streams.keys())
+
+    def stats(self) -> dict:
+        return {
+            "feed": self.feed.name,
+            "worker_id": self.worker_id,
+            "leader": self.is_leader,
+            "streams": len(self._streams),
+            "symbols": len(self.subscribed_symbols()),
+            "cluster_symbols": len(self.cluster_symbols()),
+            "remote_workers": len(self._remote_interest),
+            "batches": self._batches,
+            "ticks": self._ticks,
+            "ingesting": self._ingest_task is not None and not self._ingest_task.done(),
+            "indicators": indicator_calc.stats(),
+            "bus": self.bus.stats(),
+            "backplane": self.backplane.stats(),
+        }
 
 
 # Global price streamer instance with 2-second update interval
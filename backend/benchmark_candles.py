@@ -0,0 +1,221 @@
+"""
+Benchmark of the columnar candle serialization against the iterrows()
+implementations it replaced.
+
+Builds OHLCV frames shaped like yfinance output (exchange time zone index)
+for a 5-year daily and a 60-day 5-minute range, serializes them the old way
+(iterrows, one Pydantic model per candle, response model encoding) and with
+app.services.candles (records and the columnar format), and checks that the
+JSON matches.
+
+Usage: python benchmark_candles.py [--repeat 5]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from app.services import candles
+
+
+# ============================================================================
+# Previous implementations (kept here for comparison only)
+# ============================================================================
+
+class PriceDataPoint(BaseModel):
+    date: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+
+class StockDataResponse(BaseModel):
+    ticker: str
+    data_points: List[PriceDataPoint]
+
+
+class StockHistoricalData(BaseModel):
+    timestamp: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+
+class StockHistoryResponse(BaseModel):
+    historical_data: List[StockHistoricalData]
+
+
+class ForecastPoint(BaseModel):
+    date: datetime
+    predicted_price: float
+
+
+def legacy_stock_data(df):
+    """api/routes/stock.get_stock_data"""
+    data_points = []
+    for idx, row in df.iterrows():
+        if isinstance(idx, datetime):
+            date_str = idx.strftime("%Y-%m-%d")
+        else:
+            date_str = str(idx)[:10]
+        data_points.append(
+            PriceDataPoint(
+                date=date_str,
+                open=float(row["Open"]),
+                high=float(row["High"]),
+                low=float(row["Low"]),
+                close=float(row["Close"]),
+                volume=int(row["Volume"]) if row["Volume"] == row["Volume"] else 0,
+            )
+        )
+    return StockDataResponse(ticker="BENCH", data_points=data_points).model_dump_json()
+
+
+def legacy_history(df):
+    """api/routes/stocks_extended._fetch_historical_data"""
+    data_points = []
+    for idx, row in df.iterrows():
+        try:
+            ts = idx.to_pydatetime() if isinstance(idx, pd.Timestamp) else idx
+            data_points.append(
+                StockHistoricalData(
+                    timestamp=ts,
+                    open=float(row.get("Open", 0)),
+                    high=float(row.get("High", 0)),
+                    low=float(row.get("Low", 0)),
+                    close=float(row.get("Close", 0)),
+                    volume=int(row.get("Volume", 0)) if row.get("Volume") else 0,
+                )
+            )
+        except Exception:
+            continue
+    return StockHistoryResponse(historical_data=data_points).model_dump_json()
+
+
+def legacy_forecast(forecast):
+    """ai/prediction_service.PredictionService._predict_with_prophet"""
+    results = []
+    for _, row in forecast.iterrows():
+        results.append(ForecastPoint(date=row["ds"].to_pydatetime(), predicted_price=float(row["yhat"])))
+    return results
+
+
+# ============================================================================
+# Columnar implementations (as used by the routes)
+# ============================================================================
+
+def _encode(payload):
+    # What JSONResponse does with the payload
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+def columnar_stock_data(df):
+    columns = candles.candle_columns(df)
+    return _encode({"ticker": "BENCH", "data_points": candles.candle_records(columns, "date", "%Y-%m-%d")})
+
+
+def columnar_history(df):
+    return _encode({"historical_data": candles.candle_records(candles.candle_columns(df))})
+
+
+def columnar_compact(df):
+    return _encode({"historical_data": candles.candle_columnar(candles.candle_columns(df))})
+
+
+def vectorized_forecast(forecast):
+    dates = pd.DatetimeIndex(forecast["ds"]).to_pydatetime()
+    prices = forecast["yhat"].to_numpy(dtype=float).tolist()
+    return [ForecastPoint(date=date, predicted_price=price) for date, price in zip(dates, prices)]
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+def ohlcv_frame(index, rng):
+    closes = 100 + np.cumsum(rng.normal(0, 1, len(index)))
+    closes = np.abs(closes) + 1
+    opens = closes + rng.normal(0, 0.5, len(index))
+    return pd.DataFrame(
+        {
+            "Open": opens,
+            "High": np.maximum(opens, closes) + rng.uniform(0, 1, len(index)),
+            "Low": np.minimum(opens, closes) - rng.uniform(0, 1, len(index)),
+            "Close": closes,
+            "Volume": rng.integers(1e5, 1e7, len(index)).astype(np.float64),
+        },
+        index=index,
+    )
+
+
+def intraday_index(days):
+    sessions = pd.bdate_range("2026-01-05", periods=days, tz="America/New_York")
+    bars = [session + pd.Timedelta(hours=9, minutes=30) + pd.Timedelta(minutes=5 * i) for session in sessions for i in range(78)]
+    return pd.DatetimeIndex(bars)
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    ranges = {
+        "5y daily": ohlcv_frame(pd.bdate_range("2021-01-04", periods=1260, tz="America/New_York"), rng),
+        "60d 5-minute": ohlcv_frame(intraday_index(60), rng),
+    }
+
+    for name, df in ranges.items():
+        print(f"{name}: {len(df):,} candles, best of {args.repeat} runs")
+        for label, legacy, columnar in (
+            ("GET /stock/{ticker}", legacy_stock_data, columnar_stock_data),
+            ("GET /stocks/{symbol}", legacy_history, columnar_history),
+        ):
+            legacy_ms, legacy_json = _timed(lambda: legacy(df), args.repeat)
+            columnar_ms, columnar_json = _timed(lambda: columnar(df), args.repeat)
+            same = json.loads(legacy_json) == json.loads(columnar_json)
+            print(
+                f"  {label:<24} iterrows {legacy_ms:>9.2f} ms   columnar {columnar_ms:>7.2f} ms   "
+                f"speedup {legacy_ms / max(columnar_ms, 1e-9):>6.1f}x   same JSON: {same}"
+            )
+        compact_ms, compact_json = _timed(lambda: columnar_compact(df), args.repeat)
+        rows_bytes = len(columnar_history(df))
+        print(
+            f"  {'format=columnar':<24} {'':>21}columnar {compact_ms:>7.2f} ms   "
+            f"payload {len(compact_json) / 1024:,.0f} KiB vs {rows_bytes / 1024:,.0f} KiB as rows"
+        )
+        print()
+
+    forecast = pd.DataFrame(
+        {"ds": pd.date_range("2026-01-01", periods=365, freq="D"), "yhat": rng.normal(100, 5, 365)}
+    )
+    legacy_ms, legacy_points = _timed(lambda: legacy_forecast(forecast), args.repeat)
+    vector_ms, vector_points = _timed(lambda: vectorized_forecast(forecast), args.repeat)
+    print(
+        f"Prophet forecast (365 points)  iterrows {legacy_ms:>7.2f} ms   vectorized {vector_ms:>6.2f} ms   "
+        f"speedup {legacy_ms / max(vector_ms, 1e-9):>6.1f}x   same: {legacy_points == vector_points}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark of the vectorized indicator library against the implementations
+it replaced.
+
+Compares app.services.technical_indicators with the previous pure-Python
+versions (indicator_service loops, the stock details list comprehensions
+and feeding the streaming rolling objects one price at a time) on long
+random-walk series, and checks that the latest values agree.
+
+Usage: python benchmark_indicators.py [--points 100000] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services import technical_indicators as ta
+from app.ws.indicators import RollingBollinger, RollingEMA, RollingRSI, RollingSMA
+
+
+# ============================================================================
+# Previous implementations (kept here for comparison only)
+# ============================================================================
+
+def legacy_sma(closes, period):
+    """indicator_service.calculate_sma"""
+    last_prices = closes[-period:]
+    return float(sum(last_prices) / len(last_prices))
+
+
+def legacy_ema(closes, period):
+    """indicator_service.calculate_ema"""
+    k = 2 / (period + 1)
+    ema = sum(closes[:period]) / period
+    for i in range(period, len(closes)):
+        ema = (closes[i] * k) + (ema * (1 - k))
+    return ema
+
+
+def legacy_rsi(closes, period):
+    """indicator_service.calculate_rsi (Wilder)"""
+    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+    gains = [d if d > 0 else 0 for d in deltas]
+    losses = [-d if d < 0 else 0 for d in deltas]
+    avg_gain = sum(gains[:period]) / period
+    avg_loss = sum(losses[:period]) / period
+    for i in range(period, len(gains)):
+        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 0.0
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def legacy_bollinger(closes, period):
+    """stocks_extended._calculate_indicators"""
+    window = closes[-period:]
+    mean = sum(window) / len(window)
+    std = (sum((p - mean) ** 2 for p in window) / len(window)) ** 0.5
+    return mean + 2 * std, mean, mean - 2 * std
+
+
+def rolling_series(closes, factory):
+    """Full series from a streaming rolling object (app.ws.indicators)."""
+    state = factory()
+    values = []
+    for price in closes:
+        state.update(price)
+        values.append(state.value)
+    return values
+
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+def _timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def _report(name, legacy_ms, vector_ms, legacy_value, vector_value):
+    difference = abs(float(np.nan_to_num(legacy_value)) - float(np.nan_to_num(vector_value)))
+    print(
+        f"{name:<28} legacy {legacy_ms:>10.2f} ms   vectorized {vector_ms:>8.2f} ms   "
+        f"speedup {legacy_ms / max(vector_ms, 1e-9):>7.1f}x   |diff| {difference:.2e}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000, help="Length of each price series")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    closes_array = 100 + np.cumsum(rng.normal(0, 1, args.points))
+    closes_array = np.abs(closes_array) + 1
+    highs = closes_array + rng.uniform(0, 1, args.points)
+    lows = closes_array - rng.uniform(0, 1, args.points)
+    volumes = rng.uniform(1e5, 1e6, args.points)
+    closes = closes_array.tolist()
+    repeat = args.repeat
+
+    print(f"Series length: {args.points:,} points, best of {repeat} runs\n")
+    print("Latest value (REST endpoints, alert engine)")
+    for name, legacy, vector in (
+        ("SMA 200", lambda: legacy_sma(closes, 200), lambda: ta.sma_last(closes_array, 200)),
+        ("EMA 20", lambda: legacy_ema(closes, 20), lambda: ta.ema_last(closes_array, 20)),
+        ("RSI 14 (Wilder)", lambda: legacy_rsi(closes, 14), lambda: ta.rsi_last(closes_array, 14)),
+        (
+            "Bollinger 20 (upper)",
+            lambda: legacy_bollinger(closes, 20)[0],
+            lambda: ta.bollinger_last(closes_array, 20)[0],
+        ),
+    ):
+        legacy_ms, legacy_value = _timed(legacy, repeat)
+        vector_ms, vector_value = _timed(vector, repeat)
+        _report(name, legacy_ms, vector_ms, legacy_value, vector_value)
+
+    print("\nFull series (streaming rolling objects fed one price at a time)")
+    for name, factory, vector in (
+        ("SMA 20", lambda: RollingSMA(20), lambda: ta.sma(closes_array, 20)),
+        ("EMA 12", lambda: RollingEMA(12), lambda: ta.ema(closes_array, 12)),
+        ("RSI 14 (Wilder)", lambda: RollingRSI(14, "wilder"), lambda: ta.rsi(closes_array, 14)),
+        ("RSI 14 (simple)", lambda: RollingRSI(14, "simple"), lambda: ta.rsi(closes_array, 14, "simple")),
+        ("Bollinger 20 (middle)", lambda: RollingBollinger(20), lambda: ta.bollinger(closes_array, 20).middle),
+    ):
+        legacy_ms, legacy_values = _timed(lambda: rolling_series(closes, factory), repeat)
+        vector_ms, vector_values = _timed(vector, repeat)
+        legacy_last = legacy_values[-1]
+        if isinstance(legacy_last, tuple):
+            legacy_last = legacy_last[1]
+        _report(name, legacy_ms, vector_ms, legacy_last, vector_values[-1])
+
+    print("\nLibrary only")
+    for name, fn in (
+        ("MACD 12/26/9", lambda: ta.macd(closes_array)),
+        ("ATR 14", lambda: ta.atr(highs, lows, closes_array, 14)),
+        ("VWAP", lambda: ta.vwap(highs, lows, closes_array, volumes)),
+    ):
+        vector_ms, _ = _timed(fn, repeat)
+        print(f"{name:<28} vectorized {vector_ms:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()